@@ -39,13 +39,19 @@ def get_processed_projects(flowcell_path):
 
 
 def postprocess_project(output_type, exclude_types, stitch_only, clean_outputs,
-                        project_path):
+                        project_path, table_format='csv', incremental=False,
+                        clean_dry_run=False):
     """
     Execute postprocessing steps (e.g., stitching, compiling, cleaning)
     on outputs in a processed project folder.
     """
     project_path_short = os.path.basename(os.path.normpath(project_path))
-    if clean_outputs:
+    if clean_dry_run:
+        bripipetools.postprocessing.OutputCleaner(project_path).clean_outputs(
+            dry_run=True)
+        logger.info("Planned output file changes listed for '{}' (dry run)"
+                    .format(project_path_short))
+    elif clean_outputs:
         bripipetools.postprocessing.OutputCleaner(project_path).clean_outputs()
         logger.info("Output files cleaned for '{}".format(project_path_short))
 
@@ -62,28 +68,34 @@ def postprocess_project(output_type, exclude_types, stitch_only, clean_outputs,
                 logger.info("Exiting program.")
                 sys.exit(1)
         else:
-            bripipetools.postprocessing.OutputStitcher(path).write_table()
+            bripipetools.postprocessing.OutputStitcher(
+                path, table_format=table_format,
+                incremental=incremental).write_table()
 
     if output_type in ['m', 'a'] and 'm' not in exclude_types:
         logger.debug("generating combined metrics file")
         path = os.path.join(project_path, 'metrics')
         combined_paths.append(
-            bripipetools.postprocessing.OutputStitcher(path).write_table())
+            bripipetools.postprocessing.OutputStitcher(
+                path, table_format=table_format,
+                incremental=incremental).write_table())
 
     if output_type in ['q', 'a'] and 'q' not in exclude_types:
         logger.debug("generating combined QC file(s)")
         path = os.path.join(project_path, 'QC')
-        bripipetools.postprocessing.OutputStitcher(
-            path).write_overrepresented_seq_table()
-        combined_paths.append(
-            bripipetools.postprocessing.OutputStitcher(path).write_table())
+        qc_path, overrep_path = bripipetools.postprocessing.OutputStitcher(
+            path, table_format=table_format,
+            incremental=incremental).write_qc_tables()
+        combined_paths.append(qc_path)
 
     if output_type in ['v', 'a'] and 'v' not in exclude_types:
         logger.debug("generating combined validation file(s)")
         path = os.path.join(project_path, 'validation')
     try:
         combined_paths.append(
-            bripipetools.postprocessing.OutputStitcher(path).write_table()
+            bripipetools.postprocessing.OutputStitcher(
+                path, table_format=table_format,
+                incremental=incremental).write_table()
         )
     except OSError:
         logger.warning(("no validation files found "
@@ -93,10 +105,14 @@ def postprocess_project(output_type, exclude_types, stitch_only, clean_outputs,
                 .format(project_path_short, output_type))
 
     if not stitch_only:
-        bripipetools.postprocessing.OutputCompiler(combined_paths).write_table()
+        bripipetools.postprocessing.OutputCompiler(
+            combined_paths, table_format=table_format).write_table()
         logger.info("Merged all combined summary data tables for '{}'"
                     .format(project_path_short))
 
+    if logger.isEnabledFor(logging.DEBUG):
+        bripipetools.io.parser_registry.report()
+
 @click.group()
 @click.option('--quiet', 'verbosity', flag_value='quiet',
               help=("only display printed outputs in the console - "
@@ -144,13 +160,34 @@ def main(verbosity):
 @click.option('--tag', '-t', default='',
               help=("for custom sample submissions, tag for labelling "
                     "processed outputs"))
+@click.option('--plan', '-p', default=None,
+              type=click.Path(exists=True, dir_okay=False),
+              help=("JSON or YAML file with rules assigning workflows, "
+                    "builds, and strandedness to projects (or sample "
+                    "folders); batches are created without prompts"))
+@click.option('--assign', '-a', multiple=True,
+              help=("assign a workflow and build to projects matching a "
+                    "pattern, formatted as '<project pattern>,<workflow>,"
+                    "<build>[,stranded]'; can be repeated, and is applied "
+                    "after any rules in '--plan'"))
 @click.argument('path')
 def submit(endpoint, workflow_dir, all_workflows, sort_samples, num_samples,
-           manifest, out_dir, tag, path):
+           manifest, out_dir, tag, plan, assign, path):
     """
     Prepare batch submission for unaligned samples from a flowcell run
     or from a list of paths in a manifest file.
     """
+    batch_plan = None
+    if plan is not None or assign:
+        rules = []
+        if plan is not None:
+            rules += bripipetools.submission.BatchPlan.from_file(plan).rules
+        if assign:
+            rules += bripipetools.submission.BatchPlan.from_assignments(
+                assign
+            ).rules
+        batch_plan = bripipetools.submission.BatchPlan(rules)
+
     if not manifest:
         logger.info("Creating batches for unaligned samples and projects "
                     "from flowcell run '{}'".format(path))
@@ -163,7 +200,8 @@ def submit(endpoint, workflow_dir, all_workflows, sort_samples, num_samples,
             endpoint=endpoint,
             db=RDB,
             workflow_dir=workflow_dir,
-            all_workflows=all_workflows
+            all_workflows=all_workflows,
+            plan=batch_plan
         )
         submit_paths = submitter.run(sort=sort_samples,
                                      num_samples=num_samples)
@@ -182,7 +220,8 @@ def submit(endpoint, workflow_dir, all_workflows, sort_samples, num_samples,
             endpoint=endpoint,
             workflow_dir=workflow_dir,
             all_workflows=all_workflows,
-            tag=tag
+            tag=tag,
+            plan=batch_plan
         )
         submit_paths = submitter.run()
 
@@ -205,8 +244,11 @@ def submit(endpoint, workflow_dir, all_workflows, sort_samples, num_samples,
 @click.option('--workflow-dir', default='/mnt/bioinformatics/pipeline/galaxy_workflows',
               help=("path to folder containing .ga Galaxy workflow "
                     "files to be used for batch processing"))
+@click.option('--force/--skip-unchanged', default=False,
+              help=("re-import all libraries, including those with inputs "
+                    "unchanged since the last import"))
 @click.argument('path')
-def dbify(sexmodel, sexcutoff, workflow_dir, path):
+def dbify(sexmodel, sexcutoff, workflow_dir, force, path):
     """
     Import data from a flowcell run or workflow processing batch into
     research database.
@@ -218,11 +260,24 @@ def dbify(sexmodel, sexcutoff, workflow_dir, path):
         db=RDB,
         run_opts = {"sexmodel":sexmodel, 
                     "sexcutoff":sexcutoff,
-                    "workflow_dir":workflow_dir}
+                    "workflow_dir":workflow_dir},
+        force=force
     )
     importer.run(collections='all')
     logger.info("Import complete.")
 
+@main.command('index-workflows')
+@click.argument('workflow_dir',
+                default='/mnt/bioinformatics/pipeline/galaxy_workflows')
+def index_workflows(workflow_dir):
+    """
+    Precompute the names and tool versions of all .ga Galaxy workflow
+    files in a folder, used to annotate workflow batches without
+    re-reading the workflow files.
+    """
+    index_path = bripipetools.io.workflow_cache.build_index(workflow_dir)
+    logger.info("Workflow index written to '{}'".format(index_path))
+
 @main.command()
 @click.option('--sexmodel', default='y_sq_over_tot',
               help=("The model for determining the gender based on "
@@ -267,12 +322,25 @@ def qc(sexmodel, sexcutoff, path):
                     "the project level"))
 @click.option('--clean-outputs/--outputs-as-is', default=False,
               help="Attempt to clean/organize output files")
+@click.option('--clean-dry-run', is_flag=True,
+              help=("report how output files would be cleaned/organized, "
+                    "without changing any files"))
 @click.option('--all-workflows/--optimized-only', default=False,
               help=("indicate whether to include all detected workflows "
                     "as options or to keep 'optimized' workflows only"))
+@click.option('--format', 'table_format', default='csv',
+              type=click.Choice(['csv', 'parquet', 'feather', 'hdf5']),
+              help=("file format for combined tables; 'parquet' and "
+                    "'feather' require 'pyarrow', and 'hdf5' (used for "
+                    "counts only) requires 'tables'"))
+@click.option('--incremental/--rebuild', default=False,
+              help=("only parse outputs added or changed since combined "
+                    "tables were last written (recording table sources "
+                    "in a manifest file), or rebuild tables from all "
+                    "outputs (default)"))
 @click.argument('path')
 def postprocess(output_type, exclude_types, stitch_only, clean_outputs, 
-                all_workflows, path):
+                clean_dry_run, all_workflows, table_format, incremental, path):
     """
     Perform postprocessing operations on outputs of a workflow batch.
     """
@@ -320,7 +388,8 @@ def postprocess(output_type, exclude_types, stitch_only, clean_outputs,
         logger.info("No problem outputs found with any workflow batches.")
     
     postprocess_project(output_type, exclude_types, stitch_only,
-                        clean_outputs, path)
+                        clean_outputs, path, table_format, incremental,
+                        clean_dry_run)
 
 
 @main.command()
@@ -340,6 +409,9 @@ def postprocess(output_type, exclude_types, stitch_only, clean_outputs,
                     "the project level"))
 @click.option('--clean-outputs/--outputs-as-is', default=False,
               help="Attempt to clean/organize output files")
+@click.option('--clean-dry-run', is_flag=True,
+              help=("report how output files would be cleaned/organized, "
+                    "without changing any files"))
 @click.option('--sexmodel', default='y_sq_over_tot',
               help=("The model for determining the gender based on "
                 "X and Y chromosome reads. Possible options are:\n"
@@ -358,14 +430,31 @@ def postprocess(output_type, exclude_types, stitch_only, clean_outputs,
 @click.option('--database-type', default='all',
               help=("Database to contain sample information. Options are:\n"
               "\'all\'\n\'allButCounts\'\n\'none\'"))
+@click.option('--format', 'table_format', default='csv',
+              type=click.Choice(['csv', 'parquet', 'feather', 'hdf5']),
+              help=("file format for combined tables; 'parquet' and "
+                    "'feather' require 'pyarrow', and 'hdf5' (used for "
+                    "counts only) requires 'tables'"))
+@click.option('--incremental/--rebuild', default=False,
+              help=("only parse outputs added or changed since combined "
+                    "tables were last written (recording table sources "
+                    "in a manifest file), or rebuild tables from all "
+                    "outputs (default)"))
 @click.argument('path')
-def wrapup(output_type, exclude_types, stitch_only, clean_outputs, sexmodel, 
-           sexcutoff, all_workflows, workflow_dir, database_type, path):
+def wrapup(output_type, exclude_types, stitch_only, clean_outputs,
+           clean_dry_run, sexmodel, sexcutoff, all_workflows, workflow_dir,
+           database_type, table_format, incremental, path):
     """
     Perform 'dbification' and 'postprocessing' operations on all projects and
     workflow batches from a flowcell run.
     """
-    
+    run_opts = {"sexmodel":sexmodel,
+                "sexcutoff":sexcutoff,
+                "workflow_dir":workflow_dir}
+    # workflow batch files and annotators are shared by all steps below,
+    # so each batch file is read and each batch looked up only once
+    context = bripipetools.annotation.RunContext(db=RDB, run_opts=run_opts)
+
     # Push data into ResDB                   
     if (database_type in ['allButCounts', 'all']):
         logger.info("Importing raw data for flowcell at path '{}' into ResDB"
@@ -373,9 +462,8 @@ def wrapup(output_type, exclude_types, stitch_only, clean_outputs, sexmodel,
         bripipetools.dbification.ImportManager(
             path=path,
             db=RDB,
-            run_opts = {"sexmodel":sexmodel, 
-                        "sexcutoff":sexcutoff,
-                        "workflow_dir":workflow_dir}
+            run_opts=run_opts,
+            context=context
         ).run(collections=database_type) #run(collections='all')
         logger.info("Research Database flowcell run import complete.")
 
@@ -401,7 +489,8 @@ def wrapup(output_type, exclude_types, stitch_only, clean_outputs, sexmodel,
         logger.debug("checking outputs for workflow batch in file '{}'"
                      .format(wb))
         wb_outputs = bripipetools.monitoring.WorkflowBatchMonitor(
-            workflowbatch_file=wb, pipeline_root=pipeline_root
+            workflowbatch_file=wb, pipeline_root=pipeline_root,
+            reader=context.get_batch_file(wb)
         ).check_outputs()
 
         problem_outputs = [x for x in list(wb_outputs.items()) if x[1]['status'] != 'ok']
@@ -436,9 +525,8 @@ def wrapup(output_type, exclude_types, stitch_only, clean_outputs, sexmodel,
             bripipetools.dbification.ImportManager(
                 path=wb,
                 db=RDB,
-                run_opts = {"sexmodel":sexmodel, 
-                            "sexcutoff":sexcutoff,
-                            "workflow_dir": workflow_dir}
+                run_opts=run_opts,
+                context=context
             ).run(collections='all')
             logger.info("ResDB workflow batch import for '{}' complete."
                         .format(os.path.basename(wb)))
@@ -451,7 +539,8 @@ def wrapup(output_type, exclude_types, stitch_only, clean_outputs, sexmodel,
     logger.info("Postprocessing flowcell projects.")
     for pp in processed_projects:
         postprocess_project(output_type, exclude_types, stitch_only,
-                            clean_outputs, pp)
+                            clean_outputs, pp, table_format, incremental,
+                            clean_dry_run)
     logger.info("Project postprocessing complete.")
 
 if __name__ == "__main__":
@@ -15,4 +15,5 @@ from .librarymetrics import LibraryMetricsAnnotator
 from .flowcellruns import FlowcellRunAnnotator
 from .processedlibs import ProcessedLibraryAnnotator
 from .workflowbatches import WorkflowBatchAnnotator
+from .runcontext import RunContext
 
@@ -19,12 +19,15 @@ logger = logging.getLogger(__name__)
 class FlowcellRunAnnotator(object):
     """
     Identifies, stores, and updates information about a flowcell run.
+    If a change tracker is provided, libraries whose source files
+    haven't changed since the last import are skipped.
     """
-    def __init__(self, run_id, pipeline_root, db):
+    def __init__(self, run_id, pipeline_root, db, tracker=None):
         logger.debug("creating `FlowcellRunAnnotator` instance for run ID '{}'"
                      .format(run_id))
         self.run_id = run_id
         self.db = db
+        self.tracker = tracker
         self.flowcellrun = self._init_flowcellrun()
 
         logger.debug("setting 'pipeline' path")
@@ -158,6 +161,30 @@ class FlowcellRunAnnotator(object):
                 for l in os.listdir(os.path.join(flowcell_path, p, sub_path))
                 if len(parsing.get_library_id(l))]
 
+    def _filter_changed(self, collection, libraries, path, by_library=False):
+        """
+        Remove libraries with unchanged source files from the list, if
+        a change tracker is set. Source files are either the contents of
+        the library folder under ``path`` or, if ``by_library`` is set,
+        files in ``path`` with names matching the library ID.
+        """
+        if self.tracker is None:
+            return libraries
+        flowcell_id = parsing.parse_flowcell_run_id(self.run_id)['flowcell_id']
+        changed = []
+        for l in libraries:
+            library_id = parsing.get_library_id(l)
+            seqlib_id = '{}_{}'.format(library_id, flowcell_id)
+            if by_library:
+                # anchored, so that e.g. 'lib1' doesn't match 'lib12'
+                source_path, pattern = path, '^{}_'.format(library_id)
+            else:
+                source_path, pattern = os.path.join(path, l), None
+            if self.tracker.source_changed(collection, seqlib_id,
+                                           source_path, pattern):
+                changed.append(l)
+        return changed
+
     def get_sequenced_libraries(self, project=None):
         """
         Collect sequenced library objects for flowcell run.
@@ -172,7 +199,10 @@ class FlowcellRunAnnotator(object):
         for p in projects:
             logger.info("getting sequenced libraries for project '{}'"
                         .format(p))
-            libraries = self.get_libraries(p)
+            libraries = self._filter_changed(
+                'genomicsSamples', self.get_libraries(p),
+                os.path.join(unaligned_path, p)
+            )
             sequencedlibraries += [SequencedLibraryAnnotator(
                         os.path.join(unaligned_path, p, l),
                         l, p, self.run_id, self.db
@@ -195,8 +225,11 @@ class FlowcellRunAnnotator(object):
         for p in projects:
             logger.info("getting library gene counts for project '{}'"
                         .format(p))
-            libraries = self.get_processed_libraries(p)
-            #logger.info("getting libraries '{}'".format(libraries))
+            libraries = self._filter_changed(
+                'genomicsCounts', self.get_processed_libraries(p),
+                os.path.join(self.get_flowcell_path(), p, 'counts'),
+                by_library=True
+            )
 
             librarygenecounts += [LibraryGeneCountAnnotator(
                         os.path.join(self.get_flowcell_path(), p),
@@ -221,8 +254,11 @@ class FlowcellRunAnnotator(object):
         for p in projects:
             logger.info("getting library metrics for project '{}'"
                         .format(p))
-            libraries = self.get_processed_libraries(p)
-            #logger.info("getting libraries '{}'".format(libraries))
+            libraries = self._filter_changed(
+                'genomicsMetrics', self.get_processed_libraries(p),
+                os.path.join(self.get_flowcell_path(), p, 'metrics'),
+                by_library=True
+            )
 
             librarymetrics += [LibraryMetricsAnnotator(
                         os.path.join(self.get_flowcell_path(), p),
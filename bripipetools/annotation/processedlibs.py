@@ -80,17 +80,19 @@ class ProcessedLibraryAnnotator(object):
         """
         Organize outputs according to type and source.
         """
-        outputs = self._get_outputs()
+        outputs = {k: v for k, v in list(self._get_outputs().items())
+                   if 'fastq_' not in k}
+        output_files = util.get_root_rewriter('pipeline', '/').rewrite_all(
+            list(outputs.values()))
         grouped_outputs = {}
-        for k, v in list(outputs.items()):
-            if 'fastq_' not in k:
-                output_items = self._parse_output_name(k)
-                grouped_outputs.setdefault(
-                    output_items['type'], []
-                    ).append(
-                        {'source': output_items['source'],
-                         'file': util.swap_root(v, 'pipeline', '/'),
-                         'name': output_items['name']})
+        for k, output_file in zip(outputs, output_files):
+            output_items = self._parse_output_name(k)
+            grouped_outputs.setdefault(
+                output_items['type'], []
+                ).append(
+                    {'source': output_items['source'],
+                     'file': output_file,
+                     'name': output_items['name']})
         return grouped_outputs
 
     def _append_processed_data(self):
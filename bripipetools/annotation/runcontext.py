@@ -0,0 +1,76 @@
+"""
+Shared state for the steps (output checks, database imports) applied to
+the workflow batches of a flowcell run, so that each batch file is read
+and each workflow batch is looked up in the database only once.
+"""
+import logging
+import os
+import threading
+
+from .. import io
+from .workflowbatches import WorkflowBatchAnnotator
+
+logger = logging.getLogger(__name__)
+
+
+class RunContext(object):
+    """
+    Holds the parsed workflow batch files and workflow batch annotators
+    for a run, keyed by batch file path; these are created on first use
+    and reused by every monitor and importer given the context.
+
+    :type db: type[pymongo.database.Database]
+    :param db: database object used by annotators
+    :type run_opts: dict
+    :param run_opts: options passed to annotators (e.g., 'workflow_dir')
+    """
+    def __init__(self, db, run_opts):
+        logger.debug("creating `RunContext` instance")
+        self.db = db
+        self.run_opts = run_opts
+        self._batch_files = {}
+        self._annotators = {}
+        self._lock = threading.RLock()
+
+    def _get_key(self, path):
+        return os.path.normpath(path)
+
+    def get_batch_file(self, path):
+        """
+        Return the reader for a workflow batch file, with all lines of
+        the file read once.
+
+        :type path: str
+        :param path: path to workflow batch file
+        """
+        key = self._get_key(path)
+        with self._lock:
+            if key not in self._batch_files:
+                logger.debug("reading workflow batch file '{}'".format(key))
+                reader = io.WorkflowBatchFile(path, state='submit')
+                reader.load()
+                self._batch_files[key] = reader
+            return self._batch_files[key]
+
+    def get_annotator(self, path, pipeline_root):
+        """
+        Return the annotator for a workflow batch file; the workflow
+        batch is looked up in the database when the annotator is first
+        created.
+
+        :type path: str
+        :param path: path to workflow batch file
+        :type pipeline_root: str
+        :param pipeline_root: path to the root directory for processing
+        """
+        key = self._get_key(path)
+        with self._lock:
+            if key not in self._annotators:
+                self._annotators[key] = WorkflowBatchAnnotator(
+                    workflowbatch_file=path,
+                    pipeline_root=pipeline_root,
+                    db=self.db,
+                    run_opts=self.run_opts,
+                    reader=self.get_batch_file(path)
+                )
+            return self._annotators[key]
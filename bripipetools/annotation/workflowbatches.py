@@ -21,18 +21,26 @@ logger = logging.getLogger(__name__)
 class WorkflowBatchAnnotator(object):
     """
     Identifies, stores, and updates information about a workflow batch.
+    A reader for the batch file can be provided (e.g., shared through a
+    ``RunContext``); otherwise, one is created.
     """
-    def __init__(self, workflowbatch_file, pipeline_root, db, run_opts):
+    def __init__(self, workflowbatch_file, pipeline_root, db, run_opts,
+                 reader=None):
         logger.debug("creating `WorkflowBatchAnnotator` for '{}'"
                      .format(workflowbatch_file))
         self.workflowbatch_file = workflowbatch_file
         self.db = db
         self.run_opts = run_opts
 
-        self.workflowbatch_data = io.WorkflowBatchFile(
-            self.workflowbatch_file,
-            state='submit'
-            ).parse()
+        # only header lines are read here; samples are read lazily
+        if reader is None:
+            reader = io.WorkflowBatchFile(self.workflowbatch_file,
+                                          state='submit')
+        self.workflowbatch_reader = reader
+        self.workflowbatch_data = {
+            'workflow_name': self.workflowbatch_reader.get_workflow_name(),
+            'batch_name': self.workflowbatch_reader.get_batch_name()
+        }
         self.workflowbatch = self._init_workflowbatch()
         
         if ("workflow_dir" in self.run_opts):
@@ -42,9 +50,8 @@ class WorkflowBatchAnnotator(object):
                 self.workflow_dir, 
                 self.workflowbatch_data['workflow_name']+".ga"
             )
-            self.workflow_data = io.WorkflowFile(
-                self.workflow_file
-            ).parse()
+            io.workflow_cache.load_index(self.workflow_dir)
+            self.workflow_data = io.workflow_cache.get(self.workflow_file)
 
         logger.debug("setting 'pipeline' path")
         self.pipeline_root = pipeline_root
@@ -123,10 +130,8 @@ class WorkflowBatchAnnotator(object):
         Collect list of sequenced libraries processed as part of
         workflow batch.
         """
-        return [p['value']
-                for s in self.workflowbatch_data['samples']
-                for p in s
-                if p['name'] == 'SampleName']
+        return [sample_name for sample_name, sample_outputs
+                in self.workflowbatch_reader.iter_outputs()]
 
     def _check_sex(self, processedlibrary):
         """
@@ -153,6 +158,17 @@ class WorkflowBatchAnnotator(object):
     def _run_qc(self, processedlibrary):
         return self._check_sex(processedlibrary)
 
+    def _get_sample_params(self, sample_name, sample_outputs):
+        """
+        Return the sample name and output parameters for a sample, as
+        used to annotate its processed library.
+        """
+        return ([{'tag': 'SampleName', 'type': 'sample',
+                  'name': 'SampleName', 'value': sample_name}]
+                + [{'tag': tag, 'type': 'output', 'name': 'to_path',
+                    'value': path}
+                   for tag, path in list(sample_outputs.items())])
+
     def get_processed_libraries(self, project=None, qc=False):
         """
         Collect processed library objects for workflow batch.
@@ -161,13 +177,15 @@ class WorkflowBatchAnnotator(object):
         logger.debug("getting processed libraries for workflow batch '{}'"
                      .format(workflowbatch_id))
 
-        return [
-            ProcessedLibraryAnnotator(
-                workflowbatch_id, sample_params, self.db
+        processedlibraries = []
+        for sample_name, sample_outputs in \
+                self.workflowbatch_reader.iter_outputs():
+            processedlibrary = ProcessedLibraryAnnotator(
+                workflowbatch_id,
+                self._get_sample_params(sample_name, sample_outputs),
+                self.db
             ).get_processed_library()
-            if not qc else self._run_qc(
-                ProcessedLibraryAnnotator(
-                    workflowbatch_id, sample_params, self.db
-                ).get_processed_library()
-            ) for sample_params in self.workflowbatch_data['samples']
-            ]
+            if qc:
+                processedlibrary = self._run_qc(processedlibrary)
+            processedlibraries.append(processedlibrary)
+        return processedlibraries
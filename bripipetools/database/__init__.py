@@ -8,10 +8,23 @@ from/to commonly used database collections, while ``database.mapping``
 helps to construct Python ``model`` class objects from database
 documents. Methods in the ``database.connection`` module manage the
 database connection, depending on environment and configurations.
+The ``database.buffering`` module provides a write-behind buffer for
+collecting documents and writing them to the database in bulk, and
+``database.asyncops`` provides asyncio-based equivalents of the basic
+operations (using motor, if installed). The ``database.localdb`` and
+``database.profiling`` modules provide a file-based stand-in for
+offline use and a wrapper for recording operation counts and latency,
+selected through the database configuration.
 """
-from .connection import connect
-from .operations import (find_objects, insert_objects,
-                         get_genomicsSamples, get_genomicsCounts, get_genomicsMetrics, get_genomicsRuns, get_genomicsWorkflowbatches,
-                         put_genomicsSamples, put_genomicsCounts, put_genomicsMetrics, put_genomicsRuns, put_genomicsWorkflowbatches,
+from .connection import connect, get_db_params
+from .operations import (VOLATILE_FIELDS, UpdateRequest, find_objects, insert_objects, plan_update, plan_updates,
+                         get_genomicsSamples, get_genomicsCounts, get_genomicsMetrics, get_genomicsRuns, get_genomicsWorkflowbatches, get_genomicsFingerprints,
+                         put_genomicsSamples, put_genomicsCounts, put_genomicsMetrics, put_genomicsRuns, put_genomicsWorkflowbatches, put_genomicsFingerprints,
                          create_workflowbatch_id, search_ancestors)
-from .mapping import (map_keys, get_model_class, map_to_object)
\ No newline at end of file
+from .mapping import (map_keys, get_model_class, map_to_object)
+from .buffering import BufferedWriter
+from .localdb import LocalDatabase
+from .profiling import ProfiledDatabase
+from .asyncops import (connect_async, AsyncDatabase, AsyncWriter,
+                       find_async, insert_async,
+                       find_objects_async, insert_objects_async)
@@ -0,0 +1,321 @@
+"""
+Asyncio-based operations for BRI Mongo databases. Uses the motor client
+library when it is installed; any synchronous database object (e.g., a
+pymongo or mongomock database) can also be used through
+``AsyncDatabase``, which runs operations in a thread pool.
+"""
+import logging
+import asyncio
+import concurrent.futures
+import threading
+from functools import wraps, partial
+from collections import OrderedDict
+
+from .connection import get_db_params
+from .operations import UpdateRequest, plan_updates
+
+try:
+    import motor.motor_asyncio as motor
+except ImportError:
+    motor = None
+
+logger = logging.getLogger(__name__)
+
+
+def connect_async(db_config_name):
+    """
+    Connect to the target database with an asyncio (motor) client,
+    using the same parameters as ``connect``.
+
+    :type db_config_name: str
+    :param db_config_name: name of the section in the property file
+        with parameters for the target database
+
+    :return: A motor database object.
+    """
+    if motor is None:
+        logger.error("the 'motor' package is required for asyncio "
+                     "database connections")
+        raise ImportError("No module named 'motor'")
+    db_params = get_db_params(db_config_name)
+    db_name = db_params['db_name']
+
+    logger.info("Connecting (async) to database '{}' on host '{}'."
+                .format(db_name, db_params['db_host']))
+    if 'user' in db_params:
+        client = motor.AsyncIOMotorClient(db_params['db_host'], 27017,
+                                          username=db_params['user'],
+                                          password=db_params['password'],
+                                          authSource=db_name)
+    else:
+        client = motor.AsyncIOMotorClient(db_params['db_host'], 27017)
+
+    return client[db_name]
+
+
+class _AsyncCursor(object):
+    """
+    Minimal motor-style cursor for ``AsyncDatabase`` collections.
+    """
+    def __init__(self, collection, query, executor):
+        self._collection = collection
+        self._query = query
+        self._executor = executor
+
+    async def to_list(self, length=None):
+        def find():
+            docs = list(self._collection.find(self._query))
+            return docs if length is None else docs[:length]
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, find)
+
+
+class _AsyncCollection(object):
+    """
+    Minimal motor-style collection for ``AsyncDatabase``.
+    """
+    def __init__(self, collection, executor):
+        self._collection = collection
+        self._executor = executor
+
+    def find(self, query):
+        return _AsyncCursor(self._collection, query, self._executor)
+
+    async def bulk_write(self, requests, ordered=True):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            partial(self._collection.bulk_write, requests, ordered=ordered)
+        )
+
+
+class AsyncDatabase(object):
+    """
+    Wraps a synchronous database object (e.g., from ``connect`` or
+    mongomock) to provide the subset of the motor API used by async
+    operations, running each operation in a thread pool. Call ``close``
+    (or use as a context manager) to shut down the thread pool.
+
+    :type db: type[pymongo.database.Database]
+    :param db: database object for current MongoDB connection
+
+    :type max_workers: int
+    :param max_workers: maximum number of operations run concurrently
+    """
+    def __init__(self, db, max_workers=32):
+        logger.debug("creating `AsyncDatabase` instance for database '{}'"
+                     .format(db.name))
+        self.db = db
+        self.name = db.name
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers
+        )
+
+    def __getitem__(self, collection):
+        return _AsyncCollection(self.db[collection], self._executor)
+
+    def close(self):
+        """
+        Wait for any running operations and shut down the thread pool.
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+async def find_async(db, collection, query):
+    """
+    Return list of documents from the specified collection based on
+    query.
+
+    :type db: type[motor.motor_asyncio.AsyncIOMotorDatabase]
+    :param db: motor database object or ``AsyncDatabase``
+
+    :type collection: str
+    :param collection: string indicating the name of the collection
+
+    :type query: dict
+    :param query: MongoDB query document
+    """
+    logger.debug("searching '{}' collection with query '{}'"
+                 .format(collection, query))
+    return await db[collection].find(query).to_list(length=None)
+
+
+async def insert_async(db, collection, objects):
+    """
+    Insert or update one or more objects in the specified collection
+    with a single unordered bulk write, including only fields that
+    differ from the stored documents (as with ``insert_objects``).
+
+    :type db: type[motor.motor_asyncio.AsyncIOMotorDatabase]
+    :param db: motor database object or ``AsyncDatabase``
+
+    :type collection: str
+    :param collection: string indicating the name of the collection
+
+    :type objects: dict, list
+    :param objects: a dict or list of dicts representing documents,
+        each with an '_id' field
+
+    :rtype: int
+    :return: number of documents written
+    """
+    objects = [objects] if not isinstance(objects, list) else objects
+    current = {d['_id']: d for d in await find_async(
+        db, collection, {'_id': {'$in': [o['_id'] for o in objects]}}
+    )}
+    ops = [UpdateRequest({'_id': _id}, update, upsert=True)
+           for _id, update in plan_updates(current, objects)]
+    logger.debug("writing {} of {} document(s) to '{}' collection"
+                 .format(len(ops), len(objects), collection))
+    if len(ops):
+        await db[collection].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def find_objects_async(collection):
+    """
+    Return a decorator that retrieves objects from the specified
+    collection as a coroutine, given an async db connection and query.
+
+    :type collection: str
+    :param collection: String indicating the name of the collection
+    """
+    def decorator(f):
+        @wraps(f)
+        async def wrapper(*args):
+            db, query = f(*args)
+            return await find_async(db, collection, query)
+        return wrapper
+    return decorator
+
+
+def insert_objects_async(collection):
+    """
+    Return a decorator that inserts one or more objects into the
+    specified collection as a coroutine; if object exists, updates
+    any changed fields that are not empty in the input object.
+
+    :type collection: str
+    :param collection: string indicating the name of the collection
+    """
+    def decorator(f):
+        @wraps(f)
+        async def wrapper(*args):
+            db, objects = f(*args)
+            return await insert_async(db, collection, objects)
+        return wrapper
+    return decorator
+
+
+class AsyncWriter(object):
+    """
+    Schedules inserts on an event loop from synchronous code running in
+    other threads (e.g., importers run in an executor), so that many
+    writes can be in flight at once. Documents are collected per
+    collection and written in batches, with one lookup and one bulk
+    write per batch. Provides the same ``put`` and ``flush`` interface
+    (and coalescing of repeated updates to the same object) as
+    ``BufferedWriter``.
+
+    :type db: type[motor.motor_asyncio.AsyncIOMotorDatabase]
+    :param db: motor database object or ``AsyncDatabase``
+
+    :type loop: type[asyncio.AbstractEventLoop]
+    :param loop: running event loop on which writes are scheduled
+
+    :type max_in_flight: int
+    :param max_in_flight: maximum number of writes in progress at once
+
+    :type max_docs: int
+    :param max_docs: number of pending (coalesced) documents for a
+        collection that triggers a batch write
+    """
+    def __init__(self, db, loop, max_in_flight=200, max_docs=500):
+        logger.debug("creating `AsyncWriter` instance for database '{}'"
+                     .format(db.name))
+        self.db = db
+        self.loop = loop
+        self.max_docs = max_docs
+        self.written = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._pending = OrderedDict()
+        self._futures = []
+        self._lock = threading.Lock()
+
+    async def _insert(self, collection, objects):
+        async with self._semaphore:
+            written = await insert_async(self.db, collection, objects)
+        self.written += written
+
+    def _schedule(self, collection, docs):
+        """
+        Schedule a batch write of pending documents for a collection.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._insert(collection, [dict(fields, _id=_id)
+                                      for _id, fields in list(docs.items())]),
+            self.loop
+        )
+        with self._lock:
+            self._futures.append(future)
+
+    def _schedule_pending(self):
+        """
+        Schedule batch writes of all pending documents and return the
+        futures for every write scheduled so far.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+        for collection, docs in list(pending.items()):
+            self._schedule(collection, docs)
+        with self._lock:
+            futures, self._futures = self._futures, []
+        return futures
+
+    def put(self, collection, objects):
+        """
+        Add one or more documents to the pending batch for the specified
+        collection, scheduling a batch write once the batch is full.
+
+        :type collection: str
+        :param collection: string indicating the name of the collection
+
+        :type objects: dict, list
+        :param objects: a dict or list of dicts representing documents,
+            each with an '_id' field
+        """
+        objects = [objects] if not isinstance(objects, list) else objects
+        with self._lock:
+            docs = self._pending.setdefault(collection, OrderedDict())
+            for o in objects:
+                docs.setdefault(o['_id'], {}).update(
+                    {k: v for k, v in list(o.items())
+                     if v is not None and k != '_id'}
+                )
+            if len(docs) < self.max_docs:
+                return
+            del self._pending[collection]
+        self._schedule(collection, docs)
+
+    def flush(self):
+        """
+        Write all pending documents and block until every write has
+        completed; raise the first error encountered, if any. Must not
+        be called from the event loop thread.
+        """
+        for future in self._schedule_pending():
+            future.result()
+
+    async def drain(self):
+        """
+        Write all pending documents and wait (asynchronously) for every
+        write to complete; raise the first error encountered, if any.
+        """
+        for future in self._schedule_pending():
+            await asyncio.wrap_future(future)
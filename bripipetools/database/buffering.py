@@ -0,0 +1,198 @@
+"""
+Write-behind buffering for inserts into BRI Mongo databases.
+"""
+import logging
+import threading
+import time
+import queue
+from collections import OrderedDict
+
+from .operations import UpdateRequest, plan_updates
+
+logger = logging.getLogger(__name__)
+
+_FLUSH = object()
+_STOP = object()
+
+
+class BufferedWriter(object):
+    """
+    Collects documents destined for one or more collections and writes
+    them in bulk from a background thread, so that building documents
+    (parsing, annotation) and writing them to the database can overlap.
+    Repeated updates to the same object (collection and '_id') are
+    coalesced into a single write; later non-empty fields take
+    precedence over earlier ones, and only fields that differ from the
+    stored documents are written, consistent with ``insert_objects``.
+
+    :type db: type[pymongo.database.Database]
+    :param db: database object for current MongoDB connection
+
+    :type max_docs: int
+    :param max_docs: number of pending (coalesced) documents that
+        triggers a bulk write
+
+    :type flush_interval: float
+    :param flush_interval: maximum number of seconds a document is
+        held in the buffer before being written
+    """
+    def __init__(self, db, max_docs=500, flush_interval=2.0):
+        logger.debug("creating `BufferedWriter` instance for database '{}'"
+                     .format(db.name))
+        self.db = db
+        self.max_docs = max_docs
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._queue = queue.Queue()
+        self._pending = OrderedDict()
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._consume,
+                                        name='BufferedWriter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _check_error(self):
+        """
+        Re-raise any exception encountered by the flush thread in the
+        calling thread.
+        """
+        if self._error is not None:
+            raise self._error
+
+    def _coalesce(self, collection, doc):
+        """
+        Merge non-empty fields of the document into any pending update
+        for the same object.
+        """
+        fields = self._pending.setdefault((collection, doc['_id']), {})
+        fields.update({k: v for k, v in list(doc.items())
+                       if v is not None and k != '_id'})
+
+    def _write_pending(self):
+        """
+        Write all pending updates with one unordered bulk operation per
+        collection, including only fields that differ from the stored
+        documents.
+        """
+        if not len(self._pending):
+            return
+        pending = OrderedDict()
+        for (collection, _id), fields in list(self._pending.items()):
+            pending.setdefault(collection, OrderedDict())[_id] = fields
+        self._pending = OrderedDict()
+        for collection, docs in list(pending.items()):
+            current = {d['_id']: d for d in self.db[collection].find(
+                {'_id': {'$in': list(docs.keys())}}
+            )}
+            ops = [UpdateRequest({'_id': _id}, update, upsert=True)
+                   for _id, update in plan_updates(
+                       current,
+                       [dict(fields, _id=_id)
+                        for _id, fields in list(docs.items())]
+                   )]
+            logger.debug("writing {} of {} document(s) to '{}' collection"
+                         .format(len(ops), len(docs), collection))
+            if len(ops):
+                self.db[collection].bulk_write(ops, ordered=False)
+                self.written += len(ops)
+
+    def _consume(self):
+        """
+        Pull documents from the queue and write them whenever the buffer
+        is full, the flush interval has elapsed, or a flush is requested.
+        """
+        last_flush = time.time()
+        while True:
+            timeout = max(0.0, self.flush_interval
+                          - (time.time() - last_flush))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                try:
+                    if self._error is None:
+                        self._write_pending()
+                except Exception as e:
+                    logger.exception("buffered write to database '{}' failed"
+                                     .format(self.db.name))
+                    self._error = e
+                finally:
+                    self._queue.task_done()
+                break
+
+            try:
+                if item is not None and item is not _FLUSH \
+                        and self._error is None:
+                    self._coalesce(*item)
+                if (item is _FLUSH
+                        or len(self._pending) >= self.max_docs
+                        or time.time() - last_flush >= self.flush_interval):
+                    if self._error is None:
+                        self._write_pending()
+                    last_flush = time.time()
+            except Exception as e:
+                logger.exception("buffered write to database '{}' failed"
+                                 .format(self.db.name))
+                self._error = e
+                self._pending = OrderedDict()
+            finally:
+                if item is not None:
+                    self._queue.task_done()
+
+    def put(self, collection, objects):
+        """
+        Add one or more documents to the buffer for the specified
+        collection.
+
+        :type collection: str
+        :param collection: string indicating the name of the collection
+
+        :type objects: dict, list
+        :param objects: a dict or list of dicts representing documents,
+            each with an '_id' field
+        """
+        self._check_error()
+        if self._closed:
+            raise ValueError("cannot add documents to a closed writer")
+        objects = [objects] if not isinstance(objects, list) else objects
+        for o in objects:
+            self._queue.put((collection, o))
+
+    def flush(self):
+        """
+        Block until every document added so far has been written.
+        """
+        if not self._closed:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+        self._check_error()
+
+    def close(self):
+        """
+        Write any remaining documents and stop the flush thread;
+        raise the first error encountered while writing, if any.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+            logger.debug("buffered writer wrote {} document(s) in total"
+                         .format(self.written))
+        self._check_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # don't mask the original error with a secondary write error
+            try:
+                self.close()
+            except Exception:
+                logger.exception("error while closing buffered writer")
+        return False
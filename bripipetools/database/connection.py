@@ -4,10 +4,14 @@ Connect to a BRI Mongo database.
 import logging
 from logging.config import fileConfig
 import os
+import atexit
 import configparser
 
 import pymongo
 
+from .localdb import LocalDatabase
+from .profiling import ProfiledDatabase
+
 config_path = os.path.join(
     os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
     'config'
@@ -17,13 +21,18 @@ fileConfig(os.path.join(config_path, 'logging_config.ini'),
 logger = logging.getLogger(__name__)
 
 
-def connect(db_config_name):
+def get_db_params(db_config_name):
     """
     Check the current environment to determine which database
-    parameters to use, then connect to the target database on the
-    specified host.
+    parameters to use and read them from the property file.
 
-    :return: A database connection object.
+    :type db_config_name: str
+    :param db_config_name: name of the section in the property file
+        with parameters for the target database
+
+    :rtype: dict
+    :return: a dict with the database backend, host, name, and (if
+        provided) username, password, and local database path
     """
     config_path = os.path.join(
         os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
@@ -42,21 +51,74 @@ def connect(db_config_name):
     property_path = os.path.join(config_path, property_file)
     with open(property_path) as f:
         config.read_file(f)
-    db_host = config.get(db_config_name, 'db_host')
-    db_name = config.get(db_config_name, 'db_name')
-
-    logger.info("Connecting to database '{}' on host '{}'."
-                .format(db_name, db_host))
-    client = pymongo.MongoClient(db_host, 27017)
-
+    db_params = {
+        'db_backend': config.get(db_config_name, 'db_backend',
+                                 fallback='mongo'),
+        'db_host': config.get(db_config_name, 'db_host', fallback=None),
+        'db_name': config.get(db_config_name, 'db_name'),
+        'db_path': config.get(db_config_name, 'db_path', fallback=None),
+        'profile': config.getboolean(db_config_name, 'profile',
+                                     fallback=False)
+    }
     try:
-        logger.info("Authenticating database '{}'.".format(db_name))
-        client[db_name].authenticate(config.get(db_config_name, 'user'),
-                                     config.get(db_config_name, 'password'))
+        # read both values before setting either, so that credentials
+        # are only used if complete
+        user = config.get(db_config_name, 'user')
+        password = config.get(db_config_name, 'password')
+        db_params['user'] = user
+        db_params['password'] = password
     except configparser.NoOptionError:
         logger.info("No username/password provided; "
                     "attempting to connect anyway.")
 
-    return client[db_name]
+    return db_params
+
+
+def connect(db_config_name):
+    """
+    Check the current environment to determine which database
+    parameters to use, then connect to the target database on the
+    specified host. The 'db_backend' parameter selects a MongoDB
+    server ('mongo', default), an in-memory mock database ('mongomock'),
+    or a folder of JSON-lines files at 'db_path' ('local'); if
+    'profile' is set, operation counts and latency are recorded and
+    reported on exit.
+
+    :return: A database connection object.
+    """
+    db_params = get_db_params(db_config_name)
+    db_backend = db_params['db_backend']
+    db_host = db_params['db_host']
+    db_name = db_params['db_name']
+
+    if db_backend == 'local':
+        db_path = os.path.abspath(os.path.expanduser(db_params['db_path']))
+        logger.info("Connecting to local database '{}' in '{}'."
+                    .format(db_name, db_path))
+        db = LocalDatabase(db_path, db_name)
+    elif db_backend == 'mongomock':
+        import mongomock
+        logger.info("Connecting to mock database '{}'.".format(db_name))
+        db = mongomock.MongoClient()[db_name]
+    elif db_backend == 'mongo':
+        logger.info("Connecting to database '{}' on host '{}'."
+                    .format(db_name, db_host))
+        client = pymongo.MongoClient(db_host, 27017)
+
+        if 'user' in db_params:
+            logger.info("Authenticating database '{}'.".format(db_name))
+            client[db_name].authenticate(db_params['user'],
+                                         db_params['password'])
+        db = client[db_name]
+    else:
+        logger.error("unknown database backend '{}'".format(db_backend))
+        raise ValueError("unknown database backend '{}'".format(db_backend))
+
+    if db_params['profile']:
+        logger.info("Profiling operations on database '{}'.".format(db_name))
+        db = ProfiledDatabase(db)
+        atexit.register(db.report)
+
+    return db
 
 # db = connect()
@@ -0,0 +1,280 @@
+"""
+File-based stand-in for a BRI Mongo database, for running imports
+offline (e.g., against staged flowcells) without a MongoDB server.
+"""
+import logging
+import os
+import re
+import json
+import copy
+import datetime
+import threading
+from collections import OrderedDict
+
+from .operations import UpdateRequest
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(obj):
+    """
+    Encode values not supported by JSON (datetimes) in extended JSON
+    style, so they can be restored when the documents are loaded.
+    """
+    if isinstance(obj, datetime.datetime):
+        return {'$date': obj.isoformat()}
+    raise TypeError("Object of type '{}' is not JSON serializable"
+                    .format(type(obj).__name__))
+
+
+def _decode(obj):
+    """
+    Restore values encoded by ``_encode`` when loading documents.
+    """
+    if len(obj) == 1 and '$date' in obj:
+        return datetime.datetime.fromisoformat(obj['$date'])
+    return obj
+
+
+def _get_field(doc, path):
+    """
+    Return the value of a (possibly dotted) field path in a document,
+    or None if the field doesn't exist.
+    """
+    for key in path.split('.'):
+        if not isinstance(doc, dict) or key not in doc:
+            return None
+        doc = doc[key]
+    return doc
+
+
+def _is_operator(condition):
+    """
+    Check whether a query condition uses operators (rather than
+    matching an embedded document).
+    """
+    return (isinstance(condition, dict)
+            and any(k.startswith('$') for k in condition))
+
+
+def _check_query(query):
+    """
+    Raise an error for query operators other than '$in' and '$regex',
+    rather than silently matching nothing.
+    """
+    for path, condition in list(query.items()):
+        if path.startswith('$'):
+            raise ValueError("unsupported query operator '{}'".format(path))
+        if not _is_operator(condition):
+            continue
+        for op in condition:
+            if op not in ['$in', '$regex']:
+                raise ValueError("unsupported query operator '{}'"
+                                 .format(op))
+
+
+def _matches(doc, query):
+    """
+    Check whether a document matches a query with equality, '$in', or
+    '$regex' conditions on (possibly dotted) field paths.
+    """
+    for path, condition in list(query.items()):
+        value = _get_field(doc, path)
+        if not _is_operator(condition):
+            if value != condition:
+                return False
+            continue
+        if '$in' in condition and value not in condition['$in']:
+            return False
+        if '$regex' in condition and (
+                not isinstance(value, str)
+                or not re.search(condition['$regex'], value)):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    """
+    Return a copy of a document with only the top-level fields included
+    in a projection (and '_id', unless excluded).
+    """
+    fields = [k for k, v in list(projection.items()) if v]
+    if '_id' not in projection or projection['_id']:
+        fields.append('_id')
+    return {k: copy.deepcopy(v) for k, v in list(doc.items())
+            if k in fields}
+
+
+def _apply_update(doc, update):
+    """
+    Apply '$set' and '$unset' operators (with dotted paths) to a
+    document in place.
+    """
+    for op, fields in list(update.items()):
+        if op not in ['$set', '$unset']:
+            raise ValueError("unsupported update operator '{}'".format(op))
+        for path, value in list(fields.items()):
+            keys = path.split('.')
+            target = doc
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            if op == '$set':
+                target[keys[-1]] = copy.deepcopy(value)
+            else:
+                target.pop(keys[-1], None)
+
+
+class LocalCollection(object):
+    """
+    A collection of documents held in memory and persisted as a
+    JSON-lines file; each write appends the full updated document, and
+    later lines take precedence over earlier ones when loading.
+    Supports the subset of the pymongo ``Collection`` API used by
+    ``bripipetools``.
+
+    :type path: str
+    :param path: path to the JSON-lines file for the collection
+
+    :type lock: type[threading.RLock]
+    :param lock: lock shared by all collections in the database
+    """
+    def __init__(self, path, lock):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self._lock = lock
+        self._docs = OrderedDict()
+        if os.path.exists(path):
+            logger.debug("loading documents for collection '{}' from '{}'"
+                         .format(self.name, path))
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        doc = json.loads(line, object_hook=_decode)
+                        self._docs[doc['_id']] = doc
+
+    def _write(self, docs):
+        with open(self.path, 'a') as f:
+            for doc in docs:
+                f.write(json.dumps(doc, default=_encode) + '\n')
+
+    def _update(self, query, update, upsert):
+        """
+        Update the first matching document (or insert a new one, if
+        ``upsert`` is set) in memory and return it.
+        """
+        _check_query(query)
+        if '_id' in query and not isinstance(query['_id'], dict):
+            doc = self._docs.get(query['_id'])
+        else:
+            doc = next((d for d in list(self._docs.values())
+                        if _matches(d, query)), None)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = {k: v for k, v in list(query.items())
+                   if not isinstance(v, dict)}
+            self._docs[doc['_id']] = doc
+        _apply_update(doc, update)
+        return doc
+
+    def find(self, query=None, projection=None):
+        _check_query(query or {})
+        with self._lock:
+            docs = [d for d in list(self._docs.values())
+                    if _matches(d, query or {})]
+            if projection is not None:
+                return [_project(d, projection) for d in docs]
+            return [copy.deepcopy(d) for d in docs]
+
+    def find_one(self, query=None):
+        docs = self.find(query)
+        return docs[0] if len(docs) else None
+
+    def insert_one(self, doc):
+        with self._lock:
+            if doc['_id'] in self._docs:
+                raise ValueError("duplicate key '{}' in collection '{}'"
+                                 .format(doc['_id'], self.name))
+            self._docs[doc['_id']] = copy.deepcopy(doc)
+            self._write([doc])
+
+    def update_one(self, query, update, upsert=False):
+        with self._lock:
+            doc = self._update(query, update, upsert)
+            if doc is not None:
+                self._write([doc])
+
+    def bulk_write(self, requests, ordered=True):
+        """
+        Apply a list of ``UpdateRequest`` requests (from
+        ``database.operations``) and persist the updated documents with
+        a single file write.
+        """
+        for r in requests:
+            if not isinstance(r, UpdateRequest):
+                logger.error("unsupported request {} for local collection "
+                             "'{}'".format(r, self.name))
+                raise TypeError("{!r} is not a valid request for a local "
+                                "collection; use `UpdateRequest`".format(r))
+        with self._lock:
+            docs = OrderedDict()
+            for r in requests:
+                doc = self._update(r.filter, r.update, r.upsert)
+                if doc is not None:
+                    docs[doc['_id']] = doc
+            self._write(list(docs.values()))
+
+    def compact(self):
+        """
+        Rewrite the file with only the latest version of each document.
+        """
+        with self._lock:
+            tmp_path = '{}.tmp'.format(self.path)
+            with open(tmp_path, 'w') as f:
+                for doc in list(self._docs.values()):
+                    f.write(json.dumps(doc, default=_encode) + '\n')
+            os.replace(tmp_path, self.path)
+
+
+class LocalDatabase(object):
+    """
+    A folder of JSON-lines files, one per collection, that can be used
+    in place of a pymongo ``Database``.
+
+    :type path: str
+    :param path: path to the folder where collection files are stored
+
+    :type name: str
+    :param name: name of the database
+    """
+    def __init__(self, path, name):
+        logger.debug("creating `LocalDatabase` instance for path '{}'"
+                     .format(path))
+        self.path = path
+        self.name = name
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self._lock = threading.RLock()
+        self._collections = {}
+
+    def __getitem__(self, collection):
+        with self._lock:
+            if collection not in self._collections:
+                self._collections[collection] = LocalCollection(
+                    os.path.join(self.path, '{}.jsonl'.format(collection)),
+                    self._lock
+                )
+            return self._collections[collection]
+
+    def __getattr__(self, collection):
+        if collection.startswith('_'):
+            raise AttributeError(collection)
+        return self[collection]
+
+    def compact(self):
+        """
+        Rewrite the file for each loaded collection with only the latest
+        version of each document.
+        """
+        for collection in list(self._collections.values()):
+            collection.compact()
@@ -6,6 +6,8 @@ import re
 from functools import wraps
 import datetime
 
+import pymongo
+
 from .. import util
 
 logger = logging.getLogger(__name__)
@@ -30,11 +32,133 @@ def find_objects(collection):
     return decorator
 
 
+# fields that change on every import without reflecting new content;
+# these are written along with other changes but never trigger a write
+# (and are ignored when fingerprinting documents)
+VOLATILE_FIELDS = ['dateCreated', 'lastUpdated', 'isMapped']
+
+
+class UpdateRequest(pymongo.UpdateOne):
+    """
+    A pymongo ``UpdateOne`` request that also exposes its filter,
+    update, and upsert flag as public attributes, so that it can be
+    applied by database backends other than MongoDB (e.g., the local
+    database in ``database.localdb``).
+
+    :type filter: dict
+    :param filter: query matching the document to update
+
+    :type update: dict
+    :param update: update operators to apply
+
+    :type upsert: bool
+    :param upsert: if True, insert the document if it doesn't exist
+    """
+    def __init__(self, filter, update, upsert=False):
+        super(UpdateRequest, self).__init__(filter, update, upsert=upsert)
+        self.filter = filter
+        self.update = update
+        self.upsert = upsert
+
+
+def _is_path_safe(obj):
+    """
+    Check whether all keys of a dict can be used in dotted field paths.
+    """
+    return all(not re.search(r'\.|^\$', k) for k in obj)
+
+
+def _diff_fields(current, new, prefix, update):
+    """
+    Add '$set' entries for fields in ``new`` that differ from ``current``,
+    descending into nested dicts with dotted paths, and (below the top
+    level) '$unset' entries for fields no longer present.
+    """
+    for k, v in list(new.items()):
+        path = '{}{}'.format(prefix, k)
+        if (k in current and isinstance(v, dict)
+                and isinstance(current[k], dict)
+                and _is_path_safe(v) and _is_path_safe(current[k])):
+            _diff_fields(current[k], v, '{}.'.format(path), update)
+        elif k not in current or current[k] != v:
+            update['$set'][path] = v
+    if len(prefix):
+        for k in current:
+            if k not in new:
+                update['$unset']['{}{}'.format(prefix, k)] = ''
+
+
+def plan_update(current, new):
+    """
+    Construct the minimal update required to bring a stored document
+    up to date with a new version of the object. Top-level fields that
+    are empty (None) in the new object are ignored, consistent with
+    ``insert_objects``; nested fields are compared individually and
+    referenced with dotted paths (e.g., 'processedData.metrics').
+
+    :type current: dict
+    :param current: a dict representing the document currently stored
+        in the database (empty if the document doesn't exist)
+
+    :type new: dict
+    :param new: a dict representing the new version of the document
+
+    :rtype: dict
+    :return: a dict with '$set' and/or '$unset' operators, or None if
+        there are no fields to write or no fields other than volatile
+        fields (e.g., 'lastUpdated') have changed
+    """
+    new = {k: v for k, v in list(new.items())
+           if v is not None and k != '_id'}
+    update = {'$set': {}, '$unset': {}}
+    _diff_fields(current, new, '', update)
+    if not len(update['$unset']) and (
+            not len(update['$set'])
+            or (len(current)
+                and all(k in VOLATILE_FIELDS for k in update['$set']))):
+        return None
+    return {op: fields for op, fields in list(update.items()) if len(fields)}
+
+
+def plan_updates(current, objects):
+    """
+    Plan the update for each object in a list, skipping unchanged
+    objects; the stored documents are updated in place so that repeated
+    objects are compared against their latest version.
+
+    :type current: dict
+    :param current: a dict mapping '_id' to the document currently
+        stored in the database, for objects that exist
+
+    :type objects: list
+    :param objects: a list of dicts representing new versions of
+        documents, each with an '_id' field
+
+    :rtype: list
+    :return: a list of tuples with the '_id' and planned update for
+        each object that should be written
+    """
+    updates = []
+    for o in objects:
+        update = plan_update(current.get(o['_id'], {}), o)
+        if update is None:
+            logger.debug("object '{}' unchanged; skipping".format(o['_id']))
+            continue
+        updates.append((o['_id'], update))
+        current[o['_id']] = dict(
+            current.get(o['_id'], {}),
+            **{k: v for k, v in list(o.items()) if v is not None}
+        )
+    return updates
+
+
 def insert_objects(collection):
     """
     Return a decorator that inserts one or more objects in into
     specified collection; if object exists, updates any individual
-    fields that are not empty in the input object.
+    fields that are not empty in the input object. Only fields that
+    differ from the stored document are written, and objects with no
+    changes are skipped.
 
     :type collection: str
     :param collection: string indicating the name of the collection
@@ -45,15 +169,15 @@ def insert_objects(collection):
             db, objects = f(*args)
             objects = [objects] if not isinstance(objects, list) else objects
             logger.debug("inserting list of objects: {}".format(objects))
-            for o in objects:
-                logger.debug("inserting '{}' into '{}' collection"
-                             .format(o, collection))
-                for k, v in list(o.items()):
-                    if v is not None:
-                        logger.debug("updating field {}".format(k))
-                        db[collection].update_one({'_id': o['_id']},
-                                                  {'$set': {k: v}},
-                                                  upsert=True)
+            current = {d['_id']: d for d in db[collection].find(
+                {'_id': {'$in': [o['_id'] for o in objects]}}
+            )}
+            for _id, update in plan_updates(current, objects):
+                logger.debug("updating fields {} of '{}' in '{}' collection"
+                             .format([k for fields in list(update.values())
+                                      for k in fields],
+                                     _id, collection))
+                db[collection].update_one({'_id': _id}, update, upsert=True)
 
         return wrapper
     return decorator
@@ -96,6 +220,15 @@ def get_genomicsRuns(db, query):
     return db, query
 
 
+@find_objects('genomicsFingerprints')
+def get_genomicsFingerprints(db, query):
+    """
+    Return list of documents from 'genomicsFingerprints' collection based
+    on query.
+    """
+    return db, query
+
+
 @insert_objects('genomicsWorkflowbatches')
 def put_genomicsWorkflowbatches(db, workflowbatches):
     """
@@ -134,6 +267,14 @@ def put_genomicsRuns(db, runs):
     return db, runs
 
 
+@insert_objects('genomicsFingerprints')
+def put_genomicsFingerprints(db, fingerprints):
+    """
+    Insert each document in list into 'genomicsFingerprints' collection.
+    """
+    return db, fingerprints
+
+
 def create_workflowbatch_id(db, prefix, date):
     """
     Check the 'workflowbatches' collection and construct ID with lowest
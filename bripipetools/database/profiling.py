@@ -0,0 +1,101 @@
+"""
+Record counts and latency of operations on a BRI database, so that
+imports can be profiled with any backend.
+"""
+import logging
+import time
+import threading
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# collection methods for which calls are recorded
+PROFILED_OPERATIONS = ['find', 'find_one', 'insert_one', 'update_one',
+                       'bulk_write']
+
+
+class ProfiledCollection(object):
+    """
+    Wraps a collection object, recording each call to one of the
+    ``PROFILED_OPERATIONS`` in the parent database's statistics; all
+    other attributes are passed through to the wrapped collection.
+    """
+    def __init__(self, collection, profiled_db):
+        self._collection = collection
+        self._profiled_db = profiled_db
+
+    def __getattr__(self, attr):
+        target = getattr(self._collection, attr)
+        if attr not in PROFILED_OPERATIONS:
+            return target
+
+        @wraps(target)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                result = target(*args, **kwargs)
+                if attr == 'find':
+                    # cursors are lazy; include the time to fetch results
+                    result = list(result)
+                return result
+            finally:
+                self._profiled_db.record(self._collection.name, attr,
+                                         time.time() - start)
+        return wrapper
+
+
+class ProfiledDatabase(object):
+    """
+    Wraps a database object (pymongo, mongomock, or ``LocalDatabase``)
+    and records the number of calls and total time spent for each
+    operation on each collection.
+
+    :type db: type[pymongo.database.Database]
+    :param db: database object for current MongoDB connection
+    """
+    def __init__(self, db):
+        logger.debug("creating `ProfiledDatabase` instance for database '{}'"
+                     .format(db.name))
+        self.db = db
+        self.name = db.name
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, collection):
+        return ProfiledCollection(self.db[collection], self)
+
+    def __getattr__(self, collection):
+        if collection.startswith('_'):
+            raise AttributeError(collection)
+        return self[collection]
+
+    def record(self, collection, operation, seconds):
+        """
+        Add a call and its duration to the statistics.
+
+        :type collection: str
+        :param collection: name of the collection
+
+        :type operation: str
+        :param operation: name of the collection method called
+
+        :type seconds: float
+        :param seconds: duration of the call in seconds
+        """
+        with self._lock:
+            stats = self.stats.setdefault((collection, operation),
+                                          {'count': 0, 'seconds': 0.0})
+            stats['count'] += 1
+            stats['seconds'] += seconds
+
+    def report(self):
+        """
+        Log the number of calls, total time, and mean latency of each
+        operation on each collection.
+        """
+        for (collection, operation), stats in sorted(self.stats.items()):
+            logger.info("'{}'.{}: {} call(s), {:.3f}s total, "
+                        "{:.2f}ms mean"
+                        .format(collection, operation, stats['count'],
+                                stats['seconds'],
+                                1000 * stats['seconds'] / stats['count']))
@@ -5,8 +5,12 @@ into GenLIMS. Modules are designed to handle the set of data
 associated with a particular "step" (e.g., a flowcell sequencing run or
 bioinformatics processing of a batch of samples). The ``dbify.control``
 module inspects an input path and deploys the appropriate importer
-class.
+class; the ``dbify.tracking`` module records fingerprints of imported
+documents so that unchanged libraries can be skipped on later imports,
+and ``dbify.asyncimport`` runs importers with asyncio database writes.
 """
+from .tracking import ChangeTracker
 from .flowcellrun import FlowcellRunImporter
 from .workflowbatch import WorkflowBatchImporter
 from .control import ImportManager
+from .asyncimport import AsyncImportManager
@@ -0,0 +1,97 @@
+"""
+Asyncio-based import of data from a sequencing run or workflow batch,
+with many database writes in flight at once.
+"""
+import logging
+import asyncio
+
+from .. import database
+from . import FlowcellRunImporter
+from .control import ImportManager
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncImportManager(ImportManager):
+    """
+    Selects the appropriate importer for the input path (as with
+    ``ImportManager``) and runs it in worker threads, scheduling its
+    writes on the event loop through an ``AsyncWriter``, which writes
+    documents in batches per collection. Collections that don't depend
+    on each other are collected concurrently, sharing the importer's
+    (thread-safe) change tracker.
+
+    :type async_db: type[motor.motor_asyncio.AsyncIOMotorDatabase]
+    :param async_db: motor database object or ``AsyncDatabase`` for the
+        same database as ``db``; defaults to wrapping ``db`` with an
+        ``AsyncDatabase``, which is closed at the end of ``run``
+
+    :type max_in_flight: int
+    :param max_in_flight: maximum number of writes in progress at once
+    """
+    def __init__(self, path, db, run_opts, force=False, async_db=None,
+                 max_in_flight=200, context=None):
+        super(AsyncImportManager, self).__init__(path, db, run_opts, force,
+                                                 context)
+        self._owns_async_db = async_db is None
+        if async_db is None:
+            async_db = database.AsyncDatabase(db)
+        self.async_db = async_db
+        self.max_in_flight = max_in_flight
+
+    def _get_stages(self, collections):
+        """
+        Group collections into stages; collections within a stage are
+        inserted concurrently, and stages are inserted in order.
+        """
+        if collections not in ['all', 'allButCounts']:
+            return [[collections]]
+        if isinstance(self.importer, FlowcellRunImporter):
+            stage = ['genomicsSamples', 'genomicsMetrics', 'genomicsRuns']
+            if collections == 'all':
+                stage.append('genomicsCounts')
+            # new workflow batch IDs are numbered based on existing
+            # batches, so batches are inserted on their own
+            return [stage, ['genomicsWorkflowbatches']]
+        # processed libraries and the workflow batch both look up the
+        # batch ID, so keep the order used by the synchronous importer
+        return [['genomicsSamples'], ['genomicsWorkflowbatches']]
+
+    async def run_async(self, collections='all'):
+        """
+        Execute the insert method of the selected importer; all
+        documents are written (or the first write error is raised)
+        before returning, and library fingerprints are recorded only
+        after all documents are written.
+        """
+        self._init_importer()
+        loop = asyncio.get_running_loop()
+        writer = database.AsyncWriter(self.async_db, loop,
+                                      self.max_in_flight)
+        self.importer.writer = writer
+        try:
+            for stage in self._get_stages(collections):
+                logger.debug("inserting collections {} concurrently"
+                             .format(stage))
+                await asyncio.gather(*[
+                    loop.run_in_executor(None, self.importer.insert, c)
+                    for c in stage
+                ])
+                await writer.drain()
+        finally:
+            self.importer.writer = None
+        await loop.run_in_executor(None, self._write_fingerprints)
+        logger.info("wrote {} document(s) to '{}'"
+                    .format(writer.written, self.async_db.name))
+        self._report_changes()
+
+    def run(self, collections='all'):
+        """
+        Run the asyncio import to completion in a new event loop; close
+        the default ``AsyncDatabase``, if used, when finished.
+        """
+        try:
+            asyncio.run(self.run_async(collections))
+        finally:
+            if self._owns_async_db:
+                self.async_db.close()
@@ -4,7 +4,8 @@ Parse arguments to determine and select appropriate importer class.
 import logging
 import re
 
-from . import FlowcellRunImporter, WorkflowBatchImporter
+from .. import database
+from . import FlowcellRunImporter, WorkflowBatchImporter, ChangeTracker
 
 logger = logging.getLogger(__name__)
 
@@ -14,14 +15,20 @@ class ImportManager(object):
     Takes an input argument (path) from script or module specifying
     a scope of data to be imported into GenLIMS; selects the
     appropriate importer class and makes insert command available.
+    Unless ``force`` is set, flowcell run imports skip libraries that
+    haven't changed since the last import. A ``RunContext`` can be
+    provided to share workflow batch files and annotators with other
+    steps of a run.
     """
-    def __init__(self, path, db, run_opts):
+    def __init__(self, path, db, run_opts, force=False, context=None):
         logger.debug("creating `ImportManager` instance")
         logger.debug("...with arguments (path: '{}', db: '{}')"
                      .format(path, db.name))
         self.path = path
         self.db = db
         self.run_opts = run_opts
+        self.force = force
+        self.context = context
 
     def _sniff_path(self):
         """
@@ -45,11 +52,42 @@ class ImportManager(object):
         }
         importer = importer_opts[path_type]
         self.importer = importer(path=self.path, db=self.db, 
-                                 run_opts=self.run_opts)
+                                 run_opts=self.run_opts,
+                                 context=self.context)
+        if path_type == 'flowcell_path' and not self.force:
+            self.importer.tracker = ChangeTracker(self.db, self.run_opts)
+
+    def _write_fingerprints(self):
+        """
+        Record fingerprints of imported libraries, if the importer
+        tracks changes; called only after all documents are written.
+        """
+        if hasattr(self.importer, 'write_fingerprints'):
+            self.importer.write_fingerprints()
+
+    def _report_changes(self):
+        """
+        Log the numbers of documents skipped and written, if the
+        importer has a change tracker.
+        """
+        tracker = getattr(self.importer, 'tracker', None)
+        if tracker is not None:
+            tracker.report()
 
     def run(self, collections='all'):
         """
-        Execute the insert method of the selected importer.
+        Execute the insert method of the selected importer. Documents
+        are written in bulk in the background while the importer
+        collects them; all documents are written (or the first write
+        error is raised) before returning. Library fingerprints are
+        recorded only after all documents are written.
         """
         self._init_importer()
-        self.importer.insert(collections)
+        with database.BufferedWriter(self.db) as writer:
+            self.importer.writer = writer
+            try:
+                self.importer.insert(collections)
+            finally:
+                self.importer.writer = None
+        self._write_fingerprints()
+        self._report_changes()
@@ -9,22 +9,60 @@ import re
 from .. import parsing
 from .. import database
 from .. import annotation
+from .writing import WriterMixin
 
 logger = logging.getLogger(__name__)
 
 
-class FlowcellRunImporter(object):
+class FlowcellRunImporter(WriterMixin):
     """
     Collects FlowcellRun and SequencedLibrary objects from a sequencing run,
-    converts to documents, inserts into database.
+    converts to documents, inserts into database. If a change tracker
+    is provided, libraries with unchanged inputs and documents are
+    skipped; fingerprints of inserted libraries are recorded only once
+    their documents have been written (see ``write_fingerprints``). If
+    a ``RunContext`` is provided, workflow batch annotators are shared
+    with other steps of the run.
     """
-    def __init__(self, path, db, run_opts):
+    def __init__(self, path, db, run_opts, writer=None, tracker=None,
+                 context=None):
         logger.debug("creating `SequencingImporter` instance")
         logger.debug("...with arguments (path: '{}', db: '{}')"
                      .format(path, db.name))
         self.path = path
         self.db = db
         self.run_opts = run_opts
+        self.writer = writer
+        self.tracker = tracker
+        self.context = context
+        self._fingerprints = []
+
+    def _put_library(self, collection, doc):
+        """
+        Insert a library document unless the change tracker (if set)
+        finds it unchanged since the last import; hold its fingerprint
+        until the document is written.
+        """
+        if self.tracker is None or self.tracker.payload_changed(collection,
+                                                                doc):
+            self._put(collection, doc)
+        if self.tracker is not None:
+            self._fingerprints.append(
+                self.tracker.get_fingerprint_doc(collection, doc['_id']))
+
+    def write_fingerprints(self):
+        """
+        Record the fingerprints of libraries inserted so far in the
+        'genomicsFingerprints' collection. When a writer is set, this
+        must be called only after the writer has written all documents
+        without errors, so that a library is never recorded as imported
+        when its data was not written.
+        """
+        fingerprints, self._fingerprints = self._fingerprints, []
+        if len(fingerprints):
+            logger.debug("recording {} library fingerprint(s)"
+                         .format(len(fingerprints)))
+            database.put_genomicsFingerprints(self.db, fingerprints)
 
     def _collect_flowcellrun(self):
         """
@@ -51,7 +89,8 @@ class FlowcellRunImporter(object):
         return annotation.FlowcellRunAnnotator(
             run_id=path_items['run_id'],
             pipeline_root=path_items['pipeline_root'],
-            db=self.db
+            db=self.db,
+            tracker=self.tracker
             ).get_sequenced_libraries()
 
     def _collect_librarygenecounts(self):
@@ -66,7 +105,8 @@ class FlowcellRunImporter(object):
         return annotation.FlowcellRunAnnotator(
             run_id=path_items['run_id'],
             pipeline_root=path_items['pipeline_root'],
-            db=self.db
+            db=self.db,
+            tracker=self.tracker
             ).get_library_gene_counts()
 
     def _collect_librarymetrics(self):
@@ -82,7 +122,8 @@ class FlowcellRunImporter(object):
         return annotation.FlowcellRunAnnotator(
             run_id=path_items['run_id'],
             pipeline_root=path_items['pipeline_root'],
-            db=self.db
+            db=self.db,
+            tracker=self.tracker
             ).get_library_metrics()
     
     def _insert_genomicsSequencedlibraries(self):
@@ -92,7 +133,7 @@ class FlowcellRunImporter(object):
         sequencedlibraries = self._collect_sequencedlibraries()
         for sl in sequencedlibraries:
             logger.debug("inserting sequenced library {}".format(sl))
-            database.put_genomicsSamples(self.db, sl.to_json())
+            self._put_library('genomicsSamples', sl.to_json())
 
     def _insert_librarygenecounts(self):
         """
@@ -101,7 +142,7 @@ class FlowcellRunImporter(object):
         librarygenecounts = self._collect_librarygenecounts()
         for lgc in librarygenecounts:
             logger.debug("inserting library gene counts '{}'".format(lgc))
-            database.put_genomicsCounts(self.db, lgc.to_json())
+            self._put_library('genomicsCounts', lgc.to_json())
             
     def _insert_genomicsLibrarymetrics(self):
         """
@@ -110,7 +151,7 @@ class FlowcellRunImporter(object):
         librarymetrics = self._collect_librarymetrics()
         for lm in librarymetrics:
             logger.debug("inserting library metrics '{}'".format(lm))
-            database.put_genomicsMetrics(self.db, lm.to_json())
+            self._put_library('genomicsMetrics', lm.to_json())
     
     def _insert_genomicsWorkflowbatches(self):
         """
@@ -121,18 +162,29 @@ class FlowcellRunImporter(object):
         logger.info("collecting info for workflow batch files in '{}'"
                     .format(batchfile_dir))
                     
+        # skip hidden files (e.g., temporary files of batches being
+        # written) and leftover temporary files
         batchfile_list = [batchfile for batchfile in os.listdir(batchfile_dir)
-                         if not re.search('DS_Store', batchfile)]
+                          if not re.search(r'DS_Store|^\.|\.tmp$', batchfile)]
         
         for curr_batchfile in batchfile_list:
-            workflowbatch = annotation.WorkflowBatchAnnotator(
-                workflowbatch_file=os.path.join(batchfile_dir, curr_batchfile),
-                pipeline_root=path_items['pipeline_root'],
-                db=self.db,
-                run_opts = self.run_opts
-                ).get_workflow_batch() 
+            batchfile_path = os.path.join(batchfile_dir, curr_batchfile)
+            if self.context is not None:
+                annotator = self.context.get_annotator(
+                    batchfile_path, path_items['pipeline_root'])
+            else:
+                annotator = annotation.WorkflowBatchAnnotator(
+                    workflowbatch_file=batchfile_path,
+                    pipeline_root=path_items['pipeline_root'],
+                    db=self.db,
+                    run_opts = self.run_opts
+                    )
+            workflowbatch = annotator.get_workflow_batch()
             logger.debug("inserting workflow batch '{}'".format(workflowbatch))
-            database.put_genomicsWorkflowbatches(self.db, workflowbatch.to_json())
+            self._put('genomicsWorkflowbatches', workflowbatch.to_json())
+            # new workflow batch IDs are numbered based on existing
+            # batches, so each batch must be stored before the next
+            self._flush()
             
     def _insert_genomicsFlowcellRun(self, collection='all'):
         """
@@ -141,14 +193,16 @@ class FlowcellRunImporter(object):
         flowcellrun = self._collect_flowcellrun()
         logger.debug("inserting flowcell run {} into {}"
                      .format(flowcellrun, self.db.name))
-        database.put_genomicsRuns(self.db, flowcellrun.to_json())
+        self._put('genomicsRuns', flowcellrun.to_json())
 
     def insert(self, collection='all'):
         """
         Insert documents into ResearchDB databases.
         Note that ResearchDB collections are prepended by 'genomics'
         to indicate the data origin. For workflows without gene count data
-        the argument 'collection' can be set to 'allButCounts'.
+        the argument 'collection' can be set to 'allButCounts'. Without a
+        writer, fingerprints of inserted libraries are recorded once all
+        documents have been inserted.
         """
         
         # Sample information
@@ -180,3 +234,6 @@ class FlowcellRunImporter(object):
             logger.info(("Inserting run information for flowcell '{}' "
                          "into '{}'").format(self.path, self.db.name))
             self._insert_genomicsFlowcellRun()
+
+        if self.writer is None:
+            self.write_fingerprints()
@@ -0,0 +1,232 @@
+"""
+Track content fingerprints for imported documents so that repeated
+imports can skip libraries whose inputs and documents haven't changed.
+"""
+import logging
+import os
+import re
+import hashlib
+import json
+import threading
+
+from .. import database
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeTracker(object):
+    """
+    Compares fingerprints of source files and serialized documents
+    against those recorded in the 'genomicsFingerprints' collection
+    during previous imports, and counts how many documents were
+    skipped or written. Source fingerprints also cover the run options,
+    and objects missing from the database are never skipped. Methods
+    can be called from multiple threads (e.g., by importers run
+    concurrently for several collections).
+
+    :type db: type[pymongo.database.Database]
+    :param db: database object for current MongoDB connection
+
+    :type run_opts: dict
+    :param run_opts: options used to build documents during the import
+    """
+    def __init__(self, db, run_opts=None):
+        logger.debug("creating `ChangeTracker` instance for database '{}'"
+                     .format(db.name))
+        self.db = db
+        self.run_opts = run_opts if run_opts is not None else {}
+        self.skipped = {}
+        self.written = {}
+        self._cache = {}
+        self._sources = {}
+        self._stored = {}
+        self._lock = threading.RLock()
+
+    def _build_id(self, collection, object_id):
+        return '{}:{}'.format(collection, object_id)
+
+    def _get_fingerprint(self, collection, object_id):
+        """
+        Return the stored fingerprint for an object, if any; load and
+        cache all stored fingerprints for the collection on first use.
+        """
+        with self._lock:
+            if collection not in self._cache:
+                logger.debug("loading fingerprints for '{}' collection"
+                             .format(collection))
+                self._cache[collection] = {
+                    fp['objectId']: fp
+                    for fp in database.get_genomicsFingerprints(
+                        self.db, {'collection': collection})
+                }
+            return self._cache[collection].get(object_id, {})
+
+    def _is_stored(self, collection, object_id):
+        """
+        Check whether an object exists in the database; on first use,
+        look up all objects in the collection with stored fingerprints.
+        """
+        with self._lock:
+            if collection not in self._stored:
+                self._get_fingerprint(collection, object_id)
+                object_ids = list(self._cache[collection])
+                self._stored[collection] = set(
+                    d['_id'] for d in self.db[collection].find(
+                        {'_id': {'$in': object_ids}}, {'_id': 1})
+                )
+            return object_id in self._stored[collection]
+
+    def get_source_fingerprint(self, path, pattern=None):
+        """
+        Return a hash of the run options and the name, size, and
+        modification time of each file under the specified path,
+        optionally restricted to files with names matching a pattern.
+
+        :type path: str
+        :param path: path to a file or folder of source files
+
+        :type pattern: str
+        :param pattern: regular expression to search for in file names
+            (anchor the pattern to match only a prefix, e.g., a library
+            ID followed by '_')
+
+        :rtype: str
+        :return: hex digest of the run options and file stats
+        """
+        if os.path.isfile(path):
+            paths = [path]
+        else:
+            paths = [os.path.join(root, f)
+                     for root, dirs, files in os.walk(path)
+                     for f in files]
+        if pattern is not None:
+            paths = [p for p in paths
+                     if re.search(pattern, os.path.basename(p))]
+        sha = hashlib.sha1()
+        sha.update('{}\n'.format(
+            json.dumps(self.run_opts, sort_keys=True, default=str)
+        ).encode('utf-8'))
+        for p in sorted(paths):
+            stats = os.stat(p)
+            sha.update('{}:{}:{}\n'.format(p, stats.st_size, stats.st_mtime)
+                       .encode('utf-8'))
+        return sha.hexdigest()
+
+    def get_payload_fingerprint(self, doc):
+        """
+        Return a hash of the serialized document, ignoring fields that
+        change on every import.
+
+        :type doc: dict
+        :param doc: document to be inserted into the database
+
+        :rtype: str
+        :return: hex digest of the serialized document
+        """
+        payload = {k: v for k, v in list(doc.items())
+                   if k not in database.VOLATILE_FIELDS}
+        return hashlib.sha1(
+            json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+
+    def source_changed(self, collection, object_id, path, pattern=None):
+        """
+        Check whether the source files (or run options) for an object
+        have changed since the last import, or the object is missing
+        from the database; if not, count the object as skipped.
+
+        :type collection: str
+        :param collection: name of the collection for the object
+
+        :type object_id: str
+        :param object_id: '_id' of the object in the collection
+
+        :type path: str
+        :param path: path to a file or folder of source files
+
+        :type pattern: str
+        :param pattern: regular expression to search for in file names
+            (anchor the pattern to match only a prefix, e.g., a library
+            ID followed by '_')
+
+        :rtype: bool
+        :return: True if the object should be parsed and compared
+        """
+        source = self.get_source_fingerprint(path, pattern)
+        with self._lock:
+            self._sources[(collection, object_id)] = source
+            if (self._get_fingerprint(collection, object_id).get('source')
+                    == source and self._is_stored(collection, object_id)):
+                logger.debug("sources for '{}' in '{}' unchanged; skipping"
+                             .format(object_id, collection))
+                self.skipped[collection] = \
+                    self.skipped.get(collection, 0) + 1
+                return False
+            return True
+
+    def payload_changed(self, collection, doc):
+        """
+        Check whether a document differs from the one written during the
+        last import (or is missing from the database) and count the
+        object as skipped or written.
+
+        :type collection: str
+        :param collection: name of the collection for the document
+
+        :type doc: dict
+        :param doc: document to be inserted into the database
+
+        :rtype: bool
+        :return: True if the document should be written
+        """
+        payload = self.get_payload_fingerprint(doc)
+        with self._lock:
+            changed = (self._get_fingerprint(collection, doc['_id'])
+                       .get('payload') != payload
+                       or not self._is_stored(collection, doc['_id']))
+            if changed:
+                self.written[collection] = \
+                    self.written.get(collection, 0) + 1
+            else:
+                logger.debug("document '{}' in '{}' unchanged; skipping"
+                             .format(doc['_id'], collection))
+                self.skipped[collection] = \
+                    self.skipped.get(collection, 0) + 1
+            self._cache.setdefault(collection, {})[doc['_id']] = {
+                'source': self._sources.get((collection, doc['_id'])),
+                'payload': payload
+            }
+            return changed
+
+    def get_fingerprint_doc(self, collection, object_id):
+        """
+        Return the fingerprint document to be stored for an object.
+
+        :type collection: str
+        :param collection: name of the collection for the object
+
+        :type object_id: str
+        :param object_id: '_id' of the object in the collection
+
+        :rtype: dict
+        :return: document for the 'genomicsFingerprints' collection
+        """
+        fingerprint = self._get_fingerprint(collection, object_id)
+        return {'_id': self._build_id(collection, object_id),
+                'collection': collection,
+                'objectId': object_id,
+                'source': fingerprint.get('source'),
+                'payload': fingerprint.get('payload')}
+
+    def report(self):
+        """
+        Log the number of documents skipped and written per collection.
+        """
+        with self._lock:
+            skipped, written = dict(self.skipped), dict(self.written)
+        for collection in sorted(set(skipped) | set(written)):
+            logger.info("'{}': {} unchanged document(s) skipped, "
+                        "{} document(s) written"
+                        .format(collection,
+                                skipped.get(collection, 0),
+                                written.get(collection, 0)))
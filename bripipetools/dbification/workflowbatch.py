@@ -7,22 +7,48 @@ import logging
 from .. import parsing
 from .. import database
 from .. import annotation
+from .writing import WriterMixin
 
 logger = logging.getLogger(__name__)
 
 
-class WorkflowBatchImporter(object):
+class WorkflowBatchImporter(WriterMixin):
     """
     Collects WorkflowBatch and ProcessedLibrary objects from a processing
-    batch, converts to documents, inserts into database.
+    batch, converts to documents, inserts into database. The batch file
+    is read and the workflow batch looked up once, with the annotator
+    shared between collections (and with other steps of a run, if a
+    ``RunContext`` is provided).
     """
-    def __init__(self, path, db, run_opts):
+    def __init__(self, path, db, run_opts, writer=None, context=None):
         logger.debug("creating `ProcessingImporter` instance")
         logger.debug("...with arguments (path: '{}', db: '{}')"
                      .format(path, db.name))
         self.path = path
         self.db = db
         self.run_opts = run_opts
+        self.writer = writer
+        self.context = context
+        self._annotator = None
+
+    def _get_annotator(self):
+        """
+        Return the annotator for the workflow batch, creating it on
+        first use.
+        """
+        if self._annotator is None:
+            path_items = parsing.parse_batch_file_path(self.path)
+            if self.context is not None:
+                self._annotator = self.context.get_annotator(
+                    self.path, path_items['pipeline_root'])
+            else:
+                self._annotator = annotation.WorkflowBatchAnnotator(
+                    workflowbatch_file=self.path,
+                    pipeline_root=path_items['pipeline_root'],
+                    db=self.db,
+                    run_opts=self.run_opts
+                )
+        return self._annotator
 
     def _collect_workflowbatch(self):
         """
@@ -32,12 +58,7 @@ class WorkflowBatchImporter(object):
         logger.info("collecting info for workflow batch file '{}'"
                     .format(path_items['workflowbatch_filename']))
 
-        return annotation.WorkflowBatchAnnotator(
-            workflowbatch_file=self.path,
-            pipeline_root=path_items['pipeline_root'],
-            db=self.db,
-            run_opts = self.run_opts
-            ).get_workflow_batch()
+        return self._get_annotator().get_workflow_batch()
 
     def _collect_processedlibraries(self):
         """
@@ -47,12 +68,7 @@ class WorkflowBatchImporter(object):
         logger.info("collecting sequenced libraries for workflow batch '{}'"
                     .format(path_items['workflowbatch_filename']))
 
-        return annotation.WorkflowBatchAnnotator(
-            workflowbatch_file=self.path,
-            pipeline_root=path_items['pipeline_root'],
-            db=self.db,
-            run_opts=self.run_opts
-            ).get_processed_libraries(qc=False)
+        return self._get_annotator().get_processed_libraries(qc=False)
         
     def _insert_genomicsWorkflowbatch(self):
         """
@@ -60,7 +76,7 @@ class WorkflowBatchImporter(object):
         """
         workflowbatch = self._collect_workflowbatch()
         logger.debug("inserting workflow batch '{}'".format(workflowbatch))
-        database.put_genomicsWorkflowbatches(self.db, workflowbatch.to_json())
+        self._put('genomicsWorkflowbatches', workflowbatch.to_json())
             
     def _insert_genomicsProcessedlibraries(self):
         """
@@ -69,7 +85,7 @@ class WorkflowBatchImporter(object):
         processedlibraries = self._collect_processedlibraries()
         for pl in processedlibraries:
             logger.debug("inserting processed library '{}'".format(pl))
-            database.put_genomicsSamples(self.db, pl.to_json())
+            self._put('genomicsSamples', pl.to_json())
 
     def insert(self, collection='all'):
         """
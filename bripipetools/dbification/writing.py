@@ -0,0 +1,36 @@
+"""
+Shared handling of database writes for importer classes.
+"""
+import logging
+
+from .. import database
+
+logger = logging.getLogger(__name__)
+
+
+class WriterMixin(object):
+    """
+    Provides importers with methods to insert documents either through
+    a writer (e.g., ``database.BufferedWriter`` or
+    ``database.AsyncWriter``) set as the ``writer`` attribute, or
+    directly into the database object set as the ``db`` attribute.
+    """
+    writer = None
+
+    def _put(self, collection, objects):
+        """
+        Insert documents into the specified collection, either through
+        the writer (if set) or directly.
+        """
+        if self.writer is not None:
+            self.writer.put(collection, objects)
+        else:
+            getattr(database, 'put_{}'.format(collection))(self.db, objects)
+
+    def _flush(self):
+        """
+        Block until all documents inserted so far have been written,
+        if a writer is set (direct inserts are written immediately).
+        """
+        if self.writer is not None:
+            self.writer.flush()
@@ -11,6 +11,7 @@ adhere to a hierarchy based on the "type" of file, where current types
 include metrics, counts, QC, and validation.
 """
 from .workflow import WorkflowFile
+from .workflowcache import WorkflowCache, workflow_cache
 from .workflowbatch import WorkflowBatchFile
 from .picardmetrics import PicardMetricsFile
 from .tophatstats import TophatStatsFile
@@ -18,3 +19,5 @@ from .htseqmetrics import HtseqMetricsFile
 from .htseqcounts import HtseqCountsFile
 from .fastqc import FastQCFile
 from .sexcheck import SexcheckFile
+from .compression import open_text, detect_compression, strip_compression_ext
+from .registry import ParserRegistry, parser_registry
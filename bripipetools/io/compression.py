@@ -0,0 +1,100 @@
+"""
+Open (possibly compressed) output files as text streams; gzip, bz2,
+and zip files are detected by their leading bytes and decompressed on
+the fly.
+"""
+import logging
+import os
+import io
+import gzip
+import bz2
+import zipfile
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+MAGIC_BYTES = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'PK\x03\x04', 'zip'),
+]
+
+COMPRESSION_EXTS = ['.gz', '.bz2', '.zip']
+
+
+def detect_compression(path):
+    """
+    Return the compression format of a file ('gzip', 'bz2', or 'zip')
+    based on its leading bytes, or None for uncompressed files.
+
+    :type path: str
+    :param path: path to file
+    """
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    for magic, compression in MAGIC_BYTES:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def strip_compression_ext(path):
+    """
+    Remove a compression extension (e.g., '.gz') from a path, if the
+    path has another extension underneath (e.g., 'counts.txt.gz').
+
+    :type path: str
+    :param path: path to file
+    """
+    base, ext = os.path.splitext(path)
+    if ext in COMPRESSION_EXTS and os.path.splitext(base)[-1]:
+        return base
+    return path
+
+
+def _get_zip_member(zf, path, member=None):
+    """
+    Return the name of the archive member to read: the member with the
+    specified basename, or the only file in the archive.
+    """
+    names = [n for n in zf.namelist() if not n.endswith('/')]
+    if member is not None:
+        names = [n for n in names if os.path.basename(n) == member]
+    if len(names) != 1:
+        logger.error("could not select {} in archive '{}' from {}"
+                     .format("'{}'".format(member) if member else 'a file',
+                             path, zf.namelist()))
+        raise KeyError("no unique '{}' file in archive '{}'"
+                       .format(member or '*', path))
+    return names[0]
+
+
+@contextmanager
+def open_text(path, member=None):
+    """
+    Open a file as a text stream, decompressing gzip, bz2, or zip
+    files as they are read.
+
+    :type path: str
+    :param path: path to file
+
+    :type member: str
+    :param member: for zip archives, basename of the file to read;
+        if not specified, the archive must contain a single file
+    """
+    compression = detect_compression(path)
+    if compression is None:
+        with open(path) as f:
+            yield f
+    elif compression == 'zip':
+        with zipfile.ZipFile(path) as zf:
+            name = _get_zip_member(zf, path, member)
+            logger.debug("reading '{}' from archive '{}'".format(name, path))
+            with zf.open(name) as f:
+                yield io.TextIOWrapper(f)
+    else:
+        logger.debug("reading {}-compressed file '{}'"
+                     .format(compression, path))
+        opener = gzip.open if compression == 'gzip' else bz2.open
+        with opener(path, 'rt') as f:
+            yield f
@@ -2,116 +2,118 @@
 Class for reading and parsing FastQC report files.
 """
 import logging
-import re
+
+from .compression import open_text
 
 logger = logging.getLogger(__name__)
 
+NUMERIC_CHARS = frozenset('0123456789.')
+
+# sections for which key-value pairs are included in the parsed summary
+TABLE_SECTIONS = ['basic_statistics', 'sequence_duplication_levels']
+
+# name of the report file within FastQC zip archives
+DATA_MEMBER = 'fastqc_data.txt'
+
 
 class FastQCFile(object):
     """
     Parser to read QC data from a FastQC report, stored in a
-    tab-delimited text file.
+    tab-delimited text file; the report can also be read directly from
+    a FastQC zip archive (or a compressed file), without extracting it.
     """
     def __init__(self, path):
         self.path = path
         self.data = {}
 
-    def _read_file(self):
+    def _read_lines(self):
         """
-        Read file into list of raw strings.
+        Open the file and yield lines one at a time.
         """
-        logger.debug("reading file '{}' to raw string list"
-                     .format(self.path))
-        with open(self.path) as f:
-            self.data['raw'] = f.readlines()
+        logger.debug("streaming lines from file '{}'".format(self.path))
+        with open_text(self.path, member=DATA_MEMBER) as f:
+            for line in f:
+                yield line
 
     def _clean_header(self, header):
         """
         Extract section header from header line, convert to snake case.
         """
-        return re.sub(' ', '_', re.sub('(>>|#)', '', header).lower())
+        return (header.replace('>>', '').replace('#', '')
+                .lower().replace(' ', '_'))
 
     def _clean_value(self, value):
         """
         Convert to numeric unless value contains text.
         """
-        if len(value) and not re.search(r'[^\d.]+', value.lower()):
+        if len(value) and NUMERIC_CHARS.issuperset(value):
             return float(value)
         else:
             return value
 
-    def _locate_sections(self):
-        """
-        Return a dict with section names as keys and tuples of start/end
-        line numbers as values.
-        """
-        section_headers = [self._clean_header(l.rstrip().split('\t')[0])
-                           for l in self.data['raw']
-                           if re.search('>>(?!END)', l)]
-        section_starts = [idx for idx, l in enumerate(self.data['raw'])
-                          if re.search('>>(?!END)', l)]
-        section_ends = [idx for idx, l in enumerate(self.data['raw'])
-                        if re.search('>>(?=END)', l)]
-        return dict(list(zip(section_headers, list(zip(section_starts, section_ends)))))
-
-    def _get_section_status(self, section_name, section_info):
-        """
-        Return a tuple with the section name and status.
-        """
-        logger.debug("getting section status for '{}' from line {}"
-                     .format(section_name,
-                             self.data['raw'][section_info[0]].rstrip()))
-        return (section_name,
-                self.data['raw'][section_info[0]][2:].rstrip().split('\t')[1])
+    def _iter_records(self, lines):
+        """
+        Walk through report lines once, tracking the current section,
+        and yield tuples of ('status', section name, status),
+        ('field', name, value) for key-value pairs in table sections, and
+        ('overrepresented_seq', row dict) for overrepresented sequences.
+        """
+        section = None
+        headers = None
+        for l in lines:
+            if l.startswith('>>'):
+                if l.startswith('>>END'):
+                    section = None
+                else:
+                    items = l[2:].rstrip().split('\t')
+                    section = self._clean_header(items[0])
+                    status = items[1]
+                    headers = None
+                    yield ('status', section, status)
+            elif section in TABLE_SECTIONS:
+                if l.count('\t') == 1 and '#Measure' not in l:
+                    field, value = l.rstrip().split('\t')
+                    yield ('field', self._clean_header(field),
+                           self._clean_value(value))
+            elif (section == 'overrepresented_sequences'
+                    and status != 'pass'):
+                items = l.rstrip().split('\t')
+                if headers is None:
+                    headers = [self._clean_header(item) for item in items]
+                else:
+                    yield ('overrepresented_seq',
+                           dict(zip(headers, [self._clean_value(item)
+                                              for item in items])))
 
-    def _parse_section_table(self, section_info):
-        """
-        For the specified section lines, parse tab-delimited columns into
-        key-value pairs and return list of tuples.
-        """
-        section_table = self.data['raw'][section_info[0]:section_info[1]]
-
-        return [tuple([self._clean_header(item)
-                       if idx == 0 else self._clean_value(item)
-                       for idx, item in enumerate(l.rstrip().split('\t'))])
-                for l in section_table[1:]
-                if len(l.split('\t')) == 2 and not re.search('#Measure', l)]
+    def parse_report(self):
+        """
+        Read the file once and return both the summary data (section
+        status and key-value pairs from tables) and the list of
+        overrepresented sequences; results are cached for subsequent
+        calls.
+        """
+        if 'report' not in self.data:
+            summary = {}
+            overrep_seqs = []
+            for record in self._iter_records(self._read_lines()):
+                if record[0] == 'overrepresented_seq':
+                    overrep_seqs.append(record[1])
+                else:
+                    summary[record[1]] = record[2]
+            logger.debug("{}".format(summary))
+            self.data['report'] = {'summary': summary,
+                                   'overrepresented_seqs': overrep_seqs}
+        return self.data['report']
 
     def parse(self):
         """
         Parse file and return key-value pairs as dictionary.
         """
-        self._read_file()
-        sections = self._locate_sections()
-        data = []
-        for section_name, section_info in list(sections.items()):
-            data.append(self._get_section_status(section_name, section_info))
-            if section_name in ['basic_statistics',
-                                'sequence_duplication_levels']:
-                data += self._parse_section_table(section_info)
-        logger.debug("{}".format(data))
-        return dict(data)
+        return self.parse_report()['summary']
 
     def parse_overrepresented_seqs(self):
         """
         Parse table of overrepresented sequences, return as list of
         dictionaries.
         """
-        self._read_file()
-        sections = self._locate_sections()
-        logger.debug("{}".format(sections))
-        section_status = self._get_section_status(
-            'overrepresented_sequences',
-            sections['overrepresented_sequences'])
-        if section_status[-1] != 'pass':
-            section_start, section_end = sections['overrepresented_sequences']
-            overrep_seq_table = self.data['raw'][section_start+1:section_end]
-
-            headers = [self._clean_header(item)
-                       for item in overrep_seq_table[0].rstrip().split('\t')]
-            return [dict(list(zip(headers,
-                             [self._clean_value(item)
-                              for item in l.rstrip().split('\t')])))
-                    for l in overrep_seq_table[1:]]
-        else:
-            return []
+        return self.parse_report()['overrepresented_seqs']
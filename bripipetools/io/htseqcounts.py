@@ -5,13 +5,20 @@ import logging
 
 import pandas as pd
 
+from .compression import open_text
+
 logger = logging.getLogger(__name__)
 
+# dtypes for gene name and count columns in htseq-count files
+COUNTS_DTYPES = {'geneName': str, 'count': 'int32'}
+
 
 class HtseqCountsFile(object):
     """
     Parser to read tables of counts generated by the htseq-count tool,
-    stored in a tab-delimited text file.
+    stored in a tab-delimited text file. Special counters reported by
+    htseq-count (e.g., '__no_feature', '__ambiguous') are kept in the
+    counts table, and can also be retrieved separately as metrics.
     """
     def __init__(self, path):
         self.path = path
@@ -19,15 +26,32 @@ class HtseqCountsFile(object):
 
     def _read_file(self):
         """
-        Read file into Pandas data frame.
+        Read file into Pandas data frame with the C parser and fixed
+        dtypes.
         """
         logger.debug("reading file '{}' to data frame".format(self.path))
-        self.data['table'] = pd.read_table(self.path,
-                                           names=['geneName', 'count'])
+        with open_text(self.path) as f:
+            self.data['table'] = pd.read_csv(f, sep='\t', header=None,
+                                             names=['geneName', 'count'],
+                                             dtype=COUNTS_DTYPES,
+                                             engine='c')
 
     def parse(self):
         """
-        Parse counts file and return data frame.
+        Parse counts file and return data frame of counts (including
+        special counters); the file is only read once.
         """
-        self._read_file()
+        if 'table' not in self.data:
+            self._read_file()
         return self.data['table']
+
+    def parse_metrics(self):
+        """
+        Return special counters (e.g., 'no_feature', 'ambiguous') from
+        the counts file as a dictionary.
+        """
+        table = self.parse()
+        special = table['geneName'].str.startswith('__')
+        return {name[2:]: int(count)
+                for name, count in zip(table['geneName'][special],
+                                       table['count'][special])}
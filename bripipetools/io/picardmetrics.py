@@ -8,6 +8,8 @@ import pathlib
 
 from bs4 import BeautifulSoup
 
+from .compression import open_text
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,7 +28,7 @@ class PicardMetricsFile(object):
         Read file into raw HTML string.
         """
         logger.debug("reading file '{}' to raw HTML string".format(self.path))
-        with open(self.path) as f:
+        with open_text(self.path) as f:
             self.data['raw'] = f.read()
 
     def _get_table(self):
@@ -117,7 +119,7 @@ class PicardMetricsFile(object):
         return metrics
 
     def _read_from_txt(self):
-        with open(self.path) as tsv_file:
+        with open_text(self.path) as tsv_file:
             csv_reader = csv.reader(tsv_file, delimiter= "\t")
             rows = list(csv_reader)
 
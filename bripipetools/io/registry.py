@@ -0,0 +1,156 @@
+"""
+Registry of parser classes for each output type and source, used to
+find and parse output files wherever outputs are read (e.g., when
+stitching, reading, or checking outputs).
+"""
+import logging
+import os
+import re
+import time
+import threading
+from functools import wraps
+
+from .compression import strip_compression_ext
+from .picardmetrics import PicardMetricsFile
+from .tophatstats import TophatStatsFile
+from .htseqmetrics import HtseqMetricsFile
+from .htseqcounts import HtseqCountsFile
+from .fastqc import FastQCFile
+from .sexcheck import SexcheckFile
+
+logger = logging.getLogger(__name__)
+
+
+class TimedParser(object):
+    """
+    Wraps a parser object, recording the duration of each call to a
+    'parse*' method in the registry's statistics; all other attributes
+    are passed through to the wrapped parser.
+    """
+    def __init__(self, parser, registry):
+        self._parser = parser
+        self._registry = registry
+
+    def __getattr__(self, attr):
+        target = getattr(self._parser, attr)
+        if not (attr.startswith('parse') and callable(target)):
+            return target
+
+        @wraps(target)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                self._registry.record(type(self._parser).__name__, attr,
+                                      time.time() - start)
+        return wrapper
+
+
+class ParserRegistry(object):
+    """
+    Maps output types and sources to parser classes, and output types to
+    the file extensions of their outputs; records the number of calls
+    and time spent in each parser method.
+    """
+    def __init__(self):
+        self.stats = {}
+        self._parsers = {}
+        self._filetypes = {}
+        self._lock = threading.Lock()
+
+    def register(self, output_type, sources, parser, filetypes=None):
+        """
+        Register a parser class for one or more sources of an output
+        type.
+
+        :type output_type: str
+        :param output_type: type of output (e.g., 'metrics', 'qc')
+
+        :type sources: list
+        :param sources: list of output sources (e.g., 'htseq')
+
+        :type parser: type
+        :param parser: parser class, created with the path to an output
+            file
+
+        :type filetypes: str
+        :param filetypes: regular expression matching file extensions
+            for outputs of this type
+        """
+        for source in sources:
+            self._parsers[(output_type, source)] = parser
+        if filetypes is not None:
+            self._filetypes[output_type] = filetypes
+
+    def get_parser(self, output_type, output_source):
+        """
+        Return the parser class for an output type and source.
+        """
+        try:
+            parser = self._parsers[(output_type, output_source)]
+        except KeyError:
+            logger.error("no parser registered for output type '{}' and "
+                         "source '{}'".format(output_type, output_source))
+            raise
+        logger.debug("matched parser '{}' for output type '{}' and source '{}'"
+                     .format(parser, output_type, output_source))
+        return parser
+
+    def create(self, path, output_type, output_source):
+        """
+        Return a (timed) parser object for an output file.
+        """
+        return TimedParser(
+            self.get_parser(output_type, output_source)(path=path), self
+        )
+
+    def is_output(self, filename, output_type):
+        """
+        Check whether a file is an (uncombined) output of the specified
+        type, based on its name and (uncompressed) extension.
+        """
+        return bool(
+            re.search(output_type, filename)
+            and not re.search('combined', filename)
+            and re.search(self._filetypes[output_type],
+                          os.path.splitext(
+                              strip_compression_ext(filename)
+                          )[-1])
+        )
+
+    def record(self, parser, method, seconds):
+        """
+        Add a call and its duration to the statistics.
+        """
+        with self._lock:
+            stats = self.stats.setdefault((parser, method),
+                                          {'count': 0, 'seconds': 0.0})
+            stats['count'] += 1
+            stats['seconds'] += seconds
+
+    def report(self):
+        """
+        Log the number of calls, total time, and mean time of each
+        parser method.
+        """
+        for (parser, method), stats in sorted(self.stats.items()):
+            logger.info("{}.{}: {} call(s), {:.3f}s total, {:.2f}ms mean"
+                        .format(parser, method, stats['count'],
+                                stats['seconds'],
+                                1000 * stats['seconds'] / stats['count']))
+
+
+parser_registry = ParserRegistry()
+parser_registry.register('metrics',
+                         ['picard-rnaseq', 'picard-markdups', 'picard-align',
+                          'picard-alignment'],
+                         PicardMetricsFile, filetypes='txt|html')
+parser_registry.register('metrics', ['htseq'], HtseqMetricsFile)
+parser_registry.register('metrics', ['tophat-stats'], TophatStatsFile)
+parser_registry.register('qc', ['fastqc', 'fastqc-R1', 'fastqc-R2'],
+                         FastQCFile, filetypes='txt|zip')
+parser_registry.register('counts', ['htseq'], HtseqCountsFile,
+                         filetypes='txt')
+parser_registry.register('validation', ['sexcheck'], SexcheckFile,
+                         filetypes='csv')
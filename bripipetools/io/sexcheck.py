@@ -3,6 +3,8 @@ Class for reading and parsing sex check validation files.
 """
 import logging
 
+from .compression import open_text
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,7 +22,7 @@ class SexcheckFile(object):
         Read file into list of raw strings.
         """
         logger.debug("reading file '{}' to raw string list".format(self.path))
-        with open(self.path) as f:
+        with open_text(self.path) as f:
             self.data['raw'] = f.readlines()
 
     def _parse_lines(self):
@@ -3,7 +3,9 @@ Classes for reading, parsing, and writing workflow batch submit files for
 Globus Galaxy.
 """
 import logging
+import os
 import re
+import itertools
 
 from collections import OrderedDict
 
@@ -28,6 +30,9 @@ class WorkflowBatchFile(object):
         self.path = path
         self.state = state
         self.data = {}
+        self._header = None
+        self._line_index = None
+        self._params = None
 
     def _read_file(self):
         """
@@ -38,14 +43,62 @@ class WorkflowBatchFile(object):
                      .format(self.path))
         with open(path) as f:
             self.data['raw'] = f.readlines()
+        self._header = None
+        self._line_index = None
+        self._params = None
+
+    def _read_header(self):
+        """
+        Read and store lines from batch submit file up to (and including)
+        the parameter header line, without reading sample lines.
+        """
+        logger.debug("reading header lines of file '{}'".format(self.path))
+        header = []
+        with open(self.path) as f:
+            for l in f:
+                header.append(l)
+                if 'SampleName' in l:
+                    break
+        self._header = header
+        self._line_index = None
+        self._params = None
+
+    def _get_lines(self):
+        """
+        Return all lines of the file, if read; otherwise, return only
+        the header lines.
+        """
+        if 'raw' in self.data:
+            return self.data['raw']
+        if self._header is None:
+            self._read_header()
+        return self._header
+
+    def _index_lines(self):
+        """
+        Scan lines once to find the workflow name, batch name, and
+        parameter header lines; return dict of line numbers.
+        """
+        if self._line_index is None:
+            labels = [('workflow_name', 'Workflow Name'),
+                      ('batch_name', 'Project Name'),
+                      ('params', 'SampleName')]
+            line_index = {}
+            for idx, l in enumerate(self._get_lines()):
+                for key, label in labels:
+                    if key not in line_index and label in l:
+                        line_index[key] = idx
+                if 'params' in line_index:
+                    break
+            self._line_index = line_index
+        return self._line_index
 
     def _locate_workflow_name_line(self):
         """
         Identify batch file metadata line with name of workflow; return
         line number.
         """
-        return [idx for idx, l in enumerate(self.data['raw'])
-                if 'Workflow Name' in l][0]
+        return self._index_lines()['workflow_name']
 
     def _locate_batch_name_line(self):
         """
@@ -53,30 +106,27 @@ class WorkflowBatchFile(object):
         return line number. Note: batch submissions can include multiple
         projects, so the 'batch name' label is more appropriate.
         """
-        return [idx for idx, l in enumerate(self.data['raw'])
-                if 'Project Name' in l][0]
+        return self._index_lines()['batch_name']
 
     def _locate_param_line(self):
         """
         Identify batch file header line with parameter names; return line
         number.
         """
-        return [idx for idx, l in enumerate(self.data['raw'])
-                if 'SampleName' in l][0]
+        return self._index_lines()['params']
 
     def _locate_sample_start_line(self):
         """
         Identify batch file line where sample parameter info begins; return
         line number. Note: should immediately follow parameter header line.
         """
-        return [idx for idx, l in enumerate(self.data['raw'])
-                if 'SampleName' in l][0] + 1
+        return self._locate_param_line() + 1
 
     def get_workflow_name(self):
         """
         Return name of workflow for batch submit file.
         """
-        workflow_name_line = (self.data['raw']
+        workflow_name_line = (self._get_lines()
                               [self._locate_workflow_name_line()])
         return workflow_name_line.strip().split('\t')[-1]
 
@@ -84,7 +134,7 @@ class WorkflowBatchFile(object):
         """
         Return name of workflow batch for batch submit file.
         """
-        batch_name_line = (self.data['raw']
+        batch_name_line = (self._get_lines()
                            [self._locate_batch_name_line()])
         return batch_name_line.strip().split('\t')[-1]
 
@@ -100,6 +150,17 @@ class WorkflowBatchFile(object):
             self.data['raw'][self._locate_batch_name_line()]
         )
 
+    def _get_param_list(self):
+        """
+        Parse the parameter header line once and return the list of
+        parameter dicts (shared by all samples; not to be modified).
+        """
+        if self._params is None:
+            param_line = self._get_lines()[self._locate_param_line()]
+            self._params = [parsing.parse_workflow_param(p)
+                            for p in param_line.strip().split('\t')]
+        return self._params
+
     def get_params(self):
         """
         Return the parameters defined for the current workflow.
@@ -108,10 +169,8 @@ class WorkflowBatchFile(object):
         :return: A list of tuples with number (index) and dict with details
             for each parameter.
         """
-        param_line = self.data['raw'][self._locate_param_line()]
-        return OrderedDict((idx, parsing.parse_workflow_param(p))
-                           for idx, p
-                           in enumerate(param_line.strip().split('\t')))
+        return OrderedDict((idx, dict(p))
+                           for idx, p in enumerate(self._get_param_list()))
 
     def get_sample_params(self, sample_line):
         """
@@ -125,14 +184,55 @@ class WorkflowBatchFile(object):
         :rtype: list
         :return: A list of dicts, one for each sample.
         """
-        parameters_ordered = self.get_params()
+        parameters = self._get_param_list()
+        return [dict(parameters[idx], value=sp)
+                for idx, sp in enumerate(sample_line.strip().split('\t'))]
+
+    def iter_samples(self):
+        """
+        Yield the parameter values for each sample as a tuple, ordered
+        as the parameters returned by ``get_params``; sample lines are
+        read lazily from the file (unless already read).
 
-        sample_line_parts = sample_line.strip().split('\t')
-        sample_parameters = [parameters_ordered[idx]
-                             for idx, sp in enumerate(sample_line_parts)]
-        for idx, sp in enumerate(sample_line_parts):
-            sample_parameters[idx]['value'] = sp
-        return sample_parameters
+        :rtype: generator
+        :return: A generator of tuples, one for each sample.
+        """
+        start = self._locate_sample_start_line()
+        if 'raw' in self.data:
+            for l in self.data['raw'][start:]:
+                yield tuple(l.strip().split('\t'))
+            return
+        with open(self.path) as f:
+            for l in itertools.islice(f, start, None):
+                yield tuple(l.strip().split('\t'))
+
+    def iter_outputs(self):
+        """
+        Yield the sample name and output files for each sample, without
+        building per-sample parameter dicts.
+
+        :rtype: generator
+        :return: A generator of tuples with the sample name and a dict
+            mapping the tag of each output to its path.
+        """
+        parameters = self._get_param_list()
+        name_idx = [idx for idx, p in enumerate(parameters)
+                    if p['name'] == 'SampleName'][0]
+        output_idxs = [(idx, p['tag']) for idx, p in enumerate(parameters)
+                       if p['type'] == 'output' and p['name'] == 'to_path']
+        for values in self.iter_samples():
+            yield (values[name_idx],
+                   {tag: values[idx] for idx, tag in output_idxs
+                    if idx < len(values)})
+
+    def load(self):
+        """
+        Read and store all lines of the batch submit file (if not already
+        read), so that samples can be iterated repeatedly without
+        re-reading the file.
+        """
+        if 'raw' not in self.data:
+            self._read_file()
 
     def parse(self):
         """
@@ -150,9 +250,13 @@ class WorkflowBatchFile(object):
 
     def write(self, path, batch_name=None, sample_lines=None):
         """
-        Write workflow batch data to file.
+        Write workflow batch data to file; lines are written to a hidden
+        temporary file in the same folder, which then replaces the
+        target path, so that partially written batch files never appear
+        (and the temporary file is removed if writing fails).
         """
-        self.parse()
+        if 'raw' not in self.data:
+            self.parse()
         if batch_name is not None:
             self.update_batch_name(batch_name)
 
@@ -164,5 +268,13 @@ class WorkflowBatchFile(object):
                             for s in self.data['samples']]
         workflow_lines = template_lines + sample_lines
 
-        with open(path, 'w+') as f:
-            f.writelines(workflow_lines)
+        tmp_path = os.path.join(os.path.dirname(path),
+                                '.{}.tmp'.format(os.path.basename(path)))
+        try:
+            with open(tmp_path, 'w+') as f:
+                f.writelines(workflow_lines)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,131 @@
+"""
+Process-wide cache of the name and tool versions parsed from Galaxy
+workflow (`.ga`) files, with an optional precomputed index stored in
+the workflow folder.
+"""
+import logging
+import os
+import json
+import threading
+
+from .workflow import WorkflowFile
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = '.workflow_index.json'
+
+
+class WorkflowCache(object):
+    """
+    Stores the workflow name and tool version map for each workflow
+    file, keyed by path and reused until the file's modification time
+    changes; the full workflow description is not kept.
+    """
+    def __init__(self):
+        self._cache = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _get_index_path(self, workflow_dir, index_path=None):
+        if index_path is None:
+            index_path = os.path.join(workflow_dir, INDEX_FILENAME)
+        return index_path
+
+    def _copy_entry(self, entry):
+        return {'name': entry['name'], 'tools': dict(entry['tools'])}
+
+    def get(self, path):
+        """
+        Return a dict with the 'name' and 'tools' (tool ID to version)
+        of a workflow file, parsing the file only if it is not cached
+        or has changed.
+
+        :type path: str
+        :param path: path to workflow file
+        """
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return self._copy_entry(cached[1])
+
+        logger.debug("parsing workflow file '{}'".format(path))
+        workflow_data = WorkflowFile(path).parse()
+        entry = {'name': workflow_data['name'],
+                 'tools': workflow_data['tools']}
+        with self._lock:
+            self._cache[path] = (mtime, entry)
+        return self._copy_entry(entry)
+
+    def load_index(self, workflow_dir, index_path=None):
+        """
+        Add entries from a workflow folder's index to the cache, for
+        workflow files unchanged since the index was built; return the
+        number of entries loaded. Each index is read only once, unless
+        it has been rebuilt.
+
+        :type workflow_dir: str
+        :param workflow_dir: path to folder containing workflow files
+        :type index_path: str
+        :param index_path: path to index file (defaults to
+            '.workflow_index.json' in the workflow folder)
+        """
+        index_path = self._get_index_path(workflow_dir, index_path)
+        if not os.path.isfile(index_path):
+            logger.debug("no workflow index found at '{}'"
+                         .format(index_path))
+            return 0
+        index_mtime = os.stat(index_path).st_mtime_ns
+        with self._lock:
+            if self._indexes.get(index_path) == index_mtime:
+                return 0
+
+        logger.debug("loading workflow index '{}'".format(index_path))
+        with open(index_path) as f:
+            index = json.load(f)
+        entries = {}
+        for filename, entry in list(index.items()):
+            path = os.path.join(workflow_dir, filename)
+            if (os.path.isfile(path)
+                    and os.stat(path).st_mtime_ns == entry['mtime_ns']):
+                entries[path] = (entry['mtime_ns'],
+                                 {'name': entry['name'],
+                                  'tools': entry['tools']})
+            else:
+                logger.debug("skipping outdated index entry for '{}'"
+                             .format(path))
+        with self._lock:
+            self._cache.update(entries)
+            self._indexes[index_path] = index_mtime
+        return len(entries)
+
+    def build_index(self, workflow_dir, index_path=None):
+        """
+        Parse all workflow files in a folder and write their names and
+        tool versions to an index file; return the index path.
+
+        :type workflow_dir: str
+        :param workflow_dir: path to folder containing workflow files
+        :type index_path: str
+        :param index_path: path to index file (defaults to
+            '.workflow_index.json' in the workflow folder)
+        """
+        index_path = self._get_index_path(workflow_dir, index_path)
+        logger.info("building workflow index for '{}'".format(workflow_dir))
+        index = {}
+        for filename in sorted(os.listdir(workflow_dir)):
+            if not filename.endswith('.ga'):
+                continue
+            path = os.path.join(workflow_dir, filename)
+            entry = self.get(path)
+            entry['mtime_ns'] = os.stat(path).st_mtime_ns
+            index[filename] = entry
+
+        tmp_path = '{}.tmp'.format(index_path)
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, index_path)
+        return index_path
+
+
+workflow_cache = WorkflowCache()
@@ -12,7 +12,7 @@ logger = logging.getLogger(__name__)
 
 
 class WorkflowBatchMonitor(object):
-    def __init__(self, workflowbatch_file, pipeline_root):
+    def __init__(self, workflowbatch_file, pipeline_root, reader=None):
         """
         Controls operations (identification, annotation, etc.) for the
         set of outputs generated by a batch processing job in Globus
@@ -23,14 +23,17 @@ class WorkflowBatchMonitor(object):
             batch file.
         :type pipeline_root: str
         :param pipeline_root: Path to the root directory for processing
+        :type reader: type[io.WorkflowBatchFile]
+        :param reader: Reader for the workflow batch file (e.g., shared
+            through a ``RunContext``); created if not provided.
         """
         logger.debug("creating `WorkflowBatchMonitor` instance for '{}'"
                      .format(workflowbatch_file))
         self.workflowbatch_file = workflowbatch_file
-        self.workflowbatch_data = io.WorkflowBatchFile(
-            self.workflowbatch_file,
-            state='submit'
-        ).parse()
+        if reader is None:
+            reader = io.WorkflowBatchFile(self.workflowbatch_file,
+                                          state='submit')
+        self.workflowbatch = reader
         self.pipeline_root = pipeline_root
 
     def _get_outputs(self):
@@ -42,9 +45,8 @@ class WorkflowBatchMonitor(object):
             workflow batch, where key-value pairs in the dict describe
             the tag/label and path to each output file for the sample.
         """
-        return [{p['tag']: p['value'] for p in sample_params
-                 if p['type'] == 'output' and p['name'] == 'to_path'}
-                for sample_params in self.workflowbatch_data['samples']]
+        return [sample_outputs for sample_name, sample_outputs
+                in self.workflowbatch.iter_outputs()]
 
     def _clean_output_paths(self, outputs):
         """
@@ -59,9 +61,9 @@ class WorkflowBatchMonitor(object):
         :return: A list of dicts, with output file paths updated to
             use the current system root for the 'genomics' server.
         """
-        return [{out_tag: util.swap_root(out_path,
-                                         'pipeline', self.pipeline_root)
-                 for out_tag, out_path in list(sample_outputs.items())}
+        rewriter = util.get_root_rewriter('pipeline', self.pipeline_root)
+        return [dict(zip(sample_outputs,
+                         rewriter.rewrite_all(list(sample_outputs.values()))))
                 for sample_outputs in outputs]
 
     def check_outputs(self):
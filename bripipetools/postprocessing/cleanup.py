@@ -6,6 +6,7 @@ import os
 import re
 import zipfile
 import shutil
+import concurrent.futures
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +15,17 @@ class OutputCleaner(object):
     """
     Moves, renames, and deletes individual output files from a workflow
     processing batch for a selected project.
+
+    :type max_workers: int
+    :param max_workers: maximum number of archives or files processed
+        concurrently when cleaning outputs
     """
-    def __init__(self, path):
+    keep_members = {'QC': 'fastqc_data.txt'}
+
+    def __init__(self, path, max_workers=8):
         logger.debug("creating `OutputCleaner` instance for '{}'".format(path))
         self.path = path
+        self.max_workers = max_workers
         self.output_types = self._get_output_types()
 
     def _get_output_types(self):
@@ -42,65 +50,128 @@ class OutputCleaner(object):
                 for f in files
                 if not re.search('(DS_Store|_old)', f)]
 
-    def _unzip_output(self, path):
+    def _recode_path(self, path, output_type):
         """
-        Unzip the contents of a compressed output file.
+        Return the path to which a file would be renamed according to
+        template (without renaming the file).
         """
-        logging.debug("extracting contents of '{}' to '{}'"
-                      .format(path, os.path.dirname(path)))
-        paths = []
-        with zipfile.ZipFile(path) as zf:
-            logger.debug("zip folder contents: {}".format(zf.namelist()))
-            for f in zf.namelist():
-                if f != './':
-                    paths.append(zf.extract(f, os.path.dirname(path)))
-        logging.debug("unzipped the following files: {}".format(paths))
-        return paths
+        filename_map = {'QC': ('fastqc_data.txt', 'fastqc_qc.txt')}
+        swap = filename_map[output_type]
+        return os.path.join(os.path.dirname(path),
+                            re.sub(swap[0], swap[1], os.path.basename(path)))
 
-    def _unnest_output(self, path):
+    def _plan_output(self, path, output_type):
         """
-        Unnest files in a subfolder by concatenating filenames and
-        moving up one level.
+        Return the list of changes needed to unzip, unnest, and rename
+        an output file, where each change is a dict with the 'action'
+        ('extract' or 'move'), 'source' path, archive 'member' (for
+        extracted files), and final 'destination' path.
         """
-        logging.debug("unnesting output '{}' from subfolder '{}'"
-                      .format(path, os.path.dirname(path)))
+        output_root = os.path.join(self.path, output_type)
+        if os.path.dirname(path) == output_root:
+            destination = self._recode_path(path, output_type)
+            if destination == path:
+                return []
+            return [{'action': 'move', 'source': path, 'member': None,
+                     'destination': destination}]
+
         prefix = os.path.dirname(path)
         if re.search('.zip$', path):
-            logging.debug("unzipping contents of '{}' before unnesting"
-                          .format(path))
-            for p in self._unzip_output(path):
-                shutil.move(p, '{}_{}'.format(prefix, os.path.basename(p)))
-            try:
-                shutil.rmtree(os.path.splitext(path)[0])
-            except OSError:
-                pass
+            with zipfile.ZipFile(path) as zf:
+                members = [m for m in zf.namelist()
+                           if os.path.basename(m)
+                           == self.keep_members[output_type]]
+            changes = [{'action': 'extract', 'source': path, 'member': m,
+                        'destination': '{}_{}'.format(prefix,
+                                                      os.path.basename(m))}
+                       for m in members]
         else:
-            shutil.move(path, '{}_{}'.format(prefix, os.path.basename(path)))
+            changes = [{'action': 'move', 'source': path, 'member': None,
+                        'destination': '{}_{}'.format(
+                            prefix, os.path.basename(path)
+                        )}]
+        for change in changes:
+            if os.path.dirname(change['destination']) == output_root:
+                change['destination'] = self._recode_path(
+                    change['destination'], output_type
+                )
+        return changes
 
-    def _recode_output(self, path, output_type):
+    def _describe_change(self, change):
         """
-        Rename file according to template.
+        Return a description of a planned change for logging.
         """
-        filename_map = {'QC': ('fastqc_data.txt', 'fastqc_qc.txt')}
-        swap = filename_map[output_type]
-        newpath = re.sub(swap[0], swap[1], path)
-        logging.debug("renaming '{}' to '{}'".format(path, newpath))
-        shutil.move(path, newpath)
-        return newpath
+        source = change['source']
+        if change['member'] is not None:
+            source = '{}:{}'.format(source, change['member'])
+        return "{} '{}' to '{}'".format(change['action'], source,
+                                        change['destination'])
 
-    def clean_outputs(self):
+    def _apply_changes(self, changes):
         """
-        Walk through output types to unzip, unnest, and rename files.
+        Apply the planned changes for one output file; members are
+        extracted straight to their final path, via a temporary file
+        that is renamed once fully written.
         """
+        for change in changes:
+            logger.debug(self._describe_change(change))
+            if change['action'] == 'move':
+                shutil.move(change['source'], change['destination'])
+                continue
+            tmp_path = '{}.tmp'.format(change['destination'])
+            with zipfile.ZipFile(change['source']) as zf, \
+                    zf.open(change['member']) as src, \
+                    open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, change['destination'])
+
+    def plan_outputs(self):
+        """
+        Return the list of changes needed to unzip, unnest, and rename
+        output files, without changing any files.
+        """
+        changes = []
         for output_type in self.output_types:
             if output_type == 'QC':
-                outputs = self._get_output_paths(output_type)
-                for o in outputs:
-                    outregex = re.compile(output_type + '$')
-                    if not outregex.search(os.path.dirname(o)):
-                        self._unnest_output(o)
-                for o in os.listdir(os.path.join(self.path, output_type)):
-                    self._recode_output(
-                        os.path.join(self.path, output_type, o),
-                        output_type
-                    )
+                for o in sorted(self._get_output_paths(output_type)):
+                    changes += self._plan_output(o, output_type)
+        destinations = [c['destination'] for c in changes]
+        duplicates = set(d for d in destinations
+                         if destinations.count(d) > 1)
+        if len(duplicates):
+            logger.warning("multiple outputs would be written to {}; "
+                           "only the last will be kept"
+                           .format(sorted(duplicates)))
+        return changes
+
+    def clean_outputs(self, dry_run=False):
+        """
+        Walk through output types to unzip, unnest, and rename files,
+        processing archives and files concurrently; only members of
+        archives that are kept are extracted.
+
+        :type dry_run: bool
+        :param dry_run: if True, report planned changes without
+            changing any files
+
+        :rtype: list
+        :return: list of changes planned or applied, each a dict with
+            the 'action', 'source', 'member', and 'destination'
+        """
+        changes = self.plan_outputs()
+        if dry_run:
+            for c in changes:
+                logger.info("(dry run) {}".format(self._describe_change(c)))
+            return changes
+
+        by_source = {}
+        for c in changes:
+            by_source.setdefault(c['source'], []).append(c)
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers) as executor:
+            for future in [executor.submit(self._apply_changes, cs)
+                           for cs in list(by_source.values())]:
+                future.result()
+        logger.debug("applied {} change(s) to outputs in '{}'"
+                     .format(len(changes), self.path))
+        return changes
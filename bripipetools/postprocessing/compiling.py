@@ -1,11 +1,12 @@
 """
 Compile combined/stitched 'summary' outputs of different types from
-batch processing and write to a single CSV file.
+batch processing and write to a single CSV (or columnar format) file.
 """
 import logging
 import os
 import re
-import csv
+
+from . import formats
 
 logger = logging.getLogger(__name__)
 
@@ -14,33 +15,69 @@ class OutputCompiler(object):
     """
     Reads combined output tables from list of file paths and compiles
     into single table, stored in a file at the project level.
+
+    :type table_format: str
+    :param table_format: format for the compiled table, one of 'csv',
+        'parquet', or 'feather'; input tables may be in any of these
+        formats
     """
-    def __init__(self, paths):
+    def __init__(self, paths, table_format='csv'):
         logger.debug("creating `OutputCompiler` instance")
         self.paths = paths
+        self.table_format = table_format
 
     def _read_data(self):
         """
-        Read, sort, and store data for each output file.
+        Stream rows from each output file and index values by sample ID
+        (first column, with header 'libId'); store the header fields
+        of each file, and log any samples missing from some files.
         """
-        self.data = []
+        self.headers = []
+        self.data = {}
+        self.missing = {}
 
-        for p in self.paths:
+        for idx, p in enumerate(self.paths):
             logger.debug("parsing output file '{}'".format(p))
-            with open(p) as f:
-                p_data = list(csv.reader(f))
-                self.data.append([p_data[0]] + sorted(p_data[1:]))
+            rows = formats.read_table_rows(p)
+            self.headers.append(next(rows)[1:])
+            for row in rows:
+                if not len(row):
+                    continue
+                values = self.data.setdefault(row[0],
+                                              [None] * len(self.paths))
+                if values[idx] is not None:
+                    logger.warning("duplicate sample '{}' in file '{}'; "
+                                   "keeping last row".format(row[0], p))
+                values[idx] = row[1:]
+
+        for idx, p in enumerate(self.paths):
+            missing = sorted(lib_id for lib_id, values in self.data.items()
+                             if values[idx] is None)
+            if len(missing):
+                logger.warning("{} sample(s) missing from file '{}': {}"
+                               .format(len(missing), p, missing))
+                self.missing[p] = missing
+
+    def _iter_rows(self):
+        """
+        Yield the header row, then one row per sample (sorted by ID),
+        joining values from all files; values for samples missing from
+        a file are left empty.
+        """
+        yield ['libId'] + [field for header in self.headers
+                           for field in header]
+        for lib_id in sorted(self.data):
+            row = [lib_id]
+            for header, values in zip(self.headers, self.data[lib_id]):
+                row += values if values is not None else [''] * len(header)
+            yield row
 
     def _build_table(self):
         """
-        Combine data into table for writing; only keep sample IDs
-        (first column of each file, with header 'libId') from first
-        file in list.
+        Combine data into table for writing, with an outer join on
+        sample IDs (first column of each file, with header 'libId').
         """
-        table_data = self.data[0]
-        for i in range(len(self.data))[1:]:
-            table_data = [a + b[1:] for a, b in zip(table_data, self.data[i])]
-        return table_data
+        return list(self._iter_rows())
 
     def _build_combined_filename(self):
         """
@@ -51,16 +88,12 @@ class OutputCompiler(object):
 
     def write_table(self):
         """
-        Write the combined table to a CSV file.
+        Write the combined table to a file in the selected format.
         """
         self._read_data()
-        table_data = self._build_table()
         project_path = os.path.dirname(os.path.dirname(self.paths[0]))
         table_path = os.path.join(project_path,
                                   self._build_combined_filename())
         logger.debug("writing to file '{}'".format(table_path))
-        with open(table_path, 'w') as f:
-            writer = csv.writer(f, lineterminator='\n')
-            for row in table_data:
-                writer.writerow(row)
-        return table_path
+        return formats.write_table_data(self._iter_rows(), table_path,
+                                        self.table_format)
@@ -0,0 +1,205 @@
+"""
+Write combined output tables in CSV or columnar (Parquet, Feather, HDF5)
+formats; columnar formats require optional dependencies ('pyarrow' for
+Parquet and Feather, 'tables' for HDF5).
+"""
+import logging
+import os
+import csv
+import importlib.util
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TABLE_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'hdf5': '.h5',
+}
+
+FORMAT_DEPENDENCIES = {
+    'parquet': 'pyarrow',
+    'feather': 'pyarrow',
+    'hdf5': 'tables',
+}
+
+
+def get_table_format(table_format, counts=False):
+    """
+    Return the format used to write a table; HDF5 is only used for
+    counts tables, and other tables are written as CSV instead.
+
+    :type table_format: str
+    :param table_format: requested format for combined tables
+
+    :type counts: bool
+    :param counts: if True, the table is a gene-by-sample counts table
+    """
+    if table_format not in TABLE_FORMATS:
+        logger.error("unsupported table format '{}'".format(table_format))
+        raise ValueError("unsupported table format '{}'; options are {}"
+                         .format(table_format, sorted(TABLE_FORMATS)))
+    if table_format == 'hdf5' and not counts:
+        logger.warning("HDF5 format is only used for counts tables; "
+                       "writing CSV instead")
+        return 'csv'
+    return table_format
+
+
+def get_table_path(path, table_format):
+    """
+    Replace the extension of a table path with the extension for the
+    specified format.
+
+    :type path: str
+    :param path: path to combined table file
+
+    :type table_format: str
+    :param table_format: format of the combined table file
+    """
+    return os.path.splitext(path)[0] + TABLE_FORMATS[table_format]
+
+
+def _check_dependency(table_format):
+    """
+    Raise an ``ImportError`` if the package required to write the
+    specified format is not installed.
+    """
+    package = FORMAT_DEPENDENCIES.get(table_format)
+    if package is not None and importlib.util.find_spec(package) is None:
+        logger.error("the '{}' package is required to write {} tables"
+                     .format(package, table_format))
+        raise ImportError("No module named '{}'".format(package))
+
+
+def convert_dtypes(table, counts=False):
+    """
+    Return a copy of the table with typed columns: numeric columns are
+    converted from strings (with empty values as missing), and count
+    columns in counts tables are stored as integers.
+
+    :type table: pandas.core.frame.DataFrame
+    :param table: combined table data
+
+    :type counts: bool
+    :param counts: if True, all columns except 'geneName' are counts
+    """
+    table = table.copy()
+    for column in table.columns:
+        if counts and column != 'geneName':
+            table[column] = table[column].astype('int64')
+            continue
+        values = table[column].where(table[column] != '')
+        try:
+            table[column] = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            pass
+    return table
+
+
+def to_data_frame(table_data):
+    """
+    Convert a table stored as a list of rows (with the header row
+    first) to a data frame; data frames are returned unchanged.
+
+    :type table_data: list, pandas.core.frame.DataFrame
+    :param table_data: combined table data
+    """
+    if isinstance(table_data, pd.DataFrame):
+        return table_data
+    return pd.DataFrame(list(table_data[1:]), columns=table_data[0])
+
+
+def write_table_data(table_data, path, table_format='csv', counts=False):
+    """
+    Write table data to a file in the specified format, replacing the
+    extension of the input path to match the format.
+
+    :type table_data: list, pandas.core.frame.DataFrame
+    :param table_data: combined table data, either a data frame or a
+        list (or other iterable) of rows with the header row first
+
+    :type path: str
+    :param path: path to combined table file
+
+    :type table_format: str
+    :param table_format: one of 'csv', 'parquet', 'feather', or 'hdf5'
+
+    :type counts: bool
+    :param counts: if True, the table is a gene-by-sample counts table
+
+    :rtype: str
+    :return: path to the file written
+    """
+    table_format = get_table_format(table_format, counts)
+    _check_dependency(table_format)
+    table_path = get_table_path(path, table_format)
+    logger.debug("writing {} table to file '{}'"
+                 .format(table_format, table_path))
+    if table_format == 'csv':
+        if isinstance(table_data, pd.DataFrame):
+            table_data.to_csv(table_path, index=False)
+        else:
+            with open(table_path, 'w') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerows(table_data)
+        return table_path
+
+    if not isinstance(table_data, pd.DataFrame):
+        table_data = list(table_data)
+    table = convert_dtypes(to_data_frame(table_data), counts)
+    if table_format == 'parquet':
+        table.to_parquet(table_path, compression='zstd', index=False)
+    elif table_format == 'feather':
+        table.reset_index(drop=True).to_feather(table_path,
+                                                compression='zstd')
+    else:
+        table.to_hdf(table_path, key='counts', mode='w', format='table',
+                     complib='blosc', complevel=9, index=False)
+    return table_path
+
+
+def read_table(path, counts=False):
+    """
+    Read a combined table file written in any supported format into a
+    data frame; values in CSV tables (other than counts) are kept as
+    strings, so that they are written back unchanged.
+
+    :type path: str
+    :param path: path to combined table file
+
+    :type counts: bool
+    :param counts: if True, the table is a gene-by-sample counts table
+    """
+    ext = os.path.splitext(path)[-1]
+    if ext == TABLE_FORMATS['csv']:
+        if counts:
+            return pd.read_csv(path)
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    if ext == TABLE_FORMATS['parquet']:
+        return pd.read_parquet(path)
+    if ext == TABLE_FORMATS['feather']:
+        return pd.read_feather(path)
+    return pd.read_hdf(path)
+
+
+def read_table_rows(path):
+    """
+    Yield rows (as lists, with the header row first) from a combined
+    table file written in any supported format.
+
+    :type path: str
+    :param path: path to combined table file
+    """
+    if os.path.splitext(path)[-1] == TABLE_FORMATS['csv']:
+        with open(path) as f:
+            for row in csv.reader(f):
+                yield row
+        return
+    table = read_table(path)
+    yield list(table.columns)
+    for row in table.astype(object).where(table.notna(), '') \
+            .itertuples(index=False):
+        yield list(row)
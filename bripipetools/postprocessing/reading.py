@@ -41,38 +41,16 @@ class OutputReader(object):
         """
         Return list of outputs of specified type.
         """
-        output_filetypes = {'metrics': 'txt|html',
-                            'qc': 'txt',
-                            'counts': 'txt',
-                            'validation': 'csv'}
         return [os.path.join(self.path, f)
                 for f in os.listdir(self.path)
-                if re.search(output_type, f)
-                and re.search(library, f)
-                and not re.search('combined', f)
-                and re.search(output_filetypes[output_type], os.path.splitext(f)[-1])]
+                if re.search(library, f)
+                and io.parser_registry.is_output(f, output_type)]
 
     def _get_parser(self, output_type, output_source):
         """
         Return the appropriate parser for the current output file.
         """
-        parsers = {
-            'metrics': {'htseq': getattr(io, 'HtseqMetricsFile'),
-                        'picard-rnaseq': getattr(io, 'PicardMetricsFile'),
-                        'picard-markdups': getattr(io, 'PicardMetricsFile'),
-                        'picard-align': getattr(io, 'PicardMetricsFile'),
-                        'picard-alignment': getattr(io, 'PicardMetricsFile'),
-                        'tophat-stats': getattr(io, 'TophatStatsFile')},
-            'qc': {'fastqc': getattr(io, 'FastQCFile'),
-		   'fastqc-R1': getattr(io, 'FastQCFile'),
-		   'fastqc-R2': getattr(io, 'FastQCFile')},
-            'counts': {'htseq': getattr(io, 'HtseqCountsFile')},
-            'validation': {'sexcheck': getattr(io, 'SexcheckFile')}
-        }
-        logger.debug("matched parser '{}' for output type '{}' and source '{}'"
-                     .format(parsers[output_type][output_source],
-                             output_type, output_source))
-        return parsers[output_type][output_source]
+        return io.parser_registry.get_parser(output_type, output_source)
 
     def read_data(self, seqlib_id):
         """
@@ -84,13 +62,14 @@ class OutputReader(object):
 
         for o in outputs:
             logger.debug("parsing output file '{}'".format(o))
-            out_items = parsing.parse_output_filename(o)
+            out_items = parsing.parse_output_filename(
+                io.strip_compression_ext(o))
             proclib_id = out_items['sample_id']
             out_type = out_items['type']
             out_source = out_items['source']
 
             logger.debug("storing data from '{}' in '{}' '{}'".format(out_source, proclib_id, out_type))
-            out_parser = self._get_parser(out_type, out_source)(path=o)
+            out_parser = io.parser_registry.create(o, out_type, out_source)
 
             #self.data.setdefault(out_type, {}).setdefault(proclib_id, []).append({out_source: out_parser.parse()})
             dataframe = out_parser.parse()
@@ -99,7 +78,7 @@ class OutputReader(object):
                 self.data = dataframe.set_index('geneName')['count'].to_dict()
             else:
                 mod_source = out_source.replace("-", "_")
-                self.data.setdefault(out_type, []).append({mod_source: out_parser.parse()})
+                self.data.setdefault(out_type, []).append({mod_source: dataframe})
         
         return self.data
         
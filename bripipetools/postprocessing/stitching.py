@@ -5,13 +5,15 @@ single CSV file.
 import logging
 import os
 import re
-import csv
+import json
+from collections import OrderedDict
 
 import pandas as pd
 
 from .. import io
 from .. import parsing
 from .. import util
+from . import formats
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +21,27 @@ logger = logging.getLogger(__name__)
 class OutputStitcher(object):
     """
     Given a path to an output folder or list of files, combine parsed data
-    from files and write CSV.
+    from files and write CSV (or a columnar format).
+
+    :type table_format: str
+    :param table_format: format for combined tables, one of 'csv',
+        'parquet', 'feather', or 'hdf5' (counts only)
+
+    :type incremental: bool
+    :param incremental: if True, record the sources of combined tables
+        in a manifest file and, if tables were previously written, only
+        parse outputs that are new or changed since then and merge them
+        into the existing tables
     """
-    def __init__(self, path, output_type=None, outputs=None):
+    def __init__(self, path, output_type=None, outputs=None,
+                 table_format='csv', incremental=False):
         logger.debug("creating `OutputStitcher` for path '{}'".format(path))
         self.path = path
+        self.table_format = table_format
+        self.incremental = incremental
         if output_type is None:
             self.type = self._sniff_output_type()
+        self._parsers = {}
 
     def _sniff_output_type(self):
         """
@@ -39,63 +55,104 @@ class OutputStitcher(object):
 
     def _get_outputs(self, output_type):
         """
-        Return list of outputs of specified type.
+        Return list of outputs of specified type; for QC outputs, this
+        includes FastQC zip archives (unless the report was already
+        extracted), either in the output folder or nested in sample
+        subfolders.
+        """
+        filenames = os.listdir(self.path)
+        outputs = [os.path.join(self.path, f)
+                   for f in filenames
+                   if io.parser_registry.is_output(f, output_type)]
+        if output_type != 'qc':
+            return outputs
+
+        # skip archives for reports that have already been extracted
+        # (i.e., by cleaning outputs)
+        def stem(path):
+            return os.path.splitext(self._get_output_name(path))[0]
+
+        extracted = set(stem(o) for o in outputs
+                        if self._get_output_name(o).endswith('.txt'))
+        outputs = [o for o in outputs
+                   if self._get_output_name(o).endswith('.txt')
+                   or stem(o) not in extracted]
+        for d in filenames:
+            subfolder = os.path.join(self.path, d)
+            if not os.path.isdir(subfolder):
+                continue
+            archives = sorted(os.path.join(subfolder, f)
+                              for f in os.listdir(subfolder)
+                              if f.endswith('.zip'))
+            if len(archives) > 1:
+                logger.warning("multiple archives found in '{}'; "
+                               "using '{}'".format(subfolder, archives[0]))
+            if len(archives) and stem(archives[0]) not in extracted:
+                outputs.append(archives[0])
+        return outputs
+
+    def _get_output_name(self, path):
+        """
+        Return the path used to parse sample ID and output details for an
+        output file, without any compression extension (e.g., '.gz');
+        archives nested in a sample subfolder are named (as when
+        cleaning outputs) '<subfolder>_fastqc_qc.zip'.
         """
-        output_filetypes = {'metrics': 'txt|html',
-                            'qc': 'txt',
-                            'counts': 'txt',
-                            'validation': 'csv'}
-        return [os.path.join(self.path, f)
-                for f in os.listdir(self.path)
-                if re.search(output_type, f)
-                and not re.search('combined', f)
-                and re.search(output_filetypes[output_type],
-                              os.path.splitext(f)[-1])]
+        if os.path.dirname(path) != self.path:
+            return '{}_fastqc_qc.zip'.format(os.path.dirname(path))
+        return io.strip_compression_ext(path)
 
     def _get_parser(self, output_type, output_source):
         """
         Return the appropriate parser for the current output file.
         """
-        parsers = {
-            'metrics': {'htseq': getattr(io, 'HtseqMetricsFile'),
-                        'picard-rnaseq': getattr(io, 'PicardMetricsFile'),
-                        'picard-markdups': getattr(io, 'PicardMetricsFile'),
-                        'picard-align': getattr(io, 'PicardMetricsFile'),
-                        'picard-alignment': getattr(io, 'PicardMetricsFile'),
-                        'tophat-stats': getattr(io, 'TophatStatsFile')},
-             'qc': {'fastqc': getattr(io, 'FastQCFile'),
-                   'fastqc-R1': getattr(io, 'FastQCFile'),
-                   'fastqc-R2': getattr(io, 'FastQCFile')},
-            'counts': {'htseq': getattr(io, 'HtseqCountsFile')},
-            'validation': {'sexcheck': getattr(io, 'SexcheckFile')}
-        }
-        logger.debug("matched parser '{}' for output type '{}' and source '{}'"
-                     .format(parsers[output_type][output_source],
-                             output_type, output_source))
-        return parsers[output_type][output_source]
-
-    def _read_data(self):
-        """
-        Parse and store data for each output file.
-        """
-        outputs = self._get_outputs(self.type)
-        outputs.sort()
+        return io.parser_registry.get_parser(output_type, output_source)
+
+    def _get_output_parser(self, path, output_type, output_source):
+        """
+        Return the parser object for an output file, reusing any parser
+        already created for the file (so that cached parse results are
+        shared, e.g., between QC tables).
+        """
+        if path not in self._parsers:
+            self._parsers[path] = io.parser_registry.create(
+                path, output_type, output_source
+            )
+        return self._parsers[path]
+
+    def _read_data(self, outputs=None):
+        """
+        Parse and store data for each output file (or only for the
+        specified output files).
+        """
+        if outputs is None:
+            outputs = sorted(self._get_outputs(self.type))
         self.data = {}
+        self.overrep_seqs = []
         for o in outputs:
             logger.debug("parsing output file '{}'".format(o))
-            out_items = parsing.parse_output_filename(o)
+            out_items = parsing.parse_output_filename(
+                self._get_output_name(o)
+            )
             proclib_id = out_items['sample_id']
             out_type = out_items['type']
             out_source = out_items['source']
 
             logger.debug("storing data from '{}' in '{}' '{}'".format(
                 out_source, proclib_id, out_type))
-            out_parser = self._get_parser(out_type, out_source)(path=o)
+            out_parser = self._get_output_parser(o, out_type, out_source)
 
             self.data.setdefault(
                 out_type, {}).setdefault(proclib_id, []).append(
                 {out_source: out_parser.parse()}
             )
+            if out_type == 'qc':
+                # rows for the overrepresented sequences table come from
+                # the same (cached) parse of the FastQC report
+                self.overrep_seqs += [
+                    dict(row, libId=proclib_id)
+                    for row in out_parser.parse_overrepresented_seqs()
+                ]
 
     def _build_table(self):
         """
@@ -188,59 +245,276 @@ class OutputStitcher(object):
 
     def _build_overrepresented_seq_table(self):
         """
-        Parse and combine overrepresented sequences tables from
-        FastQC files.
-        """
-        outputs = self._get_outputs(self.type)
-        overrep_seq_table = pd.DataFrame([])
-        if self.type == 'qc':
-            for o in outputs:
-                logger.debug("parsing overrepresented sequences "
-                             "from output file '{}'".format(o))
-                out_items = parsing.parse_output_filename(o)
-                proclib_id = out_items['sample_id']
-                out_type = out_items['type']
-                out_source = out_items['source']
-
-                logger.debug("storing data from {} in {} {}".format(
-                    out_source, proclib_id, out_type))
-                out_parser = io.FastQCFile(path=o)
-                o_table = (pd.DataFrame(out_parser
-                                        .parse_overrepresented_seqs())
-                           .assign(libId=proclib_id))
-                logger.debug("found {} overrepresented sequence(s) "
-                             "for sample '{}'".format(len(o_table), proclib_id))
-                overrep_seq_table = overrep_seq_table.append(o_table, sort=True)
-        return overrep_seq_table
-
-    def write_overrepresented_seq_table(self):
-        """
-        Write combined overrepresented sequences table to CSV file.
+        Combine overrepresented sequences rows parsed from FastQC files
+        into a single table.
+        """
+        if not hasattr(self, 'overrep_seqs'):
+            self._read_data()
+        logger.debug("found {} overrepresented sequence(s) in total"
+                     .format(len(self.overrep_seqs)))
+        table_data = pd.DataFrame(self.overrep_seqs)
+        return table_data[sorted(table_data.columns)]
+
+    def _build_overrepresented_seq_filename(self):
+        """
+        Create filename for combined overrepresented sequences CSV file.
+        """
+        return re.sub('_qc', '_overrep_seqs', self._build_combined_filename())
+
+    def _build_manifest_path(self):
+        """
+        Create path for the manifest file recording the sources of
+        combined tables.
+        """
+        return os.path.join(self.path, re.sub(
+            r'\.csv$', '.manifest.json', self._build_combined_filename()
+        ))
+
+    def _get_sources(self, outputs):
+        """
+        Return the sample ID, size, and modification time of each output
+        file, keyed by filename.
+        """
+        sources = {}
+        for o in outputs:
+            stat = os.stat(o)
+            sources[os.path.relpath(o, self.path)] = {
+                'sample_id': parsing.parse_output_filename(
+                    self._get_output_name(o)
+                )['sample_id'],
+                'size': stat.st_size,
+                'mtime': stat.st_mtime
+            }
+        return sources
+
+    def _load_manifest(self):
+        """
+        Return the manifest for previously written combined tables, or
+        None if there is no usable manifest (e.g., if tables were
+        written in a different format or have since been removed).
+        """
+        manifest_path = self._build_manifest_path()
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        tables = list(manifest.get('tables', {}).values())
+        if (manifest.get('format') != self.table_format
+                or not all(isinstance(t, dict) and 'sources' in t
+                           and os.path.exists(os.path.join(self.path,
+                                                           t['file']))
+                           for t in tables)):
+            logger.debug("ignoring outdated manifest '{}'"
+                         .format(manifest_path))
+            return None
+        return manifest
+
+    def _write_manifest(self, tables):
+        """
+        Record each combined table and the sources it was built from in
+        the manifest file.
+        """
+        manifest_path = self._build_manifest_path()
+        logger.debug("writing manifest to file '{}'".format(manifest_path))
+        with open(manifest_path, 'w') as f:
+            json.dump({'format': self.table_format,
+                       'tables': tables},
+                      f, indent=2, sort_keys=True)
+
+    def _get_stale_samples(self, old_sources, sources):
+        """
+        Return IDs of samples with any output file that was added,
+        changed, or removed since combined tables were written.
+        """
+        stale = set()
+        for name in set(old_sources) | set(sources):
+            old, new = old_sources.get(name), sources.get(name)
+            if old != new:
+                stale.add((old or new)['sample_id'])
+        return stale
+
+    def _get_sample_order(self, outputs):
+        """
+        Return sample IDs in the order their outputs are parsed (and
+        added to tables) when tables are built from all outputs.
+        """
+        samples = OrderedDict()
+        for o in outputs:
+            samples[parsing.parse_output_filename(
+                self._get_output_name(o)
+            )['sample_id']] = None
+        return list(samples)
+
+    def _sort_rows(self, table, samples):
+        """
+        Sort rows of a table by sample, in the order given; a stable
+        sort keeps each sample's rows in their existing order.
+        """
+        rank = {s: idx for idx, s in enumerate(samples)}
+        order = table['libId'].map(rank).argsort(kind='mergesort')
+        return table.iloc[order.values].reset_index(drop=True)
+
+    def _merge_table(self, table, stale, samples):
+        """
+        Drop data for stale samples from an existing combined table and
+        add newly parsed data for those samples, with rows and columns
+        in the same order as when the table is built from all outputs.
+        """
+        if self.type == 'counts':
+            table = table[[c for c in table.columns if c not in stale]]
+            if self.type in self.data:
+                table = pd.merge(table, self._build_table(),
+                                 on='geneName', sort=True)
+            return table[['geneName']
+                         + [s for s in samples if s in table.columns]]
+
+        table = table[~table['libId'].isin(stale)]
+        if self.type in self.data:
+            table_data = self._build_table()
+            if self.type == 'metrics':
+                table_data = self._add_mapped_reads_column(table_data)
+            # object columns keep values unchanged where other samples
+            # have missing data (rather than converting them to float)
+            table = pd.concat([table,
+                               formats.to_data_frame(table_data)
+                               .astype(object)])
+        # derived columns are added after the sorted data columns
+        derived = [c for c in ['mapped_reads_w_dups'] if c in table.columns]
+        columns = (['libId']
+                   + sorted(c for c in table.columns
+                            if c != 'libId' and c not in derived)
+                   + derived)
+        return self._sort_rows(table[columns].fillna(''), samples)
+
+    def _read_overrepresented_seq_table(self, path):
         """
+        Read an existing overrepresented sequences table, which may be
+        empty if no sequences were found.
+        """
+        try:
+            return formats.read_table(path)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+
+    def _merge_overrepresented_seq_table(self, table, stale, samples):
+        """
+        Drop overrepresented sequences for stale samples from an
+        existing table and add newly parsed rows for those samples, in
+        the same order as when the table is built from all outputs.
+        """
+        if 'libId' in table.columns:
+            table = table[~table['libId'].isin(stale)]
+        if len(self.overrep_seqs):
+            table = pd.concat([table,
+                               self._build_overrepresented_seq_table()])
+        table = table[sorted(table.columns)].fillna('')
+        if 'libId' in table.columns:
+            # stable sort keeps each sample's rows in report order
+            table = self._sort_rows(table, samples)
+        return table.reset_index(drop=True)
+
+    def _write_table_data(self, table_data):
+        """
+        Write combined table data to a file in the selected format.
+        """
+        if self.type == 'metrics' and isinstance(table_data, list):
+            table_data = self._add_mapped_reads_column(table_data)
         table_path = os.path.join(self.path,
                                   self._build_combined_filename())
-        table_path = re.sub('_qc', '_overrep_seqs', table_path)
-        table_data = self._build_overrepresented_seq_table()
+        return formats.write_table_data(table_data, table_path,
+                                        self.table_format,
+                                        counts=(self.type == 'counts'))
+
+    def write_overrepresented_seq_table(self, table_data=None):
+        """
+        Write combined overrepresented sequences table to a file in the
+        selected format.
+        """
+        table_path = os.path.join(self.path,
+                                  self._build_overrepresented_seq_filename())
+        if table_data is None:
+            table_data = self._build_overrepresented_seq_table()
         logger.debug("writing overrepresented seqs to file '{}'"
                      .format(table_path))
-        table_data.to_csv(table_path, index=False)
+        return formats.write_table_data(table_data, table_path,
+                                        self.table_format)
 
-    def write_table(self):
+    def _write_tables(self, qc=False):
         """
-        Write the combined table to a CSV file.
+        Write combined table (and, for QC outputs, the overrepresented
+        sequences table), parsing only new or changed outputs when
+        tables from a previous run can be updated; record the sources
+        of each table in the manifest file (in incremental mode only).
+        Tables without a manifest entry are rebuilt from all outputs.
         """
-        self._read_data()
-        table_data = self._build_table()
-        if self.type == 'metrics':
-            table_data = self._add_mapped_reads_column(table_data)
-        table_path = os.path.join(self.path,
-                                  self._build_combined_filename())
-        logger.debug("writing to file {}".format(table_path))
-        if self.type == 'counts':
-            table_data.to_csv(table_path, index=False)
+        outputs = sorted(self._get_outputs(self.type))
+        sources = self._get_sources(outputs)
+        keys = ['table', 'overrep_seqs'] if qc else ['table']
+        manifest = self._load_manifest() if self.incremental else None
+        entries = manifest['tables'] if manifest is not None else {}
+
+        if not all(k in entries for k in keys):
+            self._read_data(outputs)
+            tables = {'table': self._write_table_data(self._build_table())}
+            if qc:
+                tables['overrep_seqs'] = self.write_overrepresented_seq_table()
         else:
-            with open(table_path, 'w') as f:
-                writer = csv.writer(f, lineterminator='\n')
-                for row in table_data:
-                    writer.writerow(row)
-        return table_path
+            # samples changed since any of the tables was written are
+            # updated in all tables
+            stale = set()
+            for k in keys:
+                stale |= self._get_stale_samples(entries[k]['sources'],
+                                                 sources)
+            tables = {k: os.path.join(self.path, entries[k]['file'])
+                      for k in keys}
+            if not len(stale):
+                logger.info("combined {} tables in '{}' are up to date"
+                            .format(self.type, self.path))
+                return tables
+            logger.info("updating combined {} tables for {} sample(s)"
+                        .format(self.type, len(stale)))
+            self._read_data([
+                o for o in outputs
+                if sources[os.path.relpath(o, self.path)]['sample_id']
+                in stale
+            ])
+            samples = self._get_sample_order(outputs)
+            tables['table'] = self._write_table_data(self._merge_table(
+                formats.read_table(tables['table'],
+                                   counts=(self.type == 'counts')),
+                stale, samples
+            ))
+            if qc:
+                tables['overrep_seqs'] = self.write_overrepresented_seq_table(
+                    self._merge_overrepresented_seq_table(
+                        self._read_overrepresented_seq_table(
+                            tables['overrep_seqs']
+                        ),
+                        stale, samples
+                    )
+                )
+        if not self.incremental:
+            return tables
+        entries = dict(entries)
+        entries.update({k: {'file': os.path.basename(v), 'sources': sources}
+                        for k, v in list(tables.items())})
+        self._write_manifest(entries)
+        return tables
+
+    def write_table(self):
+        """
+        Write the combined table to a file in the selected format.
+        """
+        return self._write_tables()['table']
+
+    def write_qc_tables(self):
+        """
+        Parse each FastQC file once and write both the combined QC table
+        and the combined overrepresented sequences table to files.
+
+        :rtype: tuple
+        :return: paths to the combined QC table and overrepresented
+            sequences table
+        """
+        tables = self._write_tables(qc=True)
+        return tables['table'], tables['overrep_seqs']
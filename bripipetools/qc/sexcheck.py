@@ -7,6 +7,7 @@ import csv
 
 import pandas as pd
 
+from .. import io
 from .. import parsing
 from . import SexPredictor, SexVerifier
 
@@ -73,18 +74,22 @@ class SexChecker(object):
         """
         Extract and store counts for X and Y genes; also store count total.
         """
-        counts_df = pd.read_table(self._get_counts_path(),
-                                  names=['geneName', 'count'])
+        counts_file = io.parser_registry.create(self._get_counts_path(),
+                                                'counts', 'htseq')
+        counts_df = counts_file.parse()
         logger.debug("counts data frame has {} rows".format(len(counts_df)))
-        self.total_counts = sum(counts_df[counts_df['count'] > 0]['count'])
+        self.total_counts = int(counts_df['count'][counts_df['count'] > 0]
+                                .sum())
 
         y_counts = pd.merge(self._load_y_genes(ref=self.reference), counts_df,
                             how='inner', sort=True)
-        self.y_counts = y_counts[y_counts['count'] > 0]
+        self.y_counts = y_counts[y_counts['count'] > 0].astype(
+            {'count': 'int64'})
         logger.debug("detected {} Y gene(s)".format(len(self.y_counts)))
         x_counts = pd.merge(self._load_x_genes(ref=self.reference), counts_df,
                             how='inner', sort=True)
-        self.x_counts = x_counts[x_counts['count'] > 0]
+        self.x_counts = x_counts[x_counts['count'] > 0].astype(
+            {'count': 'int64'})
         logger.debug("detected {} X gene(s)".format(len(self.x_counts)))
 
     def _compute_x_y_data(self):
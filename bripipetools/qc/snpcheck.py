@@ -10,6 +10,7 @@ import json
 
 import pandas as pd
 
+from .. import io
 from .. import parsing
 from .. import util
 
@@ -22,11 +23,14 @@ class SnpChecker(object):
     donor. SNPs called in these libraries are then analyzed to generate a 
     kinship score to help identify mislabeled libraries.
     """
-    def __init__(self, workflowbatch_data, pipeline_root, db):
+    def __init__(self, workflowbatch_file, pipeline_root, db):
         logger.debug("creating an instance of `SnpChecker` "
                      "with pipeline root '{}'"
                      .format(pipeline_root))
-        self.workflowbatch_data = workflowbatch_data
+        self.workflowbatch_file = workflowbatch_file
+        self.workflowbatch_reader = io.WorkflowBatchFile(
+            workflowbatch_file, state='submit'
+        )
         self.pipeline_root = pipeline_root
         self.db = db
         self.lib_list = dict()      # {lib: {libfamily:, write:, fname:}}
@@ -66,14 +70,15 @@ class SnpChecker(object):
         this lib), and 'libfamily' (an identifier for libs in the same 'family')
         """
         # build the liblist without any family info
-        for s in self.workflowbatch_data['samples']:
-            for k in s:
-                if (k['tag'] == 'bcftools_call_snps_vcf_out' and
-                    k['name'] == 'to_path'):
-                    currFname = os.path.normpath(k['value'])
-                    currLib = parsing.get_library_id(currFname)
-                    self.lib_list[currLib] = {'fname': currFname,
-                                              'write': False}
+        for sample_name, sample_outputs in \
+                self.workflowbatch_reader.iter_outputs():
+            if 'bcftools_call_snps_vcf_out' in sample_outputs:
+                currFname = os.path.normpath(
+                    sample_outputs['bcftools_call_snps_vcf_out']
+                )
+                currLib = parsing.get_library_id(currFname)
+                self.lib_list[currLib] = {'fname': currFname,
+                                          'write': False}
         
         if (not len(self.lib_list)):
             return
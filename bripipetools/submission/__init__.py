@@ -14,6 +14,8 @@ select workflows and generate batch submissions for multiple unaligned
 projects from a flowcell run.
 """
 from .batchparameterize import BatchParameterizer
+from .batchplan import BatchPlan
+from .samplesizes import SampleSizeScanner, sample_size_scanner
 from .batchcreate import BatchCreator
 from .flowcellsubmit import FlowcellSubmissionBuilder
 from .samplesubmit import SampleSubmissionBuilder
\ No newline at end of file
@@ -6,6 +6,7 @@ import datetime
 from .. import parsing
 from .. import io
 from . import BatchParameterizer
+from .samplesizes import sample_size_scanner
 
 logger = logging.getLogger(__name__)
 
@@ -53,11 +54,15 @@ class BatchCreator(object):
     :type build: str
     :param build: ID string of reference genome build to be used
         for processing current set of samples.
+    :type template_data: dict
+    :param template_data: Data already parsed from the workflow
+        template file (e.g., shared by several creators); if not
+        specified, the template file is parsed.
     """
     def __init__(self, paths, workflow_template, endpoint, base_dir,
                  submit_dir=None, group_tag=None, subgroup_tags=None,
                  sort=False, num_samples=None, build='GRCh38.77',
-                 stranded=False):
+                 stranded=False, template_data=None):
         logger.debug("creating `BatchCreator` instance")
         self.paths = paths
         self.workflow_template = workflow_template
@@ -65,7 +70,14 @@ class BatchCreator(object):
             path=self.workflow_template,
             state='template'
         )
-        self.workflow_data = self.workflowbatch_file.parse()
+        if template_data is None:
+            self.workflow_data = self.workflowbatch_file.parse()
+        else:
+            # copy template lines, which are updated with the batch name
+            self.workflowbatch_file.data = dict(
+                template_data, raw=list(template_data['raw'])
+            )
+            self.workflow_data = self.workflowbatch_file.data
 
         self.endpoint = endpoint
         self.base_dir = base_dir
@@ -73,8 +85,7 @@ class BatchCreator(object):
             self.submit_dir = base_dir
         else:
             self.submit_dir = os.path.join(base_dir, submit_dir)
-            if not os.path.isdir(self.submit_dir):
-                os.makedirs(self.submit_dir)
+            os.makedirs(self.submit_dir, exist_ok=True)
 
         if group_tag is None:
             self.group_tag = ''
@@ -95,6 +106,7 @@ class BatchCreator(object):
             self.strand_tag = 'unstrand'
         self.sort = sort
         self.num_samples = num_samples
+        self.input_sizes = {}
 
     def _build_batch_name(self):
         """
@@ -154,8 +166,7 @@ class BatchCreator(object):
         )
         logger.debug("creating folder for processed outputs '{}'"
                      .format(target_dir))
-        if not os.path.isdir(target_dir):
-            os.makedirs(target_dir)
+        os.makedirs(target_dir, exist_ok=True)
 
         return target_dir
 
@@ -173,11 +184,13 @@ class BatchCreator(object):
 
         if self.sort:
             logger.debug("sorting samples based on file size")
-            sample_paths = sorted(
-                sample_paths,
-                key=lambda x: sum(os.path.getsize(os.path.join(x, f))
-                                  for f in os.listdir(x))
-            )
+            sample_sizes = sample_size_scanner.get_sizes(sample_paths)
+            self.input_sizes[folder] = sum(sample_sizes.values())
+            logger.info("Found {} samples with {:.2f} GB of input data "
+                        "in folder '{}'."
+                        .format(len(sample_paths),
+                                self.input_sizes[folder] / 1e9, folder))
+            sample_paths = sorted(sample_paths, key=sample_sizes.get)
         else:
             sample_paths.sort()
 
@@ -7,6 +7,222 @@ from .. import parsing
 
 logger = logging.getLogger(__name__)
 
+# tags of FASTQ input and output parameters, and the read of each
+FASTQ_PARAM = re.compile(r'^(fastq|fastq-r1|fastq-r2)_(in|out)')
+FASTQ_PARAM_READS = {'fastq': 'R1', 'fastq-r1': 'R1', 'fastq-r2': 'R2'}
+
+# paths of annotation datasets in the Galaxy library for each build
+REFERENCE_PATHS = {
+    'GRCh38.77': {
+        'gtf': 'GRCh38/Homo_sapiens.GRCh38.77.gtf',
+        'refflat': 'GRCh38/Homo_sapiens.GRCh38.77.refflat.txt',
+        'ribosomal_intervals':
+            ('GRCh38/Homo_sapiens.GRCh38.77'
+             '.ribosomalIntervalsWheader_reorder.txt'),
+        'snp-bed': 'GRCh38_NGSCheckMate_andInterestingSNP.bed',
+        'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
+    },
+    'GRCh38.91': {
+        'gtf': 'GRCh38/Homo_sapiens.GRCh38.91.gtf',
+        'refflat': 'GRCh38/Homo_sapiens.GRCh38.91.refflat.txt',
+        'ribosomal_intervals':
+            ('GRCh38/Homo_sapiens.GRCh38.91'
+             '.ribosomalIntervalsWheader.txt'),
+        'snp-bed': 'GRCh38_NGSCheckMate_andInterestingSNP.bed',
+        'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
+    },
+    'NCBIM37.67': {
+        'gtf': 'NCBIM37/Mus_musculus.NCBIM37.67.gtf',
+        'refflat': 'NCBIM37/Mus_musculus.NCBIM37.67.refflat.txt',
+        'ribosomal_intervals':
+            ('NCBIM37/Mus_musculus.NCBIM37.67'
+             '.ribosomalIntervalsWheader_reorder.txt'),
+        'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
+    },
+    'GRCm38.91': {
+        'gtf': 'GRCm38/Mus_musculus.GRCm38.91.gtf',
+        'refflat': 'GRCm38/Mus_musculus.GRCm38.91.refflat.txt',
+        'ribosomal_intervals':
+            ('GRCm38/Mus_musculus.GRCm38.91'
+             '.ribosomalIntervalsWheader.txt'),
+        'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
+    },
+    'hg19': {
+        'mtfilter-bed': 'hg19/hg19_mitofilter.bed',
+        'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
+    },
+    'mm10': {
+        'mtfilter-bed': 'mm10/mm10_mitofilter.bed',
+        'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
+    },
+    'mm9': {
+        'mtfilter-bed': 'mm9/mm9_mitofilter.bed',
+        'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
+    },
+    'ebv': {
+         'gtf': 'EBV_HHV4/EBV_HHV4.gtf',
+         'refflat': 'EBV_HHV4/EBV_HHV4.refflat.txt',
+         'ribosomal_intervals': ('EBV_HHV4/EBV_HHV4'
+                                 '.ribosomalIntervalsEmpty.txt'),
+         'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
+    }
+}
+
+# values of tool options for each build (and strandedness, where
+# the value depends on it)
+OPTION_VALUES = {
+    'GRCh38': {
+        'tophat': {
+            'index': 'GRCh38',
+            'library_type': {False: 'fr-unstranded',
+                             True: 'fr-firststrand'}
+        },
+        'hisat2': {
+            'index': 'hg38'
+        },
+        'salmon': {
+            'index': 'GRCh38',
+            'strandedness': {False: 'U', True: 'SR'}
+        },
+        'reorderbam': {
+            'ref': 'GRCh38'
+        },
+        'samtools-mpileup': {
+            'ref_file': 'hg38'
+        },
+        'mixcr': {
+            'species': 'hsa'
+        },
+        'picard-align': {
+            'index': 'GRCh38'
+        },
+        'picard-rnaseq': {
+            'index': 'GRCh38',
+            'strand_specificity': {
+                False: 'NONE',
+                True: 'FIRST_READ_TRANSCRIPTION_STRAND'
+            }
+        },
+        'htseq': {
+            'stranded': {False: 'no',
+                         True: 'reverse'}
+        },
+        'trinity': {
+            'library_type': {False: 'None',
+                             True: 'F'}
+        }
+    },
+    'NCBIM37': {
+        'tophat': {
+            'index': 'NCBIM37',
+            'library_type': {False: 'fr-unstranded',
+                             True: 'fr-firststrand'}
+        },
+        'hisat2': {
+            'index': 'NCBIM37'
+        },
+        'salmon': {
+            'index': 'NCBIM37',
+            'strandedness': {False: 'U', True: 'SR'}
+        },
+        'reorderbam': {
+            'ref': 'NCBIM37'
+        },
+        'mixcr': {
+            'species': 'mus'
+        },
+        'picard-align': {
+            'index': 'NCBIM37'
+        },
+        'picard-rnaseq': {
+            'index': 'NCBIM37',
+            'strand_specificity': {
+                False: 'NONE',
+                True: 'FIRST_READ_TRANSCRIPTION_STRAND'
+            }
+        },
+        'htseq': {
+            'stranded': {False: 'no',
+                         True: 'reverse'}
+        },
+        'trinity': {
+            'library_type': {False: 'None',
+                             True: 'F'}
+        }
+    },
+    'ebv': {
+        'tophat': {
+            'index': 'EBV',
+            'library_type': {False: 'fr-unstranded',
+                             True: 'fr-firststrand'}
+        },
+        'salmon': {
+            'index': 'EBV'
+        },
+        'reorderbam': {
+            'ref': 'EBV'
+        },
+        'mixcr': {
+            'species': 'EBV'
+        },
+        'picard-align': {
+            'index': 'EBV'
+        },
+        'picard-rnaseq': {
+            'index': 'EBV',
+            'strand_specificity': {
+                False: 'NONE',
+                True: 'FIRST_READ_TRANSCRIPTION_STRAND'
+            }
+        },
+        'htseq': {
+            'stranded': {False: 'no',
+                         True: 'reverse'}
+        },
+        'trinity': {
+            'library_type': {False: 'None',
+                             True: 'F'}
+        }
+    },
+    'hg19': {
+        'bowtie2': {
+            'index': 'hg19'
+        },
+        'picard-align': {
+            'index': 'hg19'
+        },
+        'macs2': {
+            'gsize': '2451960000'
+        }
+    },
+    'mm10': {
+        'bowtie2': {
+            'index': 'mm10'
+        },
+        'picard-align': {
+            'index': 'mm10'
+        },
+        'macs2': {
+            'gsize': '2150570000'
+        }
+    }
+}
+
+# output folder (within the target folder) for each output type
+OUTPUT_TYPE_DIRS = {'trimmed': 'TrimmedFastqs',
+                    'counts': 'counts',
+                    'quant': 'quant',
+                    'alignments': 'alignments',
+                    'metrics': 'metrics',
+                    'qc': 'QC',
+                    'trinity': 'Trinity',
+                    'assembly': 'assembly',
+                    'clones': 'clones',
+                    'snps': 'snps',
+                    'peaks': 'peaks',
+                    'log': 'logs',
+                    'unmapped': 'unmapped'}
+
 
 class BatchParameterizer(object):
     """
@@ -40,6 +256,11 @@ class BatchParameterizer(object):
         self.target_dir = target_dir
         self.build = build
         self.stranded = stranded
+        self._fastq_index = {}
+        self._empty_fastqs = []
+        self._parameter_plan = None
+        self._root_rewriter = util.get_root_rewriter('pipeline',
+                                                     '/mnt/bioinformatics/')
 
     def _get_lane_order(self):
         """
@@ -52,31 +273,57 @@ class BatchParameterizer(object):
                 if p['tag'] == 'fastq_in'
                 and re.search('from_path', p['name'])]
 
+    def _index_sample_fastqs(self, sample_path):
+        """
+        List the sample folder once and return a dict mapping each
+        (lane, read number) to the first matching FASTQ path; the index
+        is cached for subsequent lane lookups.
+        """
+        if sample_path not in self._fastq_index:
+            logger.debug("indexing FASTQ files in sample folder '{}'"
+                         .format(sample_path))
+            fastq_index = {}
+            for f in os.listdir(sample_path):
+                fastq_items = parsing.parse_fastq_filename(f)
+                if fastq_items['lane_id'] and fastq_items['read_id']:
+                    fastq_index.setdefault(
+                        (fastq_items['lane_id'][-1], fastq_items['read_id']),
+                        os.path.join(sample_path, f)
+                    )
+            self._fastq_index[sample_path] = fastq_index
+        return self._fastq_index[sample_path]
+
     def _get_lane_fastq(self, sample_path, lane, read_number="R1"):
         """
         Retrieve the path for the FASTQ file from the specified lane
-        within the sample folder. If no file exists, create and return
-        the path of an empty FASTQ file.
+        within the sample folder. If no file exists, return the path of
+        an empty FASTQ file, to be created with ``_create_empty_fastqs``.
         """
-                        
         logger.debug("retrieving FASTQ path for sample '{}' and lane {}"
                      .format(sample_path, lane))
-        fastq_paths = [os.path.join(sample_path, f)
-                       for f in os.listdir(sample_path)
-                       if re.search(r'L00{}_{}'.format(lane, read_number), f)]
-        if len(fastq_paths):
-            fastq_path = fastq_paths[0]
-
-        else:
-            logger.debug("no FASTQ found for lane {}; creating empty file"
+        fastq_index = self._index_sample_fastqs(sample_path)
+        try:
+            fastq_path = fastq_index[(lane, read_number)]
+        except KeyError:
+            logger.debug("no FASTQ found for lane {}; using empty file"
                          .format(lane))
             empty_fastq = 'empty_L00{}_{}.fastq.gz'.format(lane, read_number)
             fastq_path = os.path.join(sample_path, empty_fastq)
+            fastq_index[(lane, read_number)] = fastq_path
+            self._empty_fastqs.append(fastq_path)
+
+        return fastq_path
 
+    def _create_empty_fastqs(self):
+        """
+        Create any empty FASTQ files used in place of missing lanes.
+        """
+        logger.debug("creating {} empty FASTQ file(s)"
+                     .format(len(self._empty_fastqs)))
+        for fastq_path in self._empty_fastqs:
             if not os.path.exists(fastq_path):
                 open(fastq_path, 'a').close()
-
-        return fastq_path
+        self._empty_fastqs = []
 
     def _build_reference_path(self, parameter):
         """
@@ -84,214 +331,21 @@ class BatchParameterizer(object):
         library on Globus Galaxy, return the path to the dataset based
         on the current build and annotation type.
         """
-        ref_dict = {
-            'GRCh38.77': {
-                'gtf': 'GRCh38/Homo_sapiens.GRCh38.77.gtf',
-                'refflat': 'GRCh38/Homo_sapiens.GRCh38.77.refflat.txt',
-                'ribosomal_intervals':
-                    ('GRCh38/Homo_sapiens.GRCh38.77'
-                     '.ribosomalIntervalsWheader_reorder.txt'),
-                'snp-bed': 'GRCh38_NGSCheckMate_andInterestingSNP.bed',
-                'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
-            },
-            'GRCh38.91': {
-                'gtf': 'GRCh38/Homo_sapiens.GRCh38.91.gtf',
-                'refflat': 'GRCh38/Homo_sapiens.GRCh38.91.refflat.txt',
-                'ribosomal_intervals':
-                    ('GRCh38/Homo_sapiens.GRCh38.91'
-                     '.ribosomalIntervalsWheader.txt'),
-                'snp-bed': 'GRCh38_NGSCheckMate_andInterestingSNP.bed',
-                'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
-            },
-            'NCBIM37.67': {
-                'gtf': 'NCBIM37/Mus_musculus.NCBIM37.67.gtf',
-                'refflat': 'NCBIM37/Mus_musculus.NCBIM37.67.refflat.txt',
-                'ribosomal_intervals':
-                    ('NCBIM37/Mus_musculus.NCBIM37.67'
-                     '.ribosomalIntervalsWheader_reorder.txt'),
-                'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
-            },
-            'GRCm38.91': {
-                'gtf': 'GRCm38/Mus_musculus.GRCm38.91.gtf',
-                'refflat': 'GRCm38/Mus_musculus.GRCm38.91.refflat.txt',
-                'ribosomal_intervals':
-                    ('GRCm38/Mus_musculus.GRCm38.91'
-                     '.ribosomalIntervalsWheader.txt'),
-                'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
-            },
-            'hg19': {
-                'mtfilter-bed': 'hg19/hg19_mitofilter.bed',
-                'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
-            },
-            'mm10': {
-                'mtfilter-bed': 'mm10/mm10_mitofilter.bed',
-                'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
-            },
-            'mm9': {
-                'mtfilter-bed': 'mm9/mm9_mitofilter.bed',
-                'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
-            },  
-            'ebv': {
-                 'gtf': 'EBV_HHV4/EBV_HHV4.gtf',
-                 'refflat': 'EBV_HHV4/EBV_HHV4.refflat.txt',
-                 'ribosomal_intervals': ('EBV_HHV4/EBV_HHV4'
-                                         '.ribosomalIntervalsEmpty.txt'),
-                 'adapters': 'adapters/smarter_adapter_seqs_3p_5p.fasta'
-            }
-        }
-
         ref_type = re.sub('^annotation_', '', parameter['tag'])
         logger.debug("retrieving reference path for build '{}' and type '{}'"
                      .format(self.build, ref_type))
         return 'library::annotation::{}'.format(
-            ref_dict[self.build][ref_type]
+            REFERENCE_PATHS[self.build][ref_type]
         )
 
     def _set_option_value(self, parameter):
-        opt_dict = {
-            'GRCh38': {
-                'tophat': {
-                    'index': 'GRCh38',
-                    'library_type': {False: 'fr-unstranded',
-                                     True: 'fr-firststrand'}
-                },
-                'hisat2': {
-                    'index': 'hg38'
-                },
-                'salmon': {
-                    'index': 'GRCh38',
-                    'strandedness': {False: 'U', True: 'SR'}
-                },
-                'reorderbam': {
-                    'ref': 'GRCh38'
-                },
-                'samtools-mpileup': {
-                    'ref_file': 'hg38'
-                },
-                'mixcr': {
-                    'species': 'hsa'
-                },
-                'picard-align': {
-                    'index': 'GRCh38'
-                },
-                'picard-rnaseq': {
-                    'index': 'GRCh38',
-                    'strand_specificity': {
-                        False: 'NONE',
-                        True: 'FIRST_READ_TRANSCRIPTION_STRAND'
-                    }
-                },
-                'htseq': {
-                    'stranded': {False: 'no',
-                                 True: 'reverse'}
-                },
-                'trinity': {
-                    'library_type': {False: 'None',
-                                     True: 'F'}
-                }
-            },
-            'NCBIM37': {
-                'tophat': {
-                    'index': 'NCBIM37',
-                    'library_type': {False: 'fr-unstranded',
-                                     True: 'fr-firststrand'}
-                },
-                'hisat2': {
-                    'index': 'NCBIM37'
-                },
-                'salmon': {
-                    'index': 'NCBIM37',
-                    'strandedness': {False: 'U', True: 'SR'}
-                },
-                'reorderbam': {
-                    'ref': 'NCBIM37'
-                },
-                'mixcr': {
-                    'species': 'mus'
-                },
-                'picard-align': {
-                    'index': 'NCBIM37'
-                },
-                'picard-rnaseq': {
-                    'index': 'NCBIM37',
-                    'strand_specificity': {
-                        False: 'NONE',
-                        True: 'FIRST_READ_TRANSCRIPTION_STRAND'
-                    }
-                },
-                'htseq': {
-                    'stranded': {False: 'no',
-                                 True: 'reverse'}
-                },
-                'trinity': {
-                    'library_type': {False: 'None',
-                                     True: 'F'}
-                }
-            },
-            'ebv': {
-                'tophat': {
-                    'index': 'EBV',
-                    'library_type': {False: 'fr-unstranded',
-                                     True: 'fr-firststrand'}
-                },
-                'salmon': {
-                    'index': 'EBV'
-                },
-                'reorderbam': {
-                    'ref': 'EBV'
-                },
-                'mixcr': {
-                    'species': 'EBV'
-                },
-                'picard-align': {
-                    'index': 'EBV'
-                },
-                'picard-rnaseq': {
-                    'index': 'EBV',
-                    'strand_specificity': {
-                        False: 'NONE',
-                        True: 'FIRST_READ_TRANSCRIPTION_STRAND'
-                    }
-                },
-                'htseq': {
-                    'stranded': {False: 'no',
-                                 True: 'reverse'}
-                },
-                'trinity': {
-                    'library_type': {False: 'None',
-                                     True: 'F'}
-                }
-            },
-            'hg19': {
-                'bowtie2': {
-                    'index': 'hg19'
-                },
-                'picard-align': {
-                    'index': 'hg19'
-                },
-                'macs2': {
-                    'gsize': '2451960000'
-                }
-            },
-            'mm10': {
-                'bowtie2': {
-                    'index': 'mm10'
-                },
-                'picard-align': {
-                    'index': 'mm10'
-                },
-                'macs2': {
-                    'gsize': '2150570000'
-                }
-            }
-        }
         opt_tool = re.sub('^option_', '', parameter['tag'])
         opt_name = parameter['name']
         logger.debug("retrieving option value for build '{}', tool '{}', "
                      "and option name '{}'"
                      .format(self.build, opt_tool, opt_name))
         try:
-            opt_val = opt_dict[self.build][opt_tool][opt_name]
+            opt_val = OPTION_VALUES[self.build][opt_tool][opt_name]
             if type(opt_val) is dict:
                 return opt_val[self.stranded]
             else:
@@ -313,45 +367,87 @@ class BatchParameterizer(object):
         output_dir = os.path.join(self.target_dir, output_type)
         logger.debug("creating folder '{}' to store outputs of type '{}'"
                      .format(output_dir, output_type))
-        if not os.path.isdir(output_dir):
-            os.makedirs(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
 
         return output_dir
 
+    def _compile_output_path(self, parameter):
+        """
+        Return the output folder (with root swapped) and the file name
+        suffix following the sample name for an output parameter,
+        creating the output folder if needed.
+        """
+        output_items = parsing.parse_output_name(parameter['tag'])
+        output_dir = self._prep_output_dir(
+            OUTPUT_TYPE_DIRS[output_items['type']]
+        )
+        suffix = '_{}_{}.{}'.format(
+            output_items['source'], output_items['label'],
+            output_items['extension']
+        )
+        return (self._root_rewriter.rewrite(output_dir), suffix)
+
     def _build_output_path(self, sample_name, parameter):
         """
         Construct the full path of the current output file, formatted
         with the sample name and source/type-specific file label (as
         well as the appropriate extension).
         """
-        output_type_map = {'trimmed': 'TrimmedFastqs',
-                           'counts': 'counts',
-                           'quant': 'quant',
-                           'alignments': 'alignments',
-                           'metrics': 'metrics',
-                           'qc': 'QC',
-                           'trinity': 'Trinity',
-                           'assembly': 'assembly',
-                           'clones': 'clones',
-                           'snps': 'snps',
-                           'peaks': 'peaks',
-                           'log': 'logs',
-                           'unmapped': 'unmapped'}
-
         logger.debug("building output path of parameter '{}' for sample '{}'"
                      .format(parameter['tag'], sample_name))
-        output_items = parsing.parse_output_name(parameter['tag'])
-        output_dir = self._prep_output_dir(
-            output_type_map[output_items['type']]
-        )
-
-        out_file = '{}_{}_{}.{}'.format(
-            sample_name, output_items['source'], output_items['label'],
-            output_items['extension']
-        )
+        output_dir, suffix = self._compile_output_path(parameter)
+        return os.path.join(output_dir, sample_name + suffix)
 
-        return util.swap_root(os.path.join(output_dir, out_file),
-                              'pipeline', '/mnt/bioinformatics/')
+    def _compile_parameter(self, parameter):
+        """
+        Return a tuple with the kind of value to set for a parameter
+        ('value', 'sample', 'fastq', or 'output') and the information
+        needed to set it for any sample; return None for parameters
+        without a value.
+        """
+        fastq_match = FASTQ_PARAM.search(parameter['tag'])
+        if re.search('endpoint', parameter['name']):
+            return ('value', self.endpoint)
+        elif parameter['type'] == 'sample':
+            return ('sample', None)
+        elif parameter['type'] == 'input':
+            if fastq_match and fastq_match.group(2) == 'in':
+                lane = re.search('[1-8]', parameter['name']).group()
+                return ('fastq',
+                        (lane, FASTQ_PARAM_READS[fastq_match.group(1)]))
+        elif parameter['type'] == 'annotation':
+            return ('value', self._build_reference_path(parameter))
+        elif parameter['type'] == 'option':
+            return ('value', self._set_option_value(parameter))
+        elif parameter['type'] == 'output':
+            if fastq_match and fastq_match.group(2) == 'out':
+                self._prep_output_dir('inputFastqs')
+                output_dir = os.path.join(
+                    self._root_rewriter.rewrite(self.target_dir),
+                    'inputFastqs'
+                )
+                return ('output', (output_dir, '_{}-final.fastq.gz'.format(
+                    FASTQ_PARAM_READS[fastq_match.group(1)]
+                )))
+            return ('output', self._compile_output_path(parameter))
+        return None
+
+    def _compile_parameters(self):
+        """
+        Compile the workflow parameters once into a list of steps for
+        setting parameter values, such that annotation paths, option
+        values, and output folders are resolved for all samples.
+        """
+        if self._parameter_plan is None:
+            logger.debug("compiling values for {} workflow parameters"
+                         .format(len(self.parameters)))
+            plan = []
+            for param in self.parameters:
+                step = self._compile_parameter(param)
+                if step is not None:
+                    plan.append(step)
+            self._parameter_plan = plan
+        return self._parameter_plan
 
     def _build_sample_parameters(self, sample_path):
         """
@@ -364,68 +460,23 @@ class BatchParameterizer(object):
 
         logger.debug("setting parameter values for sample '{}'"
                      .format(sample_name))
+        sample_root = self._root_rewriter.rewrite(sample_path)
         param_values = []
-        for param in self.parameters:
-            logger.debug("... current parameter: {}".format(param))
-            if re.search('endpoint', param['name']):
-                param_values.append(self.endpoint)
-            elif param['type'] == 'sample':
+        for kind, value in self._compile_parameters():
+            if kind == 'sample':
                 param_values.append(sample_name)
-            elif param['type'] == 'input':
-                if re.search('^fastq_in', param['tag']):
-                    lane = re.search('[1-8]', param['name']).group()
-                    param_values.append(
-                        util.swap_root(
-                            self._get_lane_fastq(sample_path, lane),
-                            'pipeline', '/mnt/bioinformatics/'
-                        )
-                    )
-                elif re.search('^fastq-r1_in', param['tag']):
-                    lane = re.search('[1-8]', param['name']).group()
-                    param_values.append(
-                        util.swap_root(
-                            self._get_lane_fastq(sample_path, lane, "R1"),
-                            'pipeline', '/mnt/bioinformatics/'
-                        )
-                    )
-                elif re.search('^fastq-r2_in', param['tag']):
-                    lane = re.search('[1-8]', param['name']).group()
-                    param_values.append(
-                        util.swap_root(
-                            self._get_lane_fastq(sample_path, lane, "R2"),
-                            'pipeline', '/mnt/bioinformatics/'
-                        )
-                    )
-            elif param['type'] == 'annotation':
-                param_values.append(self._build_reference_path(param))
-            elif param['type'] == 'option':
-                param_values.append(self._set_option_value(param))
-            elif param['type'] == 'output':
-                if re.search('^fastq_out', param['tag']):
-                    final_fastq = '{}_R1-final.fastq.gz'.format(sample_name)
-                    output_path = os.path.join(
-                        util.swap_root(self.target_dir, 'pipeline', '/mnt/bioinformatics/'),
-                        'inputFastqs', final_fastq
-                    )
-                    self._prep_output_dir('inputFastqs')
-                elif re.search('^fastq-r1_out', param['tag']):
-                    final_fastq = '{}_R1-final.fastq.gz'.format(sample_name)
-                    output_path = os.path.join(
-                        util.swap_root(self.target_dir, 'pipeline', '/mnt/bioinformatics/'),
-                        'inputFastqs', final_fastq
-                    )
-                    self._prep_output_dir('inputFastqs')
-                elif re.search('^fastq-r2_out', param['tag']):
-                    final_fastq = '{}_R2-final.fastq.gz'.format(sample_name)
-                    output_path = os.path.join(
-                        util.swap_root(self.target_dir, 'pipeline', '/mnt/bioinformatics/'),
-                        'inputFastqs', final_fastq
-                    )
-                    self._prep_output_dir('inputFastqs')
-                else:
-                    output_path = self._build_output_path(sample_name, param)
-                param_values.append(output_path)
-            logger.debug("... value set: '{}'".format(param_values[-1]))
+            elif kind == 'fastq':
+                fastq_path = self._get_lane_fastq(sample_path, *value)
+                param_values.append(
+                    os.path.join(sample_root, os.path.basename(fastq_path))
+                )
+            elif kind == 'output':
+                output_dir, suffix = value
+                param_values.append(
+                    os.path.join(output_dir, sample_name + suffix)
+                )
+            else:
+                param_values.append(value)
 
         return param_values
 
@@ -450,6 +501,7 @@ class BatchParameterizer(object):
                 s_param['value'] = s_values[idx]
                 s_params.append(s_param)
             sample_params.append(s_params)
+        self._create_empty_fastqs()
 
         self.samples = sample_params
 
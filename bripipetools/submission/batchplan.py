@@ -0,0 +1,197 @@
+"""
+Declarative plans for assigning workflows, genome builds, and library
+strandedness to projects (or sample folders) for batch submission,
+without interactive prompts. Plans are read from JSON or YAML files
+(YAML requires the optional 'PyYAML' package) or built from
+command-line assignments.
+"""
+import logging
+import os
+import re
+import json
+
+logger = logging.getLogger(__name__)
+
+BUILD_OPTIONS = ['GRCh38.77', 'GRCh38.91', 'NCBIM37.67', 'GRCm38.91',
+                 'hg19', 'mm10', 'mm9', 'ebv']
+
+RULE_FIELDS = ['project', 'metadata', 'workflow', 'build', 'stranded']
+
+
+class BatchPlan(object):
+    """
+    Assigns (workflow, build, stranded) options to projects based on an
+    ordered list of rules. Each rule can match project labels with a
+    regular expression (``project``) and/or GenLIMS metadata for the
+    project's libraries (``metadata``, a dict mapping field names to
+    regular expressions); a project gets one assignment for every rule
+    it matches.
+
+    :type rules: list
+    :param rules: list of dicts with fields 'workflow' (file name in
+        the workflow folder, or full path), 'build', and optionally
+        'stranded' (default False), 'project', and 'metadata'
+    :type defaults: dict
+    :param defaults: values used for fields missing from rules
+    """
+    def __init__(self, rules, defaults=None):
+        logger.debug("creating `BatchPlan` instance with {} rule(s)"
+                     .format(len(rules)))
+        if defaults is None:
+            defaults = {}
+        self.rules = [self._check_rule(dict(defaults, **rule))
+                      for rule in rules]
+
+    def _check_rule(self, rule):
+        """
+        Validate the fields of a rule and fill in optional fields.
+        """
+        unknown = set(rule) - set(RULE_FIELDS)
+        if unknown:
+            logger.error("unknown field(s) {} in batch plan rule {}"
+                         .format(sorted(unknown), rule))
+            raise ValueError("unknown field(s) in batch plan rule: {}"
+                             .format(sorted(unknown)))
+        if 'workflow' not in rule or 'build' not in rule:
+            logger.error("batch plan rule {} has no workflow or build"
+                         .format(rule))
+            raise ValueError("batch plan rules require 'workflow' and "
+                             "'build' fields")
+        if rule['build'] not in BUILD_OPTIONS:
+            logger.error("unsupported build '{}' in batch plan rule {}"
+                         .format(rule['build'], rule))
+            raise ValueError("unsupported build '{}'; options are {}"
+                             .format(rule['build'], BUILD_OPTIONS))
+        rule.setdefault('project', '.*')
+        rule.setdefault('metadata', {})
+        rule['stranded'] = bool(rule.get('stranded', False))
+        return rule
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Read a plan from a JSON or YAML file, with a list of 'rules'
+        and (optionally) a dict of 'defaults'.
+
+        :type path: str
+        :param path: path to plan file ('.json', '.yaml', or '.yml')
+        """
+        logger.debug("reading batch plan from '{}'".format(path))
+        with open(path) as f:
+            if os.path.splitext(path)[-1] in ['.yaml', '.yml']:
+                try:
+                    import yaml
+                except ImportError:
+                    logger.error("the 'PyYAML' package is required to read "
+                                 "YAML batch plans")
+                    raise
+                plan = yaml.safe_load(f)
+            else:
+                plan = json.load(f)
+        return cls(plan['rules'], plan.get('defaults'))
+
+    @classmethod
+    def from_assignments(cls, assignments):
+        """
+        Build a plan from assignments formatted as
+        '<project pattern>,<workflow>,<build>[,stranded]'.
+
+        :type assignments: list
+        :param assignments: list of assignment strings
+        """
+        rules = []
+        for assignment in assignments:
+            items = [i.strip() for i in assignment.split(',')]
+            if len(items) not in [3, 4] or items[3:] not in [[], ['stranded']]:
+                logger.error("could not parse assignment '{}'"
+                             .format(assignment))
+                raise ValueError("assignments must be formatted as "
+                                 "'<project pattern>,<workflow>,<build>"
+                                 "[,stranded]'")
+            rules.append({'project': items[0], 'workflow': items[1],
+                          'build': items[2], 'stranded': len(items) == 4})
+        return cls(rules)
+
+    @property
+    def metadata_fields(self):
+        """
+        Return the set of GenLIMS fields used by any rule.
+        """
+        return {field for rule in self.rules for field in rule['metadata']}
+
+    def _resolve_workflow(self, workflow, workflow_dir):
+        """
+        Return the path to a workflow template, given its file name in
+        the workflow folder or its full path.
+        """
+        path = workflow
+        if not os.path.isfile(path) and workflow_dir is not None:
+            path = os.path.join(workflow_dir, workflow)
+        if not os.path.isfile(path):
+            logger.error("workflow template '{}' not found in '{}'"
+                         .format(workflow, workflow_dir))
+            raise ValueError("workflow template '{}' not found"
+                             .format(workflow))
+        return path
+
+    def _match_rule(self, rule, label, metadata):
+        """
+        Check whether a rule matches a project label and metadata.
+        """
+        if not re.search(rule['project'], label):
+            return False
+        for field, pattern in list(rule['metadata'].items()):
+            value = metadata.get(field)
+            if value is None or not re.search(pattern, str(value)):
+                return False
+        return True
+
+    def match(self, label, metadata=None):
+        """
+        Return the list of (workflow, build, stranded) assignments for
+        a project label and its GenLIMS metadata.
+
+        :type label: str
+        :param label: project label (or sample folder name)
+        :type metadata: dict
+        :param metadata: GenLIMS fields for the project's libraries
+        """
+        if metadata is None:
+            metadata = {}
+        return [(rule['workflow'], rule['build'], rule['stranded'])
+                for rule in self.rules
+                if self._match_rule(rule, label, metadata)]
+
+    def assign(self, paths, workflow_dir=None, get_label=os.path.basename,
+               get_metadata=None):
+        """
+        Build a batch map from (workflow path, build, stranded) keys to
+        the list of matching project paths.
+
+        :type paths: list
+        :param paths: list of paths to projects (or sample folders)
+        :type workflow_dir: str
+        :param workflow_dir: folder containing workflow templates
+        :type get_label: function
+        :param get_label: function returning the label for a path
+        :type get_metadata: function
+        :param get_metadata: function returning GenLIMS metadata (for
+            the fields in ``metadata_fields``) for a path
+        """
+        fields = self.metadata_fields
+        batch_map = {}
+        for path in paths:
+            label = get_label(path)
+            metadata = {}
+            if fields and get_metadata is not None:
+                metadata = get_metadata(path, fields)
+            assignments = self.match(label, metadata)
+            if not assignments:
+                logger.warning("no batch plan rule matches '{}'; skipping"
+                               .format(label))
+            for workflow, build, stranded in assignments:
+                batch_key = (self._resolve_workflow(workflow, workflow_dir),
+                             build, stranded)
+                batch_map.setdefault(batch_key, []).append(path)
+        logger.debug("batch map from plan: {}".format(batch_map))
+        return batch_map
@@ -1,10 +1,14 @@
 import logging
 import os
 import re
+import concurrent.futures
 
 from .. import parsing
+from .. import io
 from .. import annotation
+from .. import database
 from . import BatchCreator
+from .batchplan import BUILD_OPTIONS
 
 logger = logging.getLogger(__name__)
 
@@ -13,9 +17,17 @@ class FlowcellSubmissionBuilder(object):
     """
     Prepares workflow batch submissions for all unaligned projects
     from a flowcell run.
+
+    :type plan: bripipetools.submission.BatchPlan
+    :param plan: plan used to assign workflows, builds, and
+        strandedness to projects; if not specified, options are
+        selected interactively
+
+    :type max_workers: int
+    :param max_workers: maximum number of batches created concurrently
     """
     def __init__(self, path, endpoint, db, workflow_dir=None,
-                 all_workflows=True):
+                 all_workflows=True, plan=None, max_workers=4):
         logger.debug("creating `FlowcellSubmissionBuilder` instance "
                      "for path '{}'".format(path))
         self.path = path
@@ -24,6 +36,8 @@ class FlowcellSubmissionBuilder(object):
         if workflow_dir is not None:
             self.workflow_dir = workflow_dir
         self.all_workflows = all_workflows
+        self.plan = plan
+        self.max_workers = max_workers
         self._init_annotator()
 
     def _init_annotator(self):
@@ -66,11 +80,46 @@ class FlowcellSubmissionBuilder(object):
                      .format([os.path.basename(os.path.normpath(f))
                               for f in self.project_paths]))
 
+    def _get_project_metadata(self, project_path, fields):
+        """
+        Return GenLIMS values for the specified fields, taken from the
+        first library in the project with a value for each field.
+        """
+        libraries = self.annotator.get_libraries(
+            project=os.path.basename(os.path.normpath(project_path))
+        )
+        metadata = {}
+        for field in fields:
+            for l in libraries:
+                value = database.search_ancestors(
+                    self.db, parsing.get_library_id(os.path.basename(l)),
+                    field
+                )
+                if value is not None:
+                    metadata[field] = value
+                    break
+        logger.debug("found metadata {} for project '{}'"
+                     .format(metadata, project_path))
+        return metadata
+
+    def _assign_workflows_from_plan(self):
+        self._get_project_paths()
+        self.batch_map = self.plan.assign(
+            self.project_paths,
+            workflow_dir=getattr(self, 'workflow_dir', None),
+            get_label=parsing.get_project_label,
+            get_metadata=self._get_project_metadata
+        )
+
     def _assign_workflows(self):
+        if self.plan is not None:
+            self._assign_workflows_from_plan()
+            return
+
         workflow_opts = self.get_workflow_options(
             optimized_only=not self.all_workflows
         )
-        build_opts = ['GRCh38.77', 'GRCh38.91', 'NCBIM37.67', 'GRCm38.91', 'hg19', 'mm10', 'mm9', 'ebv']
+        build_opts = BUILD_OPTIONS
         self._get_project_paths()
 
         continue_assign = True
@@ -130,56 +179,86 @@ class FlowcellSubmissionBuilder(object):
 
         return group_tag, subgroup_tags
 
+    def _get_batch_projects(self, projects):
+        """
+        Return project paths to use for a batch, moving into the FASTQ
+        folder of projects with the new BaseSpace folder structure.
+        """
+        # Need to handle new version of BaseSpace directory structure,
+        # Old dir structure:
+        # Project Folder -> Lib Folder -> fastq.gz file(s)
+        # New dir structure:
+        # Project Folder -> FASTQ Folder -> Lib Folder -> fastq.gz file(s)
+        batch_projects = []
+        for project in projects:
+            # If new structure, there should only be one FASTQ folder.
+            # IF old structure, first folder should contain a libID
+            subdir = [s for s in os.listdir(project)
+                      if not re.search('DS_Store', s)][0]
+
+            logger.debug("Subdirectory of {} identified as {}"
+                         .format(project, subdir))
+
+            if (not re.search('lib[0-9]+', subdir) and
+                not re.search('DS_Store', subdir)):
+                logger.debug("New BaseSpace dir type. Moving from {} to {}"
+                             .format(project, subdir))
+                project = os.path.join(project, subdir)
+            batch_projects.append(project)
+        return batch_projects
+
+    def _create_batch(self, batchkey, projects, template_data, sort,
+                      num_samples):
+        """
+        Create and write the batch submit file for one workflow, build,
+        and strandedness; return the path to the batch file.
+        """
+        workflow, build, stranded = batchkey
+        logger.info("Building batch for workflow '{}' and build '{}' "
+                    "with samples from projects: {}"
+                    .format(os.path.basename(workflow), build, projects))
+        group_tag, subgroup_tags = self._get_batch_tags(projects)
+
+        creator = BatchCreator(
+            paths=projects,
+            workflow_template=workflow,
+            endpoint=self.endpoint,
+            base_dir=self.path,
+            submit_dir='globus_batch_submission',
+            group_tag=group_tag,
+            subgroup_tags=subgroup_tags,
+            sort=sort,
+            num_samples=num_samples,
+            build=build,
+            stranded=stranded,
+            template_data=template_data
+        )
+        batch_path = creator.create_batch()
+        logger.debug("workflow batch parameters saved in file '{}'"
+                     .format(batch_path))
+        return batch_path
+
     def run(self, sort=False, num_samples=None):
         if not hasattr(self, 'batch_map'):
             self._assign_workflows()
 
-        batch_paths = []
-        for batchkey, projects in list(self.batch_map.items()):
-            workflow, build, stranded = batchkey
-            
-            # Need to handle new version of BaseSpace directory structure,
-            # Old dir structure:
-            # Project Folder -> Lib Folder -> fastq.gz file(s)
-            # New dir structure:
-            # Project Folder -> FASTQ Folder -> Lib Folder -> fastq.gz file(s)
-            for i in range(0, len(projects)):
-                # If new structure, there should only be one FASTQ folder.
-                # IF old structure, first folder should contain a libID
-                subdir = [s for s in os.listdir(projects[i])
-                          if not re.search('DS_Store', s)][0]
-                          
-                logger.debug("Subdirectory of {} identified as {}"
-                             .format(projects[i], subdir))
-                             
-                if (not re.search('lib[0-9]+', subdir) and 
-                    not re.search('DS_Store', subdir)):
-                    logger.debug("New BaseSpace dir type. Moving from {} to {}"
-                                 .format(projects[i], subdir))
-                    projects[i] = os.path.join(projects[i], subdir)
-            
-            
-            logger.info("Building batch for workflow '{}' and build '{}' "
-                        "with samples from projects: {}"
-                        .format(os.path.basename(workflow), build, projects))
-            group_tag, subgroup_tags = self._get_batch_tags(projects)
-            
-            creator = BatchCreator(
-                paths=projects,
-                workflow_template=workflow,
-                endpoint=self.endpoint,
-                base_dir=self.path,
-                submit_dir='globus_batch_submission',
-                group_tag=group_tag,
-                subgroup_tags=subgroup_tags,
-                sort=sort,
-                num_samples=num_samples,
-                build=build,
-                stranded=stranded
-            )
-            batch_paths.append(creator.create_batch())
-            logger.debug("workflow batch parameters saved in file '{}'"
-                         .format(batch_paths[-1]))
+        batches = [(batchkey, self._get_batch_projects(projects))
+                   for batchkey, projects in list(self.batch_map.items())]
 
-        return batch_paths
+        # parse each workflow template once, shared by all its batches
+        templates = {}
+        for (workflow, build, stranded), projects in batches:
+            if workflow not in templates:
+                templates[workflow] = io.WorkflowBatchFile(
+                    path=workflow, state='template'
+                ).parse()
 
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._create_batch, batchkey, projects,
+                                       templates[batchkey[0]], sort,
+                                       num_samples)
+                       for batchkey, projects in batches]
+            batch_paths = [f.result() for f in futures]
+
+        return batch_paths
@@ -0,0 +1,62 @@
+"""
+Scan the total size of raw data files in sample folders, used to sort
+samples by size before submission and to report input data volume.
+"""
+import logging
+import os
+import threading
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+
+class SampleSizeScanner(object):
+    """
+    Computes the total size of files in each sample folder, scanning
+    folders concurrently; sizes are cached per folder and reused until
+    the folder's modification time changes (i.e., files are added,
+    removed, or renamed).
+
+    :type max_workers: int
+    :param max_workers: maximum number of sample folders scanned
+        concurrently
+    """
+    def __init__(self, max_workers=16):
+        self.max_workers = max_workers
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _scan_folder(self, path):
+        """
+        Return the total size (in bytes) of all items in a sample
+        folder, using the cached size if the folder is unchanged.
+        """
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        logger.debug("scanning size of files in sample folder '{}'"
+                     .format(path))
+        with os.scandir(path) as entries:
+            size = sum(entry.stat().st_size for entry in entries)
+        with self._lock:
+            self._cache[path] = (mtime, size)
+        return size
+
+    def get_sizes(self, paths):
+        """
+        Return a dict mapping each sample folder to the total size of
+        its files.
+
+        :type paths: list
+        :param paths: list of paths to sample folders
+        """
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers) as executor:
+            sizes = list(executor.map(self._scan_folder, paths))
+        return dict(zip(paths, sizes))
+
+
+sample_size_scanner = SampleSizeScanner()
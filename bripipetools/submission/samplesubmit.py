@@ -3,6 +3,7 @@ import os
 import re
 
 from . import BatchCreator
+from .batchplan import BUILD_OPTIONS
 
 logger = logging.getLogger(__name__)
 
@@ -11,9 +12,14 @@ class SampleSubmissionBuilder(object):
     """
     Prepares workflow batch submissions for a list of sample paths
     or folders of sample paths.
+
+    :type plan: bripipetools.submission.BatchPlan
+    :param plan: plan used to assign workflows, builds, and
+        strandedness to paths (matched by folder name); if not
+        specified, options are selected interactively
     """
     def __init__(self, manifest, out_dir, endpoint, workflow_dir=None,
-                 all_workflows=True, tag=None):
+                 all_workflows=True, tag=None, plan=None):
         logger.debug("creating `SampleSubmissionBuilder` instance")
         self.manifest = manifest
 
@@ -22,6 +28,7 @@ class SampleSubmissionBuilder(object):
         if workflow_dir is not None:
             self.workflow_dir = workflow_dir
         self.all_workflows = all_workflows
+        self.plan = plan
 
         if tag is None:
             self.tag = ''
@@ -56,10 +63,18 @@ class SampleSubmissionBuilder(object):
         if not hasattr(self, 'paths'):
             self._read_paths()
 
+        if self.plan is not None:
+            self.batch_map = self.plan.assign(
+                self.paths,
+                workflow_dir=getattr(self, 'workflow_dir', None),
+                get_label=lambda p: os.path.basename(os.path.normpath(p))
+            )
+            return
+
         workflow_opts = self.get_workflow_options(
             optimized_only=not self.all_workflows
         )
-        build_opts = ['GRCh38.77', 'GRCh38.91', 'NCBIM37.67', 'GRCm38.91', 'hg19', 'mm10', 'mm9', 'ebv']
+        build_opts = BUILD_OPTIONS
 
         for j, w in enumerate(workflow_opts):
             print(("   {} : {}".format(j, os.path.basename(w))))
@@ -84,7 +99,9 @@ class SampleSubmissionBuilder(object):
 
         batch_paths = []
         for batchkey, paths in list(self.batch_map.items()):
-            workflow, build = batchkey
+            # keys assigned interactively don't include strandedness
+            workflow, build = batchkey[:2]
+            stranded = batchkey[2] if len(batchkey) > 2 else False
             logger.info("Building batch for workflow '{}' and build '{}'"
                         .format(os.path.basename(workflow), build))
                         
@@ -113,7 +130,8 @@ class SampleSubmissionBuilder(object):
                 endpoint=self.endpoint,
                 base_dir=self.out_dir,
                 group_tag=self.tag,
-                build=build
+                build=build,
+                stranded=stranded
             )
             batch_paths.append(creator.create_batch())
             logger.debug("workflow batch parameters saved in file '{}'"
@@ -6,4 +6,5 @@ throughout other packages to streamline common operations.
 """
 from .dicts import (flatten_dict)
 from .strings import (matchdefault, matchlastdefault, to_camel_case, to_snake_case)
-from .files import (locate_root_folder, swap_root)
+from .files import (locate_root_folder, swap_root, RootRewriter,
+                    get_root_rewriter)
@@ -1,6 +1,7 @@
 import os
 import glob
 import re
+from functools import lru_cache
 
 
 def locate_root_folder(top_level, max_depth=3):
@@ -46,7 +47,83 @@ def swap_root(path, top_level, new_root='/~/'):
     :rtype: str
     :return: modified path with new root
     """
-    deroot_path = re.sub('.*(?={})'.format(top_level), '', path)
-    return os.path.join(new_root, deroot_path)
+    return get_root_rewriter(top_level, new_root).rewrite(path)
+
+
+class RootRewriter(object):
+    """
+    Replaces the section of file paths preceding a specified 'top level'
+    directory with a different string, as with ``swap_root``, using a
+    pattern compiled once for the top level directory and new root.
+
+    :type top_level: str
+    :param top_level: Nominal 'top level' directory to immediately follow new
+        root (e.g., 'genomics' in '/Volumes/genomics').
+
+    :type new_root: str
+    :param new_root: String specifying the new root of the file path.
+    """
+    def __init__(self, top_level, new_root='/~/'):
+        self.top_level = top_level
+        self.new_root = new_root
+        self._pattern = re.compile('.*(?={})'.format(top_level))
+        if new_root and not new_root.endswith('/'):
+            new_root = '{}/'.format(new_root)
+        self._prefix = new_root
+
+    def rewrite(self, path):
+        """
+        Return a single path with the new root.
+
+        :type path: str
+        :param path: Any system file path.
+
+        :rtype: str
+        :return: modified path with new root
+        """
+        match = self._pattern.match(path)
+        if match is not None:
+            path = path[match.end():]
+        # equivalent to os.path.join(new_root, path)
+        return path if path.startswith('/') else self._prefix + path
+
+    def rewrite_all(self, paths):
+        """
+        Return a list of paths with the new root.
+
+        :type paths: list
+        :param paths: List of system file paths.
+
+        :rtype: list
+        :return: modified paths with new root
+        """
+        match = self._pattern.match
+        prefix = self._prefix
+        rewritten = []
+        for path in paths:
+            m = match(path)
+            if m is not None:
+                path = path[m.end():]
+            rewritten.append(path if path.startswith('/') else prefix + path)
+        return rewritten
+
+
+@lru_cache(maxsize=None)
+def get_root_rewriter(top_level, new_root='/~/'):
+    """
+    Return the shared ``RootRewriter`` for a 'top level' directory and
+    new root, created on first use.
+
+    :type top_level: str
+    :param top_level: Nominal 'top level' directory to immediately follow new
+        root.
+
+    :type new_root: str
+    :param new_root: String specifying the new root of the file path.
+
+    :rtype: RootRewriter
+    :return: root rewriter for the given top level directory and new root
+    """
+    return RootRewriter(top_level, new_root)
 
 
@@ -0,0 +1,98 @@
+"""
+Compare read throughput of ``bripipetools.io`` parsers for plain and
+compressed (gzip, bz2) output files, using a synthetic project with
+htseq-count counts and metrics files for many libraries.
+
+Usage: python benchmark_compressed_io.py [--num-libs N] [--num-genes N]
+"""
+import os
+import sys
+import gzip
+import bz2
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+import _mypath
+from bripipetools import io
+
+OPENERS = {
+    'plain': (open, ''),
+    'gzip': (gzip.open, '.gz'),
+    'bz2': (bz2.open, '.bz2'),
+}
+
+
+def write_project(root, num_libs, num_genes, compression):
+    """
+    Write counts and metrics files for each library in a new folder,
+    with the specified compression; return list of paths by type.
+    """
+    opener, ext = OPENERS[compression]
+    folder = os.path.join(root, compression)
+    os.makedirs(folder)
+    rng = random.Random(0)
+    paths = {'counts': [], 'metrics': []}
+    for i in range(num_libs):
+        lib = 'lib{:05d}_C00000XX'.format(i)
+        counts_path = os.path.join(
+            folder, '{}_htseq_counts.txt{}'.format(lib, ext))
+        with opener(counts_path, 'wt') as f:
+            for g in range(num_genes):
+                f.write('GENE{:06d}\t{}\n'.format(g, rng.randint(0, 5000)))
+        metrics_path = os.path.join(
+            folder, '{}_htseq_metrics.txt{}'.format(lib, ext))
+        with opener(metrics_path, 'wt') as f:
+            for field in ['no_feature', 'ambiguous', 'too_low_aQual',
+                          'not_aligned', 'alignment_not_unique']:
+                f.write('__{}\t{}\n'.format(field, rng.randint(0, 10**6)))
+        paths['counts'].append(counts_path)
+        paths['metrics'].append(metrics_path)
+    return paths
+
+
+def time_reads(paths):
+    """
+    Parse every file with the appropriate parser and return elapsed
+    seconds by output type.
+    """
+    parsers = {'counts': io.HtseqCountsFile, 'metrics': io.HtseqMetricsFile}
+    timings = {}
+    for output_type, type_paths in list(paths.items()):
+        start = time.time()
+        for p in type_paths:
+            parsers[output_type](path=p).parse()
+        timings[output_type] = time.time() - start
+    return timings
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--num-libs', type=int, default=1000,
+                        help="number of libraries in the project")
+    parser.add_argument('--num-genes', type=int, default=60000,
+                        help="number of genes in each counts file")
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='bripipetools_io_bench_')
+    try:
+        print("{:<6} {:>8} {:>12} {:>10} {:>12}".format(
+            'format', 'type', 'size (MB)', 'secs', 'libs/sec'))
+        for compression in ['plain', 'gzip', 'bz2']:
+            paths = write_project(root, args.num_libs, args.num_genes,
+                                  compression)
+            timings = time_reads(paths)
+            for output_type, secs in sorted(timings.items()):
+                size = sum(os.path.getsize(p)
+                           for p in paths[output_type]) / 1e6
+                print("{:<6} {:>8} {:>12.1f} {:>10.2f} {:>12.1f}".format(
+                    compression, output_type, size, secs,
+                    args.num_libs / secs))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,66 @@
+"""
+Compare the time to swap the root of many output paths by compiling a
+new regular expression for each path and with a precompiled, shared
+``bripipetools.util.RootRewriter``.
+
+Usage: python benchmark_root_rewriter.py [--num-paths N] [--repeat N]
+"""
+import os
+import re
+import sys
+import timeit
+import argparse
+
+import _mypath
+from bripipetools import util
+
+TOP_LEVEL = 'pipeline'
+NEW_ROOT = '/mnt/bioinformatics/'
+
+
+def build_paths(num_paths):
+    """
+    Return a list of output paths under a shared root, spread across
+    several flowcell and project folders.
+    """
+    return [('/Volumes/genomics/pipeline/Illumina/FC{}/'
+             'Project_P{}Processed/counts/lib{}_htseq_counts.txt')
+            .format(i % 7, i % 13, i) for i in range(num_paths)]
+
+
+def swap_each(paths):
+    """
+    Swap the root of each path with a new regular expression per path.
+    """
+    return [os.path.join(NEW_ROOT,
+                         re.sub('.*(?={})'.format(TOP_LEVEL), '', p))
+            for p in paths]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--num-paths', type=int, default=20000,
+                        help="number of paths to rewrite")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="number of timed runs (the fastest is kept)")
+    args = parser.parse_args(argv)
+
+    paths = build_paths(args.num_paths)
+    rewriter = util.get_root_rewriter(TOP_LEVEL, NEW_ROOT)
+    if rewriter.rewrite_all(paths) != swap_each(paths):
+        sys.exit("rewritten paths don't match")
+
+    swap_time = min(timeit.repeat(lambda: swap_each(paths), number=1,
+                                  repeat=args.repeat))
+    rewrite_time = min(timeit.repeat(lambda: rewriter.rewrite_all(paths),
+                                     number=1, repeat=args.repeat))
+    print("{:<12} {:>10} {:>14}".format('method', 'secs', 'paths/sec'))
+    for method, secs in [('per-path', swap_time),
+                         ('rewriter', rewrite_time)]:
+        print("{:<12} {:>10.4f} {:>14.0f}".format(
+            method, secs, args.num_paths / secs))
+    print("speedup: {:.1f}x".format(swap_time / rewrite_time))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -15,6 +15,7 @@ config = {
     'package_data': {
         'bripipetools': [
             'config/default.ini',
+            'config/local.ini',
             'config/logging_config.ini',
             'data/*'
         ]
@@ -25,6 +26,11 @@ config = {
         'pymongo',
         'pandas'
     ],
+    'extras_require': {
+        'async': ['motor'],
+        'formats': ['pyarrow', 'tables'],
+        'plans': ['PyYAML']
+    },
     'entry_points': {
         'console_scripts': 'bripipetools = bripipetools.__main__:main'
     },
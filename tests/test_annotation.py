@@ -509,6 +509,30 @@ class TestFlowcellRunAnnotator:
                 set([l.split('-')[0] for libs in list(mock_libs.values())
                      for l in libs]))
 
+    def test_filter_changed_by_library_anchors_pattern(self, mock_db):
+        # GIVEN an annotator object created for a flowcell run with a
+        # change tracker
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_tracker = mock.Mock()
+        mock_tracker.source_changed.return_value = True
+        annotator = annotation.FlowcellRunAnnotator(
+            run_id=mock_id,
+            db=mock_db,
+            pipeline_root='/mnt',
+            tracker=mock_tracker
+        )
+
+        # WHEN libraries are checked for changes in a folder with output
+        # files for all libraries
+        annotator._filter_changed('genomicsCounts', ['lib1-11111111'],
+                                  '/mnt/counts', by_library=True)
+
+        # THEN source files should be matched by library ID prefix, so
+        # that files for other libraries (e.g., 'lib12') are excluded
+        mock_tracker.source_changed.assert_called_once_with(
+            'genomicsCounts', 'lib1_C00000XX', '/mnt/counts', '^lib1_'
+        )
+
 
 #@pytest.fixture(scope='function')
 def mock_batchfile(filename, tmpdir):
@@ -941,3 +965,56 @@ class TestProcessedLibraryAnnotator:
         # as mapped
         assert (test_object.parent_id == mock_id)
         assert not test_object.is_mapped
+
+
+class TestRunContext:
+    """
+    Tests methods for the `RunContext` class in the
+    `bripipetools.annotation.runcontext` module.
+    """
+    def test_get_batch_file(self, mock_db, tmpdir):
+        # GIVEN a workflow batch file and a run context
+        mock_filename = '161231_P00-00_C00000XX_optimized_workflow_1.txt'
+        mock_file = mock_batchfile(mock_filename, tmpdir)
+        context = annotation.RunContext(db=mock_db, run_opts={})
+
+        # WHEN the batch file is retrieved and its outputs are iterated
+        # several times
+        test_readers = [context.get_batch_file(mock_file) for _ in range(2)]
+        with mock.patch('bripipetools.io.workflowbatch.open',
+                        create=True) as mock_open:
+            test_outputs = [list(r.iter_outputs()) for r in test_readers]
+
+        # THEN the same reader should be returned, and the file should
+        # not be read again
+        assert (test_readers[0] is test_readers[1])
+        assert not mock_open.called
+        assert ([s for s, o in test_outputs[-1]] == ['sample1', 'sample2'])
+
+    def test_get_annotator(self, mock_db, tmpdir):
+        # GIVEN a workflow batch file and a run context
+        mock_filename = '161231_P00-00_C00000XX_optimized_workflow_1.txt'
+        mock_file = mock_batchfile(mock_filename, tmpdir)
+        mock_workflowfile('optimized_workflow_1.ga', tmpdir)
+        context = annotation.RunContext(
+            db=mock_db,
+            run_opts={"sexmodel":'y_sq_over_tot',
+                      "sexcutoff":1,
+                      "workflow_dir":str(tmpdir)}
+        )
+
+        # WHEN annotators are retrieved for the same batch file, using
+        # equivalent paths
+        with mock.patch('bripipetools.database.get_genomicsWorkflowbatches',
+                        return_value=[]) as mock_get:
+            test_annotator = context.get_annotator(mock_file, '/mnt')
+            test_other = context.get_annotator(
+                mock_file.replace(mock_filename, './' + mock_filename),
+                '/mnt')
+
+        # THEN the same annotator should be returned, with the workflow
+        # batch looked up only once and using the shared reader
+        assert (test_annotator is test_other)
+        assert (mock_get.call_count == 1)
+        assert (test_annotator.workflowbatch_reader
+                is context.get_batch_file(mock_file))
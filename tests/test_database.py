@@ -1,10 +1,12 @@
 import logging
 import datetime
 import os
+import asyncio
 
 import pytest
 import mongomock
-from mock import Mock
+import pymongo
+from mock import Mock, patch
 
 from bripipetools import model as docs
 from bripipetools import database
@@ -21,6 +23,24 @@ def test_database_connection():
         assert (db.collection_names())
 
 
+def test_get_db_params_without_password(tmpdir, monkeypatch):
+    # GIVEN a property file with a username but no password for the
+    # target database
+    mock_file = tmpdir.join('mock.ini')
+    mock_file.write('[mockdb]\n'
+                    'db_host = localhost\n'
+                    'db_name = mockdb\n'
+                    'user = mockuser\n')
+    monkeypatch.setenv('DB_PARAM_FILE', str(mock_file))
+
+    # WHEN database parameters are read
+    db_params = database.get_db_params('mockdb')
+
+    # THEN neither the username nor password should be included
+    assert (db_params['db_name'] == 'mockdb')
+    assert ('user' not in db_params and 'password' not in db_params)
+
+
 @pytest.fixture(scope='function')
 def mock_db():
     # GIVEN a mocked version of the TG3 Mongo database
@@ -157,6 +177,58 @@ class TestDatabaseOperations:
         # THEN new objects should be in database
         assert (mock_db['mockcollection'].find().count() == 2)
 
+    def test_insert_objects_skips_unchanged(self, mock_db, mock_dbobject):
+        # GIVEN the mock database contains a mocked collection with a
+        # single pre-defined object
+        mock_db['mockcollection'].insert_one(mock_dbobject)
+
+        # WHEN the same object is inserted with only a volatile field
+        # (e.g., 'lastUpdated') modified
+        new_dbobject = mock_dbobject.copy()
+        new_dbobject['lastUpdated'] = 'now'
+        mock_fn = Mock(name='mock_fn',
+                       return_value=(mock_db, new_dbobject))
+        mock_fn.__name__ = 'mock_fn'
+        wrapped_fn = database.insert_objects('mockcollection')(mock_fn)
+        wrapped_fn()
+
+        # THEN the stored object should not be modified
+        test_query = {'_id': mock_dbobject['_id']}
+        assert (mock_db['mockcollection'].find_one(test_query)
+                == mock_dbobject)
+
+    @pytest.mark.parametrize(
+        'test_current, test_new, expected_result',
+        [
+            ({}, {'_id': 'a', 'f': 1, 'g': None}, {'$set': {'f': 1}}),
+            ({}, {'_id': 'a', 'g': None}, None),
+            ({'_id': 'a', 'f': 1}, {'_id': 'a', 'f': 1}, None),
+            ({'_id': 'a', 'f': 1, 'dateCreated': 1},
+             {'_id': 'a', 'f': 1, 'dateCreated': 2}, None),
+            ({'_id': 'a', 'f': 1}, {'_id': 'a', 'f': 1, 'lastUpdated': 2},
+             None),
+            ({'_id': 'a', 'f': 1}, {'_id': 'a', 'f': 2, 'lastUpdated': 2},
+             {'$set': {'f': 2, 'lastUpdated': 2}}),
+            ({'_id': 'a', 'processedData': {'x': 1, 'y': 2, 'z': 3}},
+             {'_id': 'a', 'processedData': {'x': 1, 'y': 4}},
+             {'$set': {'processedData.y': 4},
+              '$unset': {'processedData.z': ''}}),
+            ({'_id': 'a', 'geneCounts': {'g.1': 1}},
+             {'_id': 'a', 'geneCounts': {'g.1': 2}},
+             {'$set': {'geneCounts': {'g.1': 2}}})
+        ]
+    )
+    def test_plan_update(self, test_current, test_new, expected_result):
+        # (GIVEN)
+
+        # WHEN planning the update from a stored document to a new
+        # version of the document
+
+        # THEN only changed fields should be set (with dotted paths for
+        # nested fields) or unset, and unchanged documents skipped
+        assert (database.plan_update(test_current, test_new)
+                == expected_result)
+
     @pytest.mark.parametrize(
         'test_collection, test_function',
         [
@@ -269,6 +341,263 @@ class TestDatabaseOperations:
         assert (value is None)
 
 
+class TestBufferedWriter:
+    """
+    Tests the ``BufferedWriter`` class in the ``database.buffering``
+    module for write-behind inserts into database collections.
+    """
+    def test_close_writes_coalesced_objects(self, mock_db, mock_dbobject):
+        # GIVEN a buffered writer for the mock database
+        writer = database.BufferedWriter(mock_db, flush_interval=60)
+
+        # WHEN the same object is added to the buffer multiple times,
+        # with new or updated fields in later versions, and the writer
+        # is closed
+        writer.put('mockcollection', mock_dbobject)
+        writer.put('mockcollection', {'_id': mock_dbobject['_id'],
+                                      'updateField': 'newvalue',
+                                      'skipField': None})
+        writer.close()
+
+        # THEN a single object should be in the collection, with the
+        # most recent value of each non-empty field
+        test_query = {'_id': mock_dbobject['_id']}
+        assert (len(list(mock_db['mockcollection'].find(test_query))) == 1)
+        assert (mock_db['mockcollection'].find_one(test_query)
+                == {'_id': 'mockobject',
+                    'updateField': 'newvalue',
+                    'arrayField': ['foo', 'baz']})
+        assert (writer.written == 1)
+
+    def test_flush_on_size(self, mock_db, mock_dbobject):
+        # GIVEN a buffered writer that writes after every 2 objects
+        writer = database.BufferedWriter(mock_db, max_docs=2,
+                                         flush_interval=60)
+
+        # WHEN a list of objects is added to the buffer and the writer
+        # is flushed
+        new_dbobject = mock_dbobject.copy()
+        new_dbobject['_id'] = 'newmockobject'
+        writer.put('mockcollection', [mock_dbobject, new_dbobject])
+        writer.flush()
+
+        # THEN both objects should be in the database before the writer
+        # is closed
+        assert (len(list(mock_db['mockcollection'].find())) == 2)
+        writer.close()
+
+    def test_context_raises_write_error(self, mock_dbobject):
+        # GIVEN a database connection for which all writes fail
+        mock_db = Mock(name='mock_db')
+        mock_db.__getitem__ = Mock(
+            return_value=Mock(find=Mock(return_value=[]),
+                              bulk_write=Mock(side_effect=ValueError))
+        )
+
+        # WHEN objects are added to a buffered writer in a context
+
+        # THEN the write error should be raised on leaving the context
+        with pytest.raises(ValueError):
+            with database.BufferedWriter(mock_db) as writer:
+                writer.put('mockcollection', mock_dbobject)
+
+
+class TestAsyncOperations:
+    """
+    Tests asyncio operations in the ``database.asyncops`` module, using
+    an async wrapper of the mock database.
+    """
+    def test_insert_and_find_async(self, mock_db, mock_dbobject):
+        # GIVEN an async wrapper of the mock database
+        async_db = database.AsyncDatabase(mock_db)
+
+        # WHEN an object is inserted asynchronously and then retrieved
+        async def insert_and_find():
+            await database.insert_async(async_db, 'mockcollection',
+                                        mock_dbobject)
+            return await database.find_async(
+                async_db, 'mockcollection', {'_id': mock_dbobject['_id']}
+            )
+        test_objects = asyncio.run(insert_and_find())
+
+        # THEN the retrieved object should match the mock object
+        assert (test_objects == [mock_dbobject])
+
+    def test_writer_flush_from_thread(self, mock_db, mock_dbobject):
+        # GIVEN an async writer for an async wrapper of the mock database
+        async_db = database.AsyncDatabase(mock_db)
+
+        # WHEN objects are put and flushed from a worker thread
+        new_dbobject = mock_dbobject.copy()
+        new_dbobject['_id'] = 'newmockobject'
+
+        async def write():
+            writer = database.AsyncWriter(async_db,
+                                          asyncio.get_running_loop())
+
+            def put_and_flush():
+                writer.put('mockcollection', mock_dbobject)
+                writer.put('mockcollection', new_dbobject)
+                writer.flush()
+                return len(list(mock_db['mockcollection'].find()))
+            return await asyncio.get_running_loop().run_in_executor(
+                None, put_and_flush
+            ), writer.written
+        test_count, test_written = asyncio.run(write())
+
+        # THEN both objects should be written before flush returns
+        assert (test_count == 2)
+        assert (test_written == 2)
+
+
+    def test_writer_batches_puts(self, mock_db, mock_dbobject):
+        # GIVEN an async writer for an async wrapper of the mock database,
+        # with batches of at most two documents
+        async_db = database.AsyncDatabase(mock_db)
+
+        # WHEN several objects (including an update to one of them) are
+        # put one at a time and the writer is drained
+        async def write():
+            writer = database.AsyncWriter(async_db,
+                                          asyncio.get_running_loop(),
+                                          max_docs=2)
+            for idx in range(3):
+                writer.put('mockcollection',
+                           dict(mock_dbobject, _id='mockobject{}'.format(idx)))
+            writer.put('mockcollection',
+                       dict(mock_dbobject, _id='mockobject2',
+                            updateField='new'))
+            await writer.drain()
+            return writer.written
+        with patch.object(mongomock.collection.Collection, 'bulk_write',
+                          autospec=True,
+                          side_effect=mongomock.collection.Collection
+                          .bulk_write) as mock_bulk_write:
+            test_written = asyncio.run(write())
+        async_db.close()
+
+        # THEN objects should be written with one bulk write per batch,
+        # with updates to the same object coalesced
+        assert (mock_bulk_write.call_count == 2)
+        assert (test_written == 3)
+        assert (mock_db['mockcollection'].find_one(
+            {'_id': 'mockobject2'})['updateField'] == 'new')
+
+    def test_async_database_close(self, mock_db):
+        # GIVEN an async wrapper of the mock database used as a context
+        # manager
+        with database.AsyncDatabase(mock_db) as async_db:
+            pass
+
+        # WHEN an operation is run after the wrapper is closed
+        # THEN the operation should be rejected by the thread pool
+        with pytest.raises(RuntimeError):
+            asyncio.run(database.find_async(async_db, 'mockcollection', {}))
+
+
+class TestLocalDatabase:
+    """
+    Tests the ``LocalDatabase`` class in the ``database.localdb`` module
+    and the ``ProfiledDatabase`` class in the ``database.profiling``
+    module.
+    """
+    def test_put_and_get_persisted(self, tmpdir, mock_dbobject):
+        # GIVEN a local database in an empty folder
+        local_db = database.LocalDatabase(str(tmpdir), 'bri')
+
+        # WHEN objects are inserted and then updated with the wrapped
+        # put function
+        new_dbobject = dict(mock_dbobject, _id='newmockobject',
+                            nestedField={'a': 1, 'b': 2},
+                            dateCreated=datetime.datetime(2016, 12, 31))
+        database.put_genomicsSamples(local_db, [mock_dbobject, new_dbobject])
+        database.put_genomicsSamples(
+            local_db, dict(new_dbobject, nestedField={'a': 3})
+        )
+
+        # THEN the latest version of each object should be retrieved
+        # from a new connection to the same folder with `$in`, `$regex`,
+        # and dotted path queries
+        test_db = database.LocalDatabase(str(tmpdir), 'bri')
+        assert (len(database.get_genomicsSamples(
+            test_db, {'_id': {'$in': ['mockobject', 'newmockobject']}}
+        )) == 2)
+        test_objects = database.get_genomicsSamples(
+            test_db, {'_id': {'$regex': '^new'}, 'nestedField.a': 3}
+        )
+        assert (test_objects == [dict(new_dbobject, nestedField={'a': 3})])
+
+    def test_find_with_projection(self, tmpdir, mock_dbobject):
+        # GIVEN a local database with an object
+        local_db = database.LocalDatabase(str(tmpdir), 'bri')
+        database.put_genomicsSamples(local_db, mock_dbobject)
+
+        # WHEN the object is retrieved with a projection
+        test_objects = local_db['genomicsSamples'].find({}, {'_id': 1})
+
+        # THEN only the included fields should be returned
+        assert (test_objects == [{'_id': 'mockobject'}])
+
+    @pytest.mark.parametrize(
+        'test_input',
+        [
+            {'updateField': {'$exists': True}},
+            {'updateField': {'$ne': 'value'}},
+            {'$or': [{'_id': 'mockobject'}]},
+        ]
+    )
+    def test_find_with_unsupported_operator(self, tmpdir, mock_dbobject,
+                                            test_input):
+        # GIVEN a local database with an object
+        local_db = database.LocalDatabase(str(tmpdir), 'bri')
+        database.put_genomicsSamples(local_db, mock_dbobject)
+
+        # WHEN the collection is searched with a query operator that
+        # isn't supported by the local database
+        # THEN an error should be raised
+        with pytest.raises(ValueError):
+            local_db['genomicsSamples'].find(test_input)
+
+    def test_bulk_write(self, tmpdir, mock_dbobject):
+        # GIVEN a local database in an empty folder
+        local_db = database.LocalDatabase(str(tmpdir), 'bri')
+
+        # WHEN objects are written through the buffered writer, which
+        # applies updates with bulk writes
+        with database.BufferedWriter(local_db) as writer:
+            writer.put('genomicsSamples', [
+                mock_dbobject, dict(mock_dbobject, _id='newmockobject')
+            ])
+
+        # THEN the objects should be retrieved from a new connection to
+        # the same folder
+        test_db = database.LocalDatabase(str(tmpdir), 'bri')
+        assert (len(database.get_genomicsSamples(test_db, {})) == 2)
+
+        # AND requests not built for the local database should be
+        # rejected
+        with pytest.raises(TypeError):
+            local_db['genomicsSamples'].bulk_write(
+                [pymongo.UpdateOne({'_id': 'mockobject'},
+                                   {'$set': {'updateField': 'new'}})]
+            )
+
+    def test_profiled_database_records_operations(self, tmpdir,
+                                                  mock_dbobject):
+        # GIVEN a profiled local database
+        profiled_db = database.ProfiledDatabase(
+            database.LocalDatabase(str(tmpdir), 'bri')
+        )
+
+        # WHEN an object is inserted with the wrapped put function
+        database.put_genomicsSamples(profiled_db, mock_dbobject)
+
+        # THEN one call should be recorded for each operation
+        assert (profiled_db.stats[('genomicsSamples', 'find')]['count'] == 1)
+        assert (profiled_db.stats[('genomicsSamples', 'update_one')]['count']
+                == 1)
+
+
 class TestMapping:
     @pytest.mark.parametrize(
         'test_input, expected_result',
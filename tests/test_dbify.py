@@ -2,9 +2,12 @@ import logging
 
 import pytest
 import mongomock
+import mock
 
 from bripipetools import model as docs
+from bripipetools import database
 from bripipetools import dbification
+from bripipetools import annotation
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,6 +24,45 @@ def mock_db():
                   "from mock Mongo database"))
 
 
+class TestWriterMixin:
+    """
+    Tests methods for the `WriterMixin` class in the
+    `bripipetools.dbification.writing` module.
+    """
+    def test_put_with_writer(self, mock_db):
+        # GIVEN an importer with a writer set
+        importer = dbification.WorkflowBatchImporter(
+            path='', db=mock_db, run_opts={}, writer=mock.Mock()
+        )
+
+        # WHEN a document is inserted
+        importer._put('genomicsSamples', {'_id': 'lib1111_C00000XX'})
+        importer._flush()
+
+        # THEN the document should be passed to the writer, and not
+        # written directly to the database
+        importer.writer.put.assert_called_once_with(
+            'genomicsSamples', {'_id': 'lib1111_C00000XX'}
+        )
+        importer.writer.flush.assert_called_once_with()
+        assert (mock_db.genomicsSamples.find_one() is None)
+
+    def test_put_without_writer(self, mock_db):
+        # GIVEN an importer without a writer
+        importer = dbification.WorkflowBatchImporter(
+            path='', db=mock_db, run_opts={}
+        )
+
+        # WHEN a document is inserted
+        importer._put('genomicsSamples',
+                      {'_id': 'lib1111_C00000XX', 'type': 'sequenced library'})
+        importer._flush()
+
+        # THEN the document should be written directly to the database
+        assert (mock_db.genomicsSamples.find_one()['_id']
+                == 'lib1111_C00000XX')
+
+
 class TestFlowcellRunImporter:
     """
     Tests methods for the `FlowcellRunImporter` class in the
@@ -198,6 +240,178 @@ class TestFlowcellRunImporter:
         assert (len(list(mock_db.genomicsSamples.find({'type': 'sequenced library'})))
                 == 4)
 
+    def test_insert_skips_unchanged_libraries(self, mock_db, tmpdir):
+        # GIVEN a path to a flowcell run folder with an unaligned folder,
+        # which includes a project folder with multiple folders for
+        # sequenced libraries
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id))
+        mock_libs = ['lib1111-11111111', 'lib2222-22222222']
+        projpath = mock_path.mkdir('Unaligned').mkdir('P1-1-11111111')
+        for l in mock_libs:
+            projpath.mkdir(l)
+
+        # AND the sequenced libraries were previously imported using an
+        # importer with a change tracker
+        dbification.FlowcellRunImporter(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts={},
+            tracker=dbification.ChangeTracker(mock_db)
+        ).insert(collection='genomicsSamples')
+
+        # AND a new FASTQ file is added for one of the libraries
+        (projpath.join(mock_libs[0])
+         .join('sample-name_S1_L001_R1_001.fastq.gz').write(''))
+
+        # WHEN the libraries are imported again with a new change tracker
+        tracker = dbification.ChangeTracker(mock_db)
+        dbification.FlowcellRunImporter(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts={},
+            tracker=tracker
+        ).insert(collection='genomicsSamples')
+
+        # THEN only the library with changed inputs should be written
+        assert (tracker.skipped['genomicsSamples'] == 1)
+        assert (tracker.written['genomicsSamples'] == 1)
+        assert (len(mock_db.genomicsSamples.find_one(
+            {'_id': 'lib1111_C00000XX'})['rawData']) == 1)
+
+    def test_insert_reimports_on_changed_options_or_missing_data(
+            self, mock_db, tmpdir):
+        # GIVEN a path to a flowcell run folder with an unaligned folder,
+        # which includes a project folder with multiple folders for
+        # sequenced libraries
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id))
+        mock_libs = ['lib1111-11111111', 'lib2222-22222222']
+        projpath = mock_path.mkdir('Unaligned').mkdir('P1-1-11111111')
+        for l in mock_libs:
+            projpath.mkdir(l)
+
+        # AND the sequenced libraries were previously imported using an
+        # importer with a change tracker
+        def insert(run_opts):
+            tracker = dbification.ChangeTracker(mock_db, run_opts)
+            dbification.FlowcellRunImporter(
+                path=str(mock_path),
+                db=mock_db,
+                run_opts=run_opts,
+                tracker=tracker
+            ).insert(collection='genomicsSamples')
+            return tracker
+        insert({'sexcutoff': 1})
+        def get_source():
+            return mock_db.genomicsFingerprints.find_one(
+                {'objectId': 'lib1111_C00000XX'})['source']
+        mock_source = get_source()
+
+        # WHEN the libraries are imported again with different options
+        # THEN the sources of each library should be checked again and
+        # the new fingerprint recorded
+        insert({'sexcutoff': 2})
+        assert (get_source() != mock_source)
+
+        # WHEN the document for one library is removed from the database
+        # and the libraries are imported again with the same options
+        mock_db.genomicsSamples.delete_one({'_id': 'lib1111_C00000XX'})
+        test_tracker = insert({'sexcutoff': 2})
+
+        # THEN only the missing library should be written
+        assert (test_tracker.skipped['genomicsSamples'] == 1)
+        assert (test_tracker.written['genomicsSamples'] == 1)
+        assert (mock_db.genomicsSamples.find_one({'_id': 'lib1111_C00000XX'})
+                is not None)
+
+    def test_insert_with_writer_defers_fingerprints(self, mock_db, tmpdir):
+        # GIVEN a path to a flowcell run folder with an unaligned folder,
+        # which includes a project folder with a sequenced library
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id))
+        (mock_path.mkdir('Unaligned').mkdir('P1-1-11111111')
+         .mkdir('lib1111-11111111'))
+
+        # AND an importer with a change tracker and a writer
+        importer = dbification.FlowcellRunImporter(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts={},
+            writer=mock.Mock(),
+            tracker=dbification.ChangeTracker(mock_db)
+        )
+
+        # WHEN the libraries are inserted
+        importer.insert(collection='genomicsSamples')
+
+        # THEN only the library document should be passed to the writer,
+        # and no fingerprint should be recorded yet
+        assert ([c[0][0] for c in importer.writer.put.call_args_list]
+                == ['genomicsSamples'])
+        assert (mock_db.genomicsFingerprints.find_one() is None)
+
+        # AND the fingerprint should be recorded once requested, after
+        # the documents are written
+        importer.write_fingerprints()
+        assert (mock_db.genomicsFingerprints.find_one()['objectId']
+                == 'lib1111_C00000XX')
+
+    def test_insert_workflowbatches_skips_tmp_files(self, mock_db, tmpdir):
+        # GIVEN a path to a flowcell run folder with a batch submission
+        # folder that only contains leftover temporary and hidden files
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id))
+        batch_path = mock_path.mkdir('globus_batch_submission')
+        for f in ['.161231_P1-1_C00000XX_workflow.txt.tmp',
+                  '161231_P1-1_C00000XX_workflow.txt.tmp',
+                  '.DS_Store']:
+            batch_path.ensure(f)
+
+        # AND an importer object is created for the path
+        importer = dbification.FlowcellRunImporter(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts={}
+        )
+
+        # WHEN workflow batches are inserted into database
+        importer._insert_genomicsWorkflowbatches()
+
+        # THEN no workflow batches should be inserted
+        assert (mock_db.genomicsWorkflowbatches.find_one() is None)
+
+    def test_source_fingerprint_with_anchored_pattern(self, mock_db, tmpdir):
+        # GIVEN a folder with output files for libraries whose IDs share
+        # a prefix
+        mock_path = tmpdir.mkdir('counts')
+        for lib in ['lib1', 'lib12']:
+            mock_path.ensure('{}_C00000XX_htseq_counts.txt'.format(lib)) \
+                .write('field1\t0\n')
+        tracker = dbification.ChangeTracker(mock_db)
+        test_fingerprint = tracker.get_source_fingerprint(str(mock_path),
+                                                          '^lib1_')
+
+        # WHEN the file for the other library is changed
+        mock_path.join('lib12_C00000XX_htseq_counts.txt') \
+            .write('field1\t10\n')
+
+        # THEN the fingerprint for the library should be unchanged
+        assert (tracker.get_source_fingerprint(str(mock_path), '^lib1_')
+                == test_fingerprint)
+
 
 #@pytest.fixture(scope='function')
 def mock_batchfile(filename, tmpdir):
@@ -412,6 +626,59 @@ class TestWorkflowBatchImporter:
                         .find({'type': 'processed library'})))
                 == 2)
 
+    def test_insert_with_context_looks_up_batch_once(self, mock_db, tmpdir):
+        # GIVEN a path to a workflow batch file and a connection to a
+        # database in which a document corresponding to the workflow batch
+        # does not exist
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id)
+                    .mkdir('globus_batch_submission'))
+
+        mock_filename = '161231_P1-1_P99-99_C00000XX_workflow-name.txt'
+        mock_path = mock_batchfile(mock_filename, mock_path)
+
+        # AND a workflow file corresponding to the workflow batch
+        mock_wkflow_filename = 'optimized_workflow_1.ga'
+        mock_workflowfile(mock_wkflow_filename, tmpdir)
+
+        # AND a run context shared with another step that has already
+        # annotated the workflow batch
+        mock_run_opts = {"sexmodel":'y_sq_over_tot',
+                         "sexcutoff":1,
+                         "workflow_dir":str(tmpdir)}
+        context = annotation.RunContext(db=mock_db, run_opts=mock_run_opts)
+        test_annotator = context.get_annotator(str(mock_path), str(tmpdir))
+
+        # AND an importer object is created for the path with the context
+        importer = dbification.WorkflowBatchImporter(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts = mock_run_opts,
+            context=context
+        )
+
+        # WHEN all objects are inserted into all database collections
+        with mock.patch('bripipetools.annotation.WorkflowBatchAnnotator',
+                        wraps=annotation.WorkflowBatchAnnotator) \
+                as mock_annotator:
+            importer.insert(collection = 'all')
+
+        # THEN the shared annotator should be used for all collections
+        assert not mock_annotator.called
+        assert (importer._get_annotator() is test_annotator)
+
+        # AND documents should be present in the genomicsWorkflowbatches
+        # and genomicsSamples collections
+        assert (len(list(mock_db.genomicsWorkflowbatches
+                         .find({'type': 'Galaxy workflow batch'})))
+                == 1)
+        assert (len(list(mock_db.genomicsSamples
+                        .find({'type': 'processed library'})))
+                == 2)
+
 
 class TestImportManager:
     """
@@ -554,6 +821,34 @@ class TestImportManager:
         assert (len(list(mock_db.genomicsSamples.find({'type': 'sequenced library'})))
                 == 4)
 
+    def test_run_skips_fingerprints_on_write_error(self, mock_db, tmpdir):
+        # GIVEN a path to a flowcell run folder with an unaligned folder,
+        # which includes a project folder with a sequenced library
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id))
+        (mock_path.mkdir('Unaligned').mkdir('P1-1-11111111')
+         .mkdir('lib1111-11111111'))
+        mock_path.mkdir("globus_batch_submission")
+
+        # AND an import manager is created for the path
+        manager = dbification.ImportManager(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts={}
+        )
+
+        # WHEN the bulk write of the library documents fails
+        with mock.patch.object(mongomock.collection.Collection, 'bulk_write',
+                               side_effect=RuntimeError('write failed')):
+            with pytest.raises(RuntimeError):
+                manager.run(collections='genomicsSamples')
+
+        # THEN no fingerprint should be recorded for the library
+        assert (mock_db.genomicsFingerprints.find_one() is None)
+
     def test_run_for_workflow_batch(self, mock_db, tmpdir):
         # GIVEN a path to a workflow batch file and a connection to a
         # database in which a document corresponding to the workflow batch
@@ -594,3 +889,105 @@ class TestImportManager:
                 == 1)
         assert (len(list(mock_db.genomicsSamples.find({'type': 'processed library'})))
                 == 2)
+
+
+class TestAsyncImportManager:
+    """
+    Tests methods for the `AsyncImportManager` class in the
+    `bripipetools.dbification.asyncimport` module.
+    """
+    def test_run_for_flowcell_run(self, mock_db, tmpdir):
+        # GIVEN a path to a flowcell run folder and a connection to a
+        # database in which a document corresponding to the flowcell run
+        # may or may not exist
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id))
+
+        # AND an unaligned folder, which includes multiple project folders,
+        # each with multiple folders for sequenced libraries
+        mock_projects = ['P1-1-11111111', 'P99-99-99999999']
+        mock_libs = {0: ['lib1111-11111111', 'lib2222-22222222'],
+                     1: ['lib3333-33333333', 'lib4444-44444444']}
+        unalignedpath = mock_path.mkdir('Unaligned')
+        for idx, p in enumerate(mock_projects):
+            projpath = unalignedpath.mkdir(p)
+            for l in mock_libs[idx]:
+                projpath.mkdir(l)
+
+        # AND a batch submission directory in the run folder
+        mock_path.mkdir("globus_batch_submission")
+
+        # AND an async import manager is created for the path, with
+        # writes made through an async wrapper of the mock database
+        manager = dbification.AsyncImportManager(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts={"sexmodel": 'y_sq_over_tot', "sexcutoff": 1}
+        )
+
+        # WHEN all objects are inserted into database
+        manager.run()
+
+        # THEN documents should be present in the genomics runs and samples collections
+        assert (len(list(mock_db.genomicsRuns.find({'type': 'flowcell'}))) == 1)
+        assert (len(list(mock_db.genomicsSamples.find({'type': 'sequenced library'})))
+                == 4)
+
+    def test_run_reports_changes_once(self, mock_db, tmpdir):
+        # GIVEN a path to a flowcell run folder with an unaligned folder,
+        # which includes a project folder with a sequenced library
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id))
+        (mock_path.mkdir('Unaligned').mkdir('P1-1-11111111')
+         .mkdir('lib1111-11111111'))
+        mock_path.mkdir("globus_batch_submission")
+
+        # AND an async import manager is created for the path, with
+        # unchanged libraries skipped
+        manager = dbification.AsyncImportManager(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts={"sexmodel": 'y_sq_over_tot', "sexcutoff": 1}
+        )
+
+        # WHEN all collections are inserted, in several stages
+        with mock.patch.object(dbification.ChangeTracker, 'report') \
+                as mock_report:
+            manager.run()
+
+        # THEN skipped and written documents should be reported once
+        assert (mock_report.call_count == 1)
+
+    def test_run_closes_default_async_database(self, mock_db, tmpdir):
+        # GIVEN a path to a flowcell run folder with an unaligned folder,
+        # which includes a project folder with a sequenced library
+        mock_id = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir.mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_id))
+        (mock_path.mkdir('Unaligned').mkdir('P1-1-11111111')
+         .mkdir('lib1111-11111111'))
+        mock_path.mkdir("globus_batch_submission")
+
+        # AND an async import manager is created for the path, with
+        # writes made through the default async wrapper of the database
+        manager = dbification.AsyncImportManager(
+            path=str(mock_path),
+            db=mock_db,
+            run_opts={}
+        )
+
+        # WHEN all collections are inserted
+        with mock.patch.object(database.AsyncDatabase, 'close') \
+                as mock_close:
+            manager.run()
+
+        # THEN the async wrapper should be closed once
+        mock_close.assert_called_once_with()
@@ -1,9 +1,15 @@
 import logging
+import os
+import gzip
+import bz2
+import zipfile
 
+import mock
 import pytest
 from bs4 import BeautifulSoup as bsoup
 
 from bripipetools import io
+from bripipetools import parsing
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -21,6 +27,136 @@ def mockstringfile(s, tmpdir):
     return str(f)
 
 
+class TestCompression:
+    """
+    Tests functions for opening plain or compressed files as text
+    streams, in the ``bripipetools.io.compression`` module.
+    """
+    @pytest.mark.parametrize(
+        'test_input, expected_result',
+        [
+            ('plain', None),
+            ('gzip', 'gzip'),
+            ('bz2', 'bz2'),
+            ('zip', 'zip'),
+        ]
+    )
+    def test_detect_compression_and_open_text(self, tmpdir, test_input,
+                                              expected_result):
+        # GIVEN a file with text contents, written with the specified
+        # compression (and without a telling file extension)
+        testpath = str(tmpdir.join('mockfile'))
+        testcontents = 'field1\t1\nfield2\t2\n'
+        if test_input == 'plain':
+            open(testpath, 'w').write(testcontents)
+        elif test_input == 'gzip':
+            gzip.open(testpath, 'wt').write(testcontents)
+        elif test_input == 'bz2':
+            bz2.open(testpath, 'wt').write(testcontents)
+        else:
+            with zipfile.ZipFile(testpath, 'w') as zf:
+                zf.writestr('folder/mockfile.txt', testcontents)
+
+        # WHEN the compression is detected and the file is read as text
+        test_compression = io.detect_compression(testpath)
+        with io.open_text(testpath) as f:
+            test_lines = f.readlines()
+
+        # THEN the compression should match the expected result, and the
+        # decompressed lines should be returned
+        assert (test_compression == expected_result)
+        assert (test_lines == ['field1\t1\n', 'field2\t2\n'])
+
+    def test_open_text_zip_with_multiple_files(self, tmpdir):
+        # GIVEN a zip archive with multiple files
+        testpath = str(tmpdir.join('mockfile.zip'))
+        with zipfile.ZipFile(testpath, 'w') as zf:
+            zf.writestr('folder/file1.txt', 'file1\n')
+            zf.writestr('folder/file2.txt', 'file2\n')
+
+        # WHEN a file is read by name, THEN its contents should be
+        # returned
+        with io.open_text(testpath, member='file2.txt') as f:
+            assert (f.read() == 'file2\n')
+
+        # AND WHEN no file is named, THEN an error should be raised
+        with pytest.raises(KeyError):
+            with io.open_text(testpath) as f:
+                f.read()
+
+    @pytest.mark.parametrize(
+        'test_input, expected_result',
+        [
+            ('lib1_htseq_counts.txt.gz', 'lib1_htseq_counts.txt'),
+            ('lib1_htseq_metrics.txt.bz2', 'lib1_htseq_metrics.txt'),
+            ('lib1_htseq_counts.txt', 'lib1_htseq_counts.txt'),
+            ('lib1_fastqc_qc.zip', 'lib1_fastqc_qc.zip'),
+        ]
+    )
+    def test_strip_compression_ext(self, test_input, expected_result):
+        # WHEN a compression extension is removed from a filename,
+        # THEN the result should match the expected result
+        assert (io.strip_compression_ext(test_input) == expected_result)
+
+
+class TestParserRegistry:
+    """
+    Tests the registry of parser classes for output types and sources,
+    in the ``bripipetools.io.registry`` module.
+    """
+    @pytest.mark.parametrize(
+        'test_input, expected_result',
+        [
+            (('lib1111_C00000XX_htseq_counts.txt', 'counts'), True),
+            (('lib1111_C00000XX_htseq_counts.txt.gz', 'counts'), True),
+            (('P00-00_C00000XX_161231_combined_counts.csv', 'counts'),
+             False),
+            (('lib1111_C00000XX_htseq_metrics.txt', 'counts'), False),
+            (('lib1111_C00000XX_picard-align_metrics.html', 'metrics'),
+             True),
+            (('lib1111_C00000XX_fastqc_qc.zip', 'qc'), True),
+        ]
+    )
+    def test_is_output(self, test_input, expected_result):
+        # WHEN a filename is checked against an output type, THEN the
+        # result should match the expected result
+        assert (io.parser_registry.is_output(*test_input)
+                == expected_result)
+
+    def test_get_parser_unregistered(self):
+        # WHEN a parser is requested for an unregistered source, THEN
+        # an error should be raised
+        with pytest.raises(KeyError):
+            io.parser_registry.get_parser('counts', 'featurecounts')
+
+    def test_register_and_create(self, tmpdir):
+        # GIVEN a new registry, with a parser class registered for a
+        # new output type and source
+        class MockFile(object):
+            def __init__(self, path):
+                self.path = path
+
+            def parse(self):
+                return {'path': self.path}
+
+        registry = io.ParserRegistry()
+        registry.register('mock', ['tool'], MockFile, filetypes='txt')
+
+        # WHEN a parser is created for an output file and used to parse
+        # the file twice
+        testparser = registry.create('lib1111_tool_mock.txt', 'mock', 'tool')
+        testparser.parse()
+        test_data = testparser.parse()
+
+        # THEN the parser should return the parsed data, with
+        # attributes passed through to the parser object
+        assert (test_data == {'path': 'lib1111_tool_mock.txt'})
+        assert (testparser.path == 'lib1111_tool_mock.txt')
+
+        # AND the calls should be recorded in the registry's statistics
+        assert (registry.stats[('MockFile', 'parse')]['count'] == 2)
+
+
 class TestPicardMetricsFile:
     """
     Tests class for reading and parsing data from Picard metrics
@@ -434,8 +570,8 @@ class TestHtseqCountsFile:
     """
     def test_read_file(self, tmpdir):
         # GIVEN some file exists with arbitrary contents
-        testcontents = ['variable1\tvalue1\n',
-                        'variable2\tvalue2\n']
+        testcontents = ['variable1\t1\n',
+                        'variable2\t2\n']
         testpath = mockstringfile(''.join(testcontents), tmpdir)
 
         # AND an io class object is created for that file
@@ -453,8 +589,8 @@ class TestHtseqCountsFile:
         # GIVEN a file, where data is reported in a table
         # with each row containing a variable (e.g., a gene name)
         # and value (separated by tab)
-        testcontents = ['variable1\tvalue1\n',
-                        'variable2\tvalue2\n']
+        testcontents = ['variable1\t1\n',
+                        'variable2\t2\n']
         testpath = mockstringfile(''.join(testcontents), tmpdir)
 
         # AND an io class object is created for that file
@@ -469,6 +605,45 @@ class TestHtseqCountsFile:
         assert (len(table_data) == 2)
         assert (len(table_data.columns) == 2)
 
+    def test_parse_special_counters(self, tmpdir):
+        # GIVEN a counts file that ends with htseq-count special counters
+        testcontents = ['gene1\t10\n',
+                        'gene2\t0\n',
+                        '__no_feature\t5\n',
+                        '__ambiguous\t3\n']
+        testpath = mockstringfile(''.join(testcontents), tmpdir)
+
+        # AND an io class object is created for that file
+        testfile = io.HtseqCountsFile(path=testpath)
+
+        # WHEN gene counts and special counters are parsed
+        table_data = testfile.parse()
+        metrics_data = testfile.parse_metrics()
+
+        # THEN all rows (including special counters) should be stored
+        # with fixed dtypes, and special counters should also be
+        # returned as metrics
+        assert (list(table_data['geneName'])
+                == ['gene1', 'gene2', '__no_feature', '__ambiguous'])
+        assert (table_data['count'].dtype == 'int32')
+        assert (metrics_data == {'no_feature': 5, 'ambiguous': 3})
+
+    def test_parse_gzipped(self, tmpdir):
+        # GIVEN a gzip-compressed counts file
+        testpath = str(tmpdir.join('lib1111_C00000XX_htseq_counts.txt.gz'))
+        with gzip.open(testpath, 'wt') as f:
+            f.write('gene1\t10\ngene2\t20\n')
+
+        # AND an io class object is created for that file
+        testfile = io.HtseqCountsFile(path=testpath)
+
+        # WHEN the contents of the file are read and stored
+        table_data = testfile.parse()
+
+        # THEN the decompressed counts should be stored as a data frame
+        assert (list(table_data['geneName']) == ['gene1', 'gene2'])
+        assert (list(table_data['count']) == [10, 20])
+
 
 class TestFastQCFile:
     """
@@ -477,20 +652,19 @@ class TestFastQCFile:
     some useful reference features (e.g., consistently formatted sections
     and headers, tab-delimited tables in selected sections).
     """
-    def test_read_file(self, tmpdir):
+    def test_read_lines(self, tmpdir):
         # GIVEN some file exists with arbitrary contents
-        testcontents = 'testline\n'
+        testcontents = 'testline1\ntestline2\n'
         testpath = mockstringfile(testcontents, tmpdir)
 
         # AND an io class object is created for that file
         testfile = io.FastQCFile(path=testpath)
 
-        # WHEN the contents of the file are read and stored
-        testfile._read_file()
+        # WHEN the contents of the file are read
 
-        # THEN the unformatted contents should be stored in the raw
-        # field of the file object's data attribute
-        assert (len(testfile.data['raw']))
+        # THEN the unformatted lines should be yielded one at a time
+        assert (list(testfile._read_lines()) == ['testline1\n',
+                                                 'testline2\n'])
 
     def test_clean_header(self):
         # GIVEN an io class object for an arbitrary file
@@ -514,7 +688,7 @@ class TestFastQCFile:
         assert (testfile._clean_value('value1') == 'value1')
         assert (testfile._clean_value('') == '')
 
-    def test_locate_sections(self):
+    def test_iter_records_section_status(self):
         # GIVEN some file content, where data is divided into sections
         # demarcated by '>>' characters followed by module name and
         # module status (separated by tab) on the same line, one to many
@@ -527,58 +701,61 @@ class TestFastQCFile:
                         'module line\n',
                         '>>END_MODULE\n']
 
-        # AND an io class object with the file contents stored in the
-        # raw field of its data attribute
-        testfile = io.FastQCFile(path='')
-        testfile.data['raw'] = testcontents
-
-        # WHEN sections are located in the file
-        sections = testfile._locate_sections()
-
-        # THEN should be dictionary with a tuple for each section
-        # indicating the the start and end lines of the section/module
-        assert (sections == {'module_header_1': (1, 3),
-                             'module_header_2': (4, 6)})
-
-    def test_get_section_status(self):
-        # GIVEN some file content representing the typical format of a
-        # section header, where sections contain results from modules
-        testcontents = ['>>Module Header 1\tpass\n',
-                        '>>END_MODULE\n']
-
-        # AND an io class object with the file contents stored in the
-        # raw field of its data attribute
+        # AND an io class object for an arbitrary file
         testfile = io.FastQCFile(path='')
-        testfile.data['raw'] = testcontents
 
-        # WHEN section header line is parsed to retrieve status
-        (section_name, section_status) = testfile._get_section_status(
-            'module_header_1', (0, 1)
-        )
+        # WHEN records are collected from the lines
+        records = list(testfile._iter_records(testcontents))
 
-        # THEN should return a tuple with module name and expected status
-        assert ((section_name, section_status) == ('module_header_1', 'pass'))
+        # THEN there should be a status record for each section/module,
+        # and lines outside of table sections should be skipped
+        assert (records == [('status', 'module_header_1', 'pass'),
+                            ('status', 'module_header_2', 'fail')])
 
-    def test_parse_section_table(self):
+    def test_iter_records_section_table(self):
         # GIVEN some file content representing the typical format of a
         # section with data organized in a tab-delimited table
-        testcontents = ['>>Module Header 1\tpass\n',
+        testcontents = ['>>Basic Statistics\tpass\n',
+                        '#Measure\tValue\n',
                         'field1\tvalue1\n',
                         'field2\t1.0\n',
+                        '>>END_MODULE\n',
+                        'field3\t2.0\n']
+
+        # AND an io class object for an arbitrary file
+        testfile = io.FastQCFile(path='')
+
+        # WHEN records are collected from the lines
+        records = list(testfile._iter_records(testcontents))
+
+        # THEN there should be a field record for each key-value pair
+        # in the table, with numeric values converted
+        assert (records == [('status', 'basic_statistics', 'pass'),
+                            ('field', 'field1', 'value1'),
+                            ('field', 'field2', 1.0)])
+
+    def test_iter_records_overrepresented_seqs(self):
+        # GIVEN some file content with a non-passing 'Overrepresented
+        # sequences' section
+        testcontents = ['>>Overrepresented sequences\twarn\n',
+                        '#Sequence\tCount\tPercentage\tPossible Source\n',
+                        'ACGT\t10\t0.10\tNo Hit\n',
                         '>>END_MODULE\n']
 
-        # AND an io class object with the file contents stored in the
-        # raw field of its data attribute
+        # AND an io class object for an arbitrary file
         testfile = io.FastQCFile(path='')
-        testfile.data['raw'] = testcontents
 
-        # WHEN the table of key-value pairs within a section is parsed
-        section_data = testfile._parse_section_table((0, 3))
+        # WHEN records are collected from the lines
+        records = list(testfile._iter_records(testcontents))
 
-        # THEN should return a list of expected length, where each item
-        # is a tuple of field and value from the table
-        assert(section_data == [('field1', 'value1'),
-                                ('field2', 1.0)])
+        # THEN there should be a record for each sequence, with fields
+        # named by the cleaned table header
+        assert (records == [
+            ('status', 'overrepresented_sequences', 'warn'),
+            ('overrepresented_seq', {'sequence': 'ACGT', 'count': 10,
+                                     'percentage': 0.1,
+                                     'possible_source': 'No Hit'})
+        ])
 
     def test_parse(self, tmpdir):
         # GIVEN a file, where data is divided into sections, and at least
@@ -652,6 +829,84 @@ class TestFastQCFile:
         assert (table_data == [])
 
 
+    def test_parse_report(self, tmpdir):
+        # GIVEN a file, where data is divided into sections, including a
+        # table section and an 'Overrepresented sequences' section with
+        # a non-passing status
+        testcontents = [
+            '##FastQC\t0.11.3\n',
+            '>>Sequence Duplication Levels\twarn\n',
+            '#Total Deduplicated Percentage\t40.5\n',
+            '#Duplication Level\tPercentage of deduplicated\tPercentage of total\n',
+            '1\t80.0\t40.0\n',
+            '>>END_MODULE\n',
+            '>>Overrepresented sequences\twarn\n',
+            '#Sequence\tCount\tPercentage\tPossible Source\n',
+            'ACGT\t10\t0.10\tNo Hit\n',
+            '>>END_MODULE\n'
+        ]
+        testpath = mockstringfile(''.join(testcontents), tmpdir)
+
+        # AND an io class object is created for that file
+        testfile = io.FastQCFile(path=testpath)
+
+        # WHEN the report is parsed
+        report = testfile.parse_report()
+
+        # THEN the summary should include section status and table
+        # key-value pairs, and the overrepresented sequences should be
+        # parsed from the same read
+        assert (report['summary'] == {
+            'sequence_duplication_levels': 'warn',
+            'total_deduplicated_percentage': 40.5,
+            'overrepresented_sequences': 'warn'
+        })
+        assert (report['overrepresented_seqs'] == [
+            {'sequence': 'ACGT', 'count': 10, 'percentage': 0.1,
+             'possible_source': 'No Hit'}
+        ])
+
+
+    def test_parse_from_zip(self, tmpdir):
+        # GIVEN a FastQC zip archive, where the report file is stored in
+        # a subfolder along with other outputs
+        testcontents = ['##FastQC\t0.11.3\n',
+                        '>>Basic Statistics\tpass\n',
+                        'field1\tvalue1\n',
+                        '>>END_MODULE\n']
+        testpath = str(tmpdir.join('lib1111_C00000XX_fastqc_qc.zip'))
+        with zipfile.ZipFile(testpath, 'w') as zf:
+            zf.writestr('lib1111_fastqc/fastqc_report.html', '<html/>')
+            zf.writestr('lib1111_fastqc/fastqc_data.txt',
+                        ''.join(testcontents))
+
+        # AND an io class object is created for the archive
+        testfile = io.FastQCFile(path=testpath)
+
+        # WHEN the report is parsed
+        table_data = testfile.parse()
+
+        # THEN the report should be read from the archive, without
+        # extracting any files
+        assert (table_data == {'basic_statistics': 'pass',
+                               'field1': 'value1'})
+        assert (tmpdir.listdir() == [tmpdir.join(
+            'lib1111_C00000XX_fastqc_qc.zip'
+        )])
+
+    def test_parse_from_zip_without_report(self, tmpdir):
+        # GIVEN a zip archive that does not include a FastQC report
+        testpath = str(tmpdir.join('lib1111_C00000XX_fastqc_qc.zip'))
+        with zipfile.ZipFile(testpath, 'w') as zf:
+            zf.writestr('lib1111_fastqc/fastqc_report.html', '<html/>')
+
+        # AND an io class object is created for the archive
+        testfile = io.FastQCFile(path=testpath)
+
+        # WHEN the report is parsed, THEN an error should be raised
+        with pytest.raises(KeyError):
+            testfile.parse()
+
 class TestWorkflowFile:
     """
     Tests class for reading and parsing data from Galaxy or Globus
@@ -702,6 +957,87 @@ class TestWorkflowFile:
                 testdata['tools'][testtoolname] == testversion)
 
 
+def mock_workflow_ga(filename, tmpdir, version='1.0.0'):
+    mock_contents = ('{"name": "optimized_workflow_1",'
+                     '"steps":{"0":{"tool_id": "some_tool",'
+                     '"tool_version": "' + version + '"}}}')
+    mock_file = tmpdir.join(filename)
+    mock_file.write(mock_contents)
+    return str(mock_file)
+
+
+class TestWorkflowCache:
+    """
+    Tests the cache of workflow names and tool versions parsed from
+    Galaxy workflow files, in the ``bripipetools.io.workflowcache``
+    module.
+    """
+    def test_get_parses_file_once(self, tmpdir):
+        # GIVEN a workflow file and an empty cache
+        testpath = mock_workflow_ga('optimized_workflow_1.ga', tmpdir)
+        cache = io.WorkflowCache()
+
+        # WHEN the workflow data is retrieved several times
+        with mock.patch('bripipetools.io.workflowcache.WorkflowFile',
+                        wraps=io.WorkflowFile) as mock_parser:
+            testdata = [cache.get(testpath) for _ in range(3)]
+
+        # THEN the file should only be parsed once, and only the name
+        # and tool versions should be returned
+        assert (mock_parser.call_count == 1)
+        assert (testdata[-1] == {'name': 'optimized_workflow_1',
+                                 'tools': {'some_tool': '1.0.0'}})
+
+    def test_get_reparses_modified_file(self, tmpdir):
+        # GIVEN a workflow file already stored in the cache
+        testpath = mock_workflow_ga('optimized_workflow_1.ga', tmpdir)
+        cache = io.WorkflowCache()
+        cache.get(testpath)
+
+        # WHEN the file is modified
+        mock_workflow_ga('optimized_workflow_1.ga', tmpdir, version='2.0.0')
+        mtime = os.stat(testpath).st_mtime_ns
+        os.utime(testpath, ns=(mtime + 10**9, mtime + 10**9))
+
+        # THEN the updated tool versions should be returned
+        assert (cache.get(testpath)['tools'] == {'some_tool': '2.0.0'})
+
+    def test_load_index(self, tmpdir):
+        # GIVEN a folder of workflow files with a precomputed index
+        testpath = mock_workflow_ga('optimized_workflow_1.ga', tmpdir)
+        mock_workflow_ga('optimized_workflow_2.ga', tmpdir)
+        io.WorkflowCache().build_index(str(tmpdir))
+
+        # WHEN the index is loaded into a new cache
+        cache = io.WorkflowCache()
+        testcount = cache.load_index(str(tmpdir))
+
+        # THEN entries for all workflows should be loaded, and workflow
+        # data should be retrieved without parsing workflow files
+        assert (testcount == 2)
+        with mock.patch('bripipetools.io.workflowcache.WorkflowFile',
+                        wraps=io.WorkflowFile) as mock_parser:
+            testdata = cache.get(testpath)
+        assert not mock_parser.called
+        assert (testdata['tools'] == {'some_tool': '1.0.0'})
+
+        # AND the index should not be read again while unchanged
+        assert (cache.load_index(str(tmpdir)) == 0)
+
+    def test_load_index_skips_outdated_entries(self, tmpdir):
+        # GIVEN a workflow file modified after the index was built
+        testpath = mock_workflow_ga('optimized_workflow_1.ga', tmpdir)
+        io.WorkflowCache().build_index(str(tmpdir))
+        mtime = os.stat(testpath).st_mtime_ns
+        os.utime(testpath, ns=(mtime + 10**9, mtime + 10**9))
+
+        # WHEN the index is loaded into a new cache
+        cache = io.WorkflowCache()
+
+        # THEN the outdated entry should not be loaded
+        assert (cache.load_index(str(tmpdir)) == 0)
+
+
 class TestWorkflowBatchFile:
     """
     Tests class for reading and parsing data from Globus Galaxy
@@ -968,6 +1304,82 @@ class TestWorkflowBatchFile:
             ]
         })
 
+    def test_parse_submit_parses_header_once(self, tmpdir):
+        # GIVEN a batch submit file with many samples
+        testcontents = ['###METADATA\n',
+                        '#############\n',
+                        'Workflow Name\toptimized_workflow_1\n',
+                        'Project Name\tDATE_P00-00_FLOWCELL\n',
+                        '###TABLE DATA\n',
+                        '#############\n',
+                        'SampleName\tmock_in##_::_::_::param_name\n']
+        testcontents += ['sample{}\tin_value{}\n'.format(i, i)
+                         for i in range(100)]
+        testpath = mockstringfile(''.join(testcontents), tmpdir)
+
+        # WHEN the file is parsed
+        testfile = io.WorkflowBatchFile(path=testpath, state='submit')
+        with mock.patch('bripipetools.parsing.parse_workflow_param',
+                        wraps=parsing.parse_workflow_param) as mock_parse:
+            testdata = testfile.parse()
+
+        # THEN parameters are parsed from the header once, and each
+        # sample gets its own copy of the parameter dicts
+        assert (mock_parse.call_count == 2)
+        assert (len(testdata['samples']) == 100)
+        assert (testdata['samples'][99][1]['value'] == 'in_value99')
+        assert (testdata['samples'][0][1]['value'] == 'in_value0')
+        assert ('value' not in testdata['parameters'][1])
+
+    def test_iter_samples(self, tmpdir):
+        # GIVEN a batch submit file with a sample parameter table
+        testcontents = ['###METADATA\n',
+                        '#############\n',
+                        'Workflow Name\toptimized_workflow_1\n',
+                        'Project Name\tDATE_P00-00_FLOWCELL\n',
+                        '###TABLE DATA\n',
+                        '#############\n',
+                        'SampleName\tmock_in##_::_::_::param_name\n',
+                        'sample1\tin_value1\n',
+                        'sample2\tin_value2\n']
+        testpath = mockstringfile(''.join(testcontents), tmpdir)
+
+        # WHEN samples are iterated without parsing the full file
+        testfile = io.WorkflowBatchFile(path=testpath, state='submit')
+        testsamples = list(testfile.iter_samples())
+
+        # THEN one tuple of values is yielded per sample, and the
+        # sample lines are not stored
+        assert (testsamples == [('sample1', 'in_value1'),
+                                ('sample2', 'in_value2')])
+        assert ('raw' not in testfile.data)
+        assert (testfile.get_workflow_name() == 'optimized_workflow_1')
+
+    def test_iter_outputs(self, tmpdir):
+        # GIVEN a batch submit file with input and output parameters
+        testcontents = ['###METADATA\n',
+                        '#############\n',
+                        'Workflow Name\toptimized_workflow_1\n',
+                        'Project Name\tDATE_P00-00_FLOWCELL\n',
+                        '###TABLE DATA\n',
+                        '#############\n',
+                        ('SampleName'
+                         '\tfastq_in##Param::2942::globus_get_data_flowcell_text::from_path1'
+                         '\ttophat_alignments_bam_out##SourceType::SourceName::to_endpoint'
+                         '\ttophat_alignments_bam_out##SourceType::SourceName::to_path\n'),
+                        'sample1\tin_path1\tendpoint\tout_path1\n',
+                        'sample2\tin_path2\tendpoint\tout_path2\n']
+        testpath = mockstringfile(''.join(testcontents), tmpdir)
+
+        # WHEN outputs are iterated for each sample
+        testfile = io.WorkflowBatchFile(path=testpath, state='submit')
+        testoutputs = list(testfile.iter_outputs())
+
+        # THEN only the sample name and output paths are yielded
+        assert (testoutputs
+                == [('sample1', {'tophat_alignments_bam_out': 'out_path1'}),
+                    ('sample2', {'tophat_alignments_bam_out': 'out_path2'})])
+
     def test_write(self, tmpdir):
         # GIVEN a file containing a typically formatted metadata table,
         # with each row containing field and value (separated by tab)
@@ -998,3 +1410,28 @@ class TestWorkflowBatchFile:
         # THEN contents of the new file should match expected results
         assert (outfile.readlines() == testcontents)
 
+    def test_write_removes_tmp_file_on_error(self, tmpdir):
+        # GIVEN a file containing a typically formatted workflow batch,
+        # and an io class object created for that file with 'state'
+        # option set to 'submit'
+        testcontents = ['###METADATA\n',
+                        '#############\n',
+                        'Workflow Name\toptimized_workflow_1\n',
+                        'Project Name\tDATE_P00-00_FLOWCELL\n',
+                        '###TABLE DATA\n',
+                        '#############\n',
+                        'SampleName\tmock_in##_::_::_::param_name\n',
+                        'sample1\tin_value1\n']
+        testpath = mockstringfile(''.join(testcontents), tmpdir)
+        testfile = io.WorkflowBatchFile(path=testpath, state='submit')
+        outdir = tmpdir.mkdir('globus_batch_submission')
+
+        # WHEN writing the new file fails
+        with pytest.raises(TypeError):
+            testfile.write(str(outdir.join('newfile.txt')),
+                           sample_lines=[None])
+
+        # THEN no file (temporary or otherwise) should be left in the
+        # target folder
+        assert (outdir.listdir() == [])
+
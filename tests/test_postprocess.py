@@ -1,11 +1,14 @@
 import logging
 import os
+import gzip
 import shutil
+import zipfile
 
 import pytest
 import pandas as pd
 
 from bripipetools import postprocessing
+from bripipetools.postprocessing import formats
 from bripipetools import io
 
 logging.basicConfig(level=logging.DEBUG)
@@ -300,6 +303,196 @@ class TestOutputStitcher:
         with open(testtablefile) as f:
             assert (f.readlines() == mock_contents)
 
+    def test_write_qc_tables_read_each_file_once(self, tmpdir, monkeypatch):
+        # GIVEN a path to a folder with output data of type 'QC',
+        # which exists in a processed project folder at the path
+        # '<root>/genomics/Illumina/<run-id>/<project-folder>'
+        mock_run = '161231_INSTID_0001_AC00000XX'
+        mock_project = 'Project_P00-00Processed_161231'
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                    .mkdir(mock_run)
+                    .mkdir(mock_project)
+                    .mkdir('QC'))
+
+        # AND the folder contains FastQC outputs for multiple samples,
+        # each with overrepresented sequences
+        mock_contents = ['>>Basic Statistics\tpass\n',
+                         'Total Sequences\t100\n',
+                         '>>END_MODULE\n',
+                         '>>Overrepresented sequences\twarn\n',
+                         '#Sequence\tCount\tPercentage\tPossible Source\n',
+                         'ACGT\t10\t0.10\tNo Hit\n',
+                         '>>END_MODULE\n']
+        for lib in ['lib1111_C00000XX', 'lib2222_C00000XX']:
+            mock_file = mock_path.ensure('{}_fastqc_qc.txt'.format(lib))
+            mock_file.write(''.join(mock_contents))
+
+        # AND file reads by the FastQC parser are counted
+        read_paths = []
+        read_lines = io.FastQCFile._read_lines
+
+        def mock_read_lines(self):
+            read_paths.append(self.path)
+            return read_lines(self)
+        monkeypatch.setattr(io.FastQCFile, '_read_lines', mock_read_lines)
+
+        # AND a stitcher object is created for the folder path
+        stitcher = postprocessing.OutputStitcher(
+            path=str(mock_path)
+        )
+
+        # WHEN both the overrepresented sequences table and the combined
+        # QC table are written
+        stitcher.write_overrepresented_seq_table()
+        testtablefile = stitcher.write_table()
+
+        # THEN both tables should be written, and each FastQC file should
+        # have been read only once
+        assert (os.path.exists(testtablefile))
+        assert (len(pd.read_csv(mock_path.join(
+            'P00-00_C00000XX_161231_combined_overrep_seqs.csv'
+        ))) == 2)
+        assert (sorted(read_paths) == sorted(set(read_paths)))
+        assert (len(read_paths) == 2)
+
+    def test_get_outputs_for_zipped_qc_data(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'QC',
+        # which exists in a processed project folder
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('QC'))
+
+        # AND the folder contains FastQC outputs as extracted reports,
+        # zip archives (some of which were already extracted), and zip
+        # archives nested in sample subfolders
+        mock_path.ensure('lib1111_C00000XX_fastqc_qc.txt')
+        mock_path.ensure('lib1111_C00000XX_fastqc_qc.zip')
+        mock_path.ensure('lib2222_C00000XX_fastqc_qc.zip')
+        mock_path.mkdir('lib3333_C00000XX').ensure('qc0.zip')
+
+        # AND a stitcher object is created for the folder path
+        stitcher = postprocessing.OutputStitcher(
+            path=str(mock_path)
+        )
+
+        # WHEN outputs are collected for QC data
+        test_outputs = stitcher._get_outputs('qc')
+
+        # THEN each sample should have one output, preferring extracted
+        # reports over archives
+        assert (sorted(test_outputs) == [
+            str(mock_path.join('lib1111_C00000XX_fastqc_qc.txt')),
+            str(mock_path.join('lib2222_C00000XX_fastqc_qc.zip')),
+            str(mock_path.join('lib3333_C00000XX', 'qc0.zip')),
+        ])
+
+        # AND nested archives should be labeled by sample subfolder
+        assert (os.path.basename(stitcher._get_output_name(
+            str(mock_path.join('lib3333_C00000XX', 'qc0.zip'))
+        )) == 'lib3333_C00000XX_fastqc_qc.zip')
+
+    def test_write_qc_tables(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'QC',
+        # which exists in a processed project folder at the path
+        # '<root>/genomics/Illumina/<run-id>/<project-folder>'
+        mock_run = '161231_INSTID_0001_AC00000XX'
+        mock_project = 'Project_P00-00Processed_161231'
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                    .mkdir(mock_run)
+                    .mkdir(mock_project)
+                    .mkdir('QC'))
+
+        # AND the folder contains FastQC outputs for multiple samples,
+        # only one of which has overrepresented sequences
+        mock_overrep = ['>>Overrepresented sequences\twarn\n',
+                        '#Sequence\tCount\tPercentage\tPossible Source\n',
+                        'ACGT\t10\t0.10\tNo Hit\n',
+                        'TTTT\t5\t0.05\tNo Hit\n',
+                        '>>END_MODULE\n']
+        mock_pass = ['>>Overrepresented sequences\tpass\n',
+                     '>>END_MODULE\n']
+        for lib, contents in [('lib1111_C00000XX', mock_overrep),
+                              ('lib2222_C00000XX', mock_pass)]:
+            mock_file = mock_path.ensure('{}_fastqc_qc.txt'.format(lib))
+            mock_file.write(''.join(contents))
+
+        # AND a stitcher object is created for the folder path
+        stitcher = postprocessing.OutputStitcher(
+            path=str(mock_path)
+        )
+
+        # WHEN the combined QC tables are written
+        test_qc_path, test_overrep_path = stitcher.write_qc_tables()
+
+        # THEN the combined QC table should include a row for each sample
+        # and the overrepresented sequences table should include a row
+        # for each sequence, labeled by sample
+        assert (len(pd.read_csv(test_qc_path)) == 2)
+        test_overrep = pd.read_csv(test_overrep_path)
+        assert (list(test_overrep['libId'])
+                == ['lib1111_C00000XX', 'lib1111_C00000XX'])
+        assert (list(test_overrep['sequence']) == ['ACGT', 'TTTT'])
+
+    def test_write_qc_tables_from_zip(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'QC',
+        # which exists in a processed project folder
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('QC'))
+
+        # AND FastQC outputs for each sample are only available as zip
+        # archives nested in sample subfolders
+        for lib in ['lib1111_C00000XX', 'lib2222_C00000XX']:
+            with zipfile.ZipFile(str(mock_path.mkdir(lib).join('qc.zip')),
+                                 'w') as zf:
+                zf.writestr('qc/fastqc_data.txt',
+                            '>>Basic Statistics\tpass\n>>END_MODULE\n')
+
+        # WHEN the combined QC tables are written, without cleaning
+        # outputs first
+        test_qc_path, _ = postprocessing.OutputStitcher(
+            path=str(mock_path)
+        ).write_qc_tables()
+
+        # THEN the combined QC table should include a row for each
+        # sample, parsed straight from the archives
+        test_qc = pd.read_csv(test_qc_path)
+        assert (list(test_qc['libId'])
+                == ['lib1111_C00000XX', 'lib2222_C00000XX'])
+        assert (list(test_qc['basic_statistics']) == ['pass', 'pass'])
+
+    def test_write_table_for_compressed_data(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'counts',
+        # which exists in a processed project folder
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('counts'))
+
+        # AND the folder contains gzip-compressed outputs for one sample
+        # and uncompressed outputs for another
+        with gzip.open(str(mock_path.join(
+                'lib1111_C00000XX_htseq_counts.txt.gz')), 'wt') as f:
+            f.write('field1\t0\nfield2\t1\n')
+        mock_path.ensure('lib2222_C00000XX_htseq_counts.txt') \
+            .write('field1\t1\nfield2\t0\n')
+
+        # WHEN combined data across all samples is written as a table
+        testtablefile = postprocessing.OutputStitcher(
+            path=str(mock_path)
+        ).write_table()
+
+        # THEN the table should include data from both samples, labeled
+        # without the compression extension
+        with open(testtablefile) as f:
+            assert (f.readlines() == [
+                'geneName,lib1111_C00000XX,lib2222_C00000XX\n',
+                'field1,0,1\n',
+                'field2,1,0\n',
+            ])
+
     def test_write_table_for_count_data(self, tmpdir):
         # GIVEN a path to a folder with output data of type 'counts',
         # which exists in a processed project folder at the path
@@ -349,6 +542,264 @@ class TestOutputStitcher:
             assert (f.readlines() == mock_contents)
 
 
+    def test_write_table_incremental_for_noncount_data(self, tmpdir,
+                                                       monkeypatch):
+        # GIVEN a path to a folder with output data of type 'metrics',
+        # which exists in a processed project folder
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('metrics'))
+
+        # AND the folder contains outputs for multiple samples, which
+        # have already been combined into a table
+        for lib, value in [('lib1111', '1'), ('lib2222', '2'),
+                           ('lib3333', '3')]:
+            mock_path.ensure('{}_C00000XX_htseq_metrics.txt'.format(lib)) \
+                .write('__field_1\t{}\n'.format(value))
+        postprocessing.OutputStitcher(path=str(mock_path),
+                                      incremental=True).write_table()
+
+        # AND outputs were since changed for one sample, removed for
+        # another, and added for a new sample
+        mock_path.join('lib2222_C00000XX_htseq_metrics.txt') \
+            .write('__field_1\t22\n')
+        mock_path.join('lib3333_C00000XX_htseq_metrics.txt').remove()
+        mock_path.ensure('lib4444_C00000XX_htseq_metrics.txt') \
+            .write('__field_1\t4\n')
+
+        # AND a new stitcher object is created for the folder path
+        stitcher = postprocessing.OutputStitcher(path=str(mock_path),
+                                                 incremental=True)
+        parsed_paths = []
+        read_data = stitcher._read_data
+
+        def mock_read_data(outputs=None):
+            parsed_paths.extend(os.path.basename(o) for o in outputs)
+            read_data(outputs)
+
+        monkeypatch.setattr(stitcher, '_read_data', mock_read_data)
+
+        # WHEN combined data is written as a table again
+        testtablefile = stitcher.write_table()
+
+        # THEN only the new and changed outputs should be parsed
+        assert (sorted(parsed_paths) ==
+                ['lib2222_C00000XX_htseq_metrics.txt',
+                 'lib4444_C00000XX_htseq_metrics.txt'])
+
+        # AND the table should include updated rows, without rows for
+        # removed outputs
+        with open(testtablefile) as f:
+            assert (f.readlines() == ['libId,field_1\n',
+                                      'lib1111_C00000XX,1\n',
+                                      'lib2222_C00000XX,22\n',
+                                      'lib4444_C00000XX,4\n'])
+
+    def test_write_table_incremental_matches_rebuild(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'metrics',
+        # which exists in a processed project folder
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('metrics'))
+
+        # AND the folder contains outputs for multiple samples, which
+        # have already been combined into a table in incremental mode
+        for lib in ['lib12', 'lib2']:
+            mock_path.ensure('{}_C00000XX_htseq_metrics.txt'.format(lib)) \
+                .write('__field_1\t1\n')
+        postprocessing.OutputStitcher(path=str(mock_path),
+                                      incremental=True).write_table()
+
+        # AND outputs were since added for a new sample, with a field
+        # not found for other samples
+        mock_path.ensure('lib1_C00000XX_htseq_metrics.txt') \
+            .write('__field_0\t0\n__field_1\t1\n')
+
+        # WHEN combined data is written as a table again, both
+        # incrementally and from all outputs
+        with open(postprocessing.OutputStitcher(
+                path=str(mock_path), incremental=True
+        ).write_table()) as f:
+            test_contents = f.readlines()
+        with open(postprocessing.OutputStitcher(
+                path=str(mock_path)
+        ).write_table()) as f:
+            mock_contents = f.readlines()
+
+        # THEN the merged table should match the rebuilt table
+        assert (test_contents == mock_contents)
+
+    def test_write_table_without_manifest_by_default(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'counts',
+        # which exists in a processed project folder
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('counts'))
+        mock_path.ensure('lib1111_C00000XX_htseq_counts.txt') \
+            .write('field1\t0\n')
+
+        # WHEN combined data is written as a table, without selecting
+        # incremental mode
+        postprocessing.OutputStitcher(path=str(mock_path)).write_table()
+
+        # THEN no manifest file should be written
+        assert (not any(f.endswith('.manifest.json')
+                        for f in os.listdir(str(mock_path))))
+
+    def test_write_table_incremental_for_count_data(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'counts',
+        # which exists in a processed project folder
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('counts'))
+
+        # AND the folder contains outputs for multiple samples, which
+        # have already been combined into a table
+        for lib in ['lib1111', 'lib2222']:
+            mock_path.ensure('{}_C00000XX_htseq_counts.txt'.format(lib)) \
+                .write('field1\t0\nfield2\t1\n')
+        postprocessing.OutputStitcher(path=str(mock_path),
+                                      incremental=True).write_table()
+
+        # AND outputs were since added for a new sample
+        mock_path.ensure('lib0000_C00000XX_htseq_counts.txt') \
+            .write('field1\t5\nfield2\t6\n')
+
+        # WHEN combined data is written as a table again
+        testtablefile = postprocessing.OutputStitcher(
+            path=str(mock_path), incremental=True
+        ).write_table()
+
+        # THEN the table should include a column for the new sample,
+        # with sample columns in sorted order
+        with open(testtablefile) as f:
+            assert (f.readlines() == [
+                'geneName,lib0000_C00000XX,lib1111_C00000XX,'
+                'lib2222_C00000XX\n',
+                'field1,5,0,0\n',
+                'field2,6,1,1\n',
+            ])
+
+    def test_write_table_keeps_special_counters(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'counts',
+        # including htseq-count special counters
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('counts'))
+        mock_path.ensure('lib1111_C00000XX_htseq_counts.txt') \
+            .write('field1\t0\n__no_feature\t2\n')
+
+        # WHEN combined data is written as a table
+        testtablefile = postprocessing.OutputStitcher(
+            path=str(mock_path)
+        ).write_table()
+
+        # THEN the table should include rows for the special counters
+        with open(testtablefile) as f:
+            assert (f.readlines() == ['geneName,lib1111_C00000XX\n',
+                                      'field1,0\n',
+                                      '__no_feature,2\n'])
+
+    def test_write_qc_tables_after_write_table(self, tmpdir):
+        # GIVEN a path to a folder with FastQC outputs, for which only
+        # the combined QC table has been written
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('QC'))
+        mock_path.ensure('lib1111_C00000XX_fastqc_qc.txt').write(
+            '>>Overrepresented sequences\twarn\n'
+            '#Sequence\tCount\tPercentage\tPossible Source\n'
+            'ACGT\t10\t0.10\tNo Hit\n'
+            '>>END_MODULE\n'
+        )
+        postprocessing.OutputStitcher(path=str(mock_path),
+                                      incremental=True).write_table()
+
+        # WHEN the combined QC tables are written
+        _, test_overrep_path = postprocessing.OutputStitcher(
+            path=str(mock_path), incremental=True
+        ).write_qc_tables()
+
+        # THEN the overrepresented sequences table should be built from
+        # all outputs
+        test_overrep = pd.read_csv(test_overrep_path)
+        assert (list(test_overrep['sequence']) == ['ACGT'])
+
+    def test_write_qc_tables_incremental(self, tmpdir):
+        # GIVEN a path to a folder with FastQC outputs for multiple
+        # samples, which have already been combined into QC tables
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('QC'))
+
+        def mock_report(seqs):
+            return ''.join(['>>Overrepresented sequences\twarn\n',
+                            '#Sequence\tCount\tPercentage\t'
+                            'Possible Source\n']
+                           + ['{}\t10\t0.10\tNo Hit\n'.format(seq)
+                              for seq in seqs]
+                           + ['>>END_MODULE\n'])
+
+        for lib, seqs in [('lib1111', ['TTTT', 'ACGT']),
+                          ('lib2222', ['GGGG'])]:
+            mock_path.ensure('{}_C00000XX_fastqc_qc.txt'.format(lib)) \
+                .write(mock_report(seqs))
+        postprocessing.OutputStitcher(path=str(mock_path),
+                                      incremental=True).write_qc_tables()
+
+        # AND outputs were since changed for one sample, and only the
+        # combined QC table was updated
+        mock_path.join('lib1111_C00000XX_fastqc_qc.txt') \
+            .write(mock_report(['CCCC', 'AAAA']))
+        postprocessing.OutputStitcher(path=str(mock_path),
+                                      incremental=True).write_table()
+
+        # WHEN the combined QC tables are written again
+        _, test_overrep_path = postprocessing.OutputStitcher(
+            path=str(mock_path), incremental=True
+        ).write_qc_tables()
+
+        # THEN the overrepresented sequences table should include the
+        # changed rows, sorted by sample and in report order within
+        # each sample
+        test_overrep = pd.read_csv(test_overrep_path)
+        assert (list(test_overrep['libId'])
+                == ['lib1111_C00000XX', 'lib1111_C00000XX',
+                    'lib2222_C00000XX'])
+        assert (list(test_overrep['sequence']) == ['CCCC', 'AAAA', 'GGGG'])
+
+    def test_write_table_unchanged(self, tmpdir, monkeypatch):
+        # GIVEN a path to a folder with output data of type 'counts',
+        # which have already been combined into a table
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('counts'))
+        mock_path.ensure('lib1111_C00000XX_htseq_counts.txt') \
+            .write('field1\t0\n')
+        mock_tablefile = postprocessing.OutputStitcher(
+            path=str(mock_path), incremental=True
+        ).write_table()
+
+        # AND no outputs have changed since the table was written
+        stitcher = postprocessing.OutputStitcher(path=str(mock_path),
+                                                 incremental=True)
+        monkeypatch.setattr(stitcher, '_read_data', None)
+
+        # WHEN combined data is written as a table again
+        testtablefile = stitcher.write_table()
+
+        # THEN no outputs should be parsed, and the path to the existing
+        # table should be returned
+        assert (testtablefile == mock_tablefile)
+
 class TestOutputCompiler:
     """
     Tests methods for the `OutputCompiler` class in the
@@ -394,22 +845,19 @@ class TestOutputCompiler:
         # stored in the object's 'data' attribute
         compiler._read_data()
 
-        # THEN the resulting list stored in the object's 'data' attribute
-        # should include a list for each combined table, with each item
-        # representing a row in a table as a list of column values
-        mock_data = [
-            [
-                ['libId', 'type1_field1', 'type1_field2'],
-                ['sample1','type1_sample1_value1', 'type1_sample1_value2'],
-                ['sample2', 'type1_sample2_value1', 'type1_sample2_value2'],
-            ],
-            [
-                ['libId', 'type2_field1', 'type2_field2'],
-                ['sample1', 'type2_sample1_value1', 'type2_sample1_value2'],
-                ['sample2', 'type2_sample2_value1', 'type2_sample2_value2'],
-            ],
-        ]
+        # THEN the object's 'headers' attribute should include the fields
+        # of each combined table, and its 'data' attribute should map
+        # each sample ID to a list of column values from each table
+        assert (compiler.headers == [['type1_field1', 'type1_field2'],
+                                     ['type2_field1', 'type2_field2']])
+        mock_data = {
+            'sample1': [['type1_sample1_value1', 'type1_sample1_value2'],
+                        ['type2_sample1_value1', 'type2_sample1_value2']],
+            'sample2': [['type1_sample2_value1', 'type1_sample2_value2'],
+                        ['type2_sample2_value1', 'type2_sample2_value2']],
+        }
         assert (compiler.data == mock_data)
+        assert (compiler.missing == {})
 
     def test_build_table(self):
         # GIVEN a compiler object, created for an arbitrary list of paths
@@ -417,21 +865,16 @@ class TestOutputCompiler:
             paths=[]
         )
 
-        # AND parsed data from combined output table files are stroed in the
-        # object's 'data' attribute
-        mock_data = [
-            [
-                ['libId', 'type1_field1', 'type1_field2'],
-                ['sample1','type1_sample1_value1', 'type1_sample1_value2'],
-                ['sample2', 'type1_sample2_value1', 'type1_sample2_value2'],
-            ],
-            [
-                ['libId', 'type2_field1', 'type2_field2'],
-                ['sample1', 'type2_sample1_value1', 'type2_sample1_value2'],
-                ['sample2', 'type2_sample2_value1', 'type2_sample2_value2'],
-            ],
-        ]
-        compiler.data = mock_data
+        # AND parsed data from combined output table files are stored in the
+        # object's 'headers' and 'data' attributes
+        compiler.headers = [['type1_field1', 'type1_field2'],
+                            ['type2_field1', 'type2_field2']]
+        compiler.data = {
+            'sample2': [['type1_sample2_value1', 'type1_sample2_value2'],
+                        ['type2_sample2_value1', 'type2_sample2_value2']],
+            'sample1': [['type1_sample1_value1', 'type1_sample1_value2'],
+                        ['type2_sample1_value1', 'type2_sample1_value2']],
+        }
 
         # WHEN combined data from each type are merged into a list
         # representing representing rows for an overall project summary table
@@ -449,6 +892,31 @@ class TestOutputCompiler:
         ]
         assert (testdata == mock_tabledata)
 
+    def test_build_table_with_missing_sample(self):
+        # GIVEN a compiler object, created for an arbitrary list of paths
+        compiler = postprocessing.OutputCompiler(
+            paths=[]
+        )
+
+        # AND parsed data from combined output table files, where one
+        # sample is missing from the second table
+        compiler.headers = [['type1_field1'], ['type2_field1']]
+        compiler.data = {
+            'sample1': [['type1_sample1_value1'], ['type2_sample1_value1']],
+            'sample2': [['type1_sample2_value1'], None],
+        }
+
+        # WHEN combined data from each type are merged into a list
+        testdata = compiler._build_table()
+
+        # THEN the missing sample's values for the second type should
+        # be empty, and other values should stay aligned with their sample
+        assert (testdata == [
+            ['libId', 'type1_field1', 'type2_field1'],
+            ['sample1', 'type1_sample1_value1', 'type2_sample1_value1'],
+            ['sample2', 'type1_sample2_value1', ''],
+        ])
+
     def test_build_combined_filename(self):
         # GIVEN a list one or more paths to 'combined' table files for
         # arbitrary output types
@@ -529,6 +997,172 @@ class TestOutputCompiler:
             assert (f.readlines() == mock_contents)
 
 
+class TestOutputReader:
+    """
+    Tests methods for the `OutputReader` class in the
+    `bripipetools.postprocessing.reading` module.
+    """
+    def test_read_data_for_count_data(self, tmpdir):
+        # GIVEN a path to a folder with output data of type 'counts',
+        # including special counters reported by htseq-count
+        mock_path = (tmpdir.mkdir('genomics').mkdir('Illumina')
+                     .mkdir('161231_INSTID_0001_AC00000XX')
+                     .mkdir('Project_P00-00Processed_161231')
+                     .mkdir('counts'))
+        mock_path.ensure('lib1111_C00000XX_htseq_counts.txt').write(
+            'field1\t0\nfield2\t1\n__no_feature\t2\n__ambiguous\t3\n'
+        )
+
+        # WHEN counts are read for the library
+        test_data = postprocessing.OutputReader(
+            path=str(mock_path)
+        ).read_data('lib1111')
+
+        # THEN gene counts and special counters should be returned
+        # together, as stored in the database
+        assert (test_data == {'field1': 0, 'field2': 1,
+                              '__no_feature': 2, '__ambiguous': 3})
+
+
+class TestTableFormats:
+    """
+    Tests writing combined tables in CSV and columnar formats with
+    functions in the ``bripipetools.postprocessing.formats`` module.
+    """
+    @pytest.mark.parametrize(
+        'test_input, expected_result',
+        [
+            (('csv', False), 'csv'),
+            (('parquet', False), 'parquet'),
+            (('hdf5', True), 'hdf5'),
+            (('hdf5', False), 'csv'),
+        ]
+    )
+    def test_get_table_format(self, test_input, expected_result):
+        # WHEN the format is selected for a table, given the requested
+        # format and whether the table holds counts
+        test_format = formats.get_table_format(*test_input)
+
+        # THEN HDF5 should only be used for counts tables
+        assert (test_format == expected_result)
+
+    def test_get_table_format_unsupported(self):
+        # WHEN an unsupported format is requested, THEN an error
+        # should be raised
+        with pytest.raises(ValueError):
+            formats.get_table_format('xlsx')
+
+    def test_get_table_path(self):
+        # WHEN the path for a combined table is built for a format
+        test_path = formats.get_table_path(
+            '/tmp/P1-1_C00000XX_161231_combined_counts.csv', 'parquet'
+        )
+
+        # THEN the extension should match the format
+        assert (test_path == '/tmp/P1-1_C00000XX_161231_combined_counts.parquet')
+
+    def test_convert_dtypes(self):
+        # GIVEN a table with values stored as strings, including an
+        # empty value for a missing sample
+        mock_table = pd.DataFrame(
+            [['lib1111', '10', '0.5'], ['lib2222', '20', '']],
+            columns=['libId', 'reads', 'pct']
+        )
+
+        # WHEN columns are converted to typed values
+        test_table = formats.convert_dtypes(mock_table)
+
+        # THEN numeric columns should be numbers, with empty values
+        # stored as missing, and other columns unchanged
+        assert (list(test_table['reads']) == [10, 20])
+        assert (test_table['pct'][0] == 0.5)
+        assert (pd.isnull(test_table['pct'][1]))
+        assert (list(test_table['libId']) == ['lib1111', 'lib2222'])
+
+    def test_convert_dtypes_for_counts(self):
+        # GIVEN a counts table with float values
+        mock_table = pd.DataFrame(
+            {'geneName': ['gene1', 'gene2'], 'lib1111': [1.0, 2.0]}
+        )
+
+        # WHEN columns are converted to typed values for counts
+        test_table = formats.convert_dtypes(mock_table, counts=True)
+
+        # THEN count columns should be stored as integers
+        assert (test_table['lib1111'].dtype == 'int64')
+
+    def test_write_table_data_csv(self, tmpdir):
+        # GIVEN table data stored as a list of rows
+        mock_data = [['libId', 'field1'], ['lib1111', '1']]
+
+        # WHEN the table is written in CSV format
+        test_path = formats.write_table_data(
+            mock_data, str(tmpdir.join('combined_metrics.csv')), 'csv'
+        )
+
+        # THEN the file should contain the rows as comma-separated lines
+        assert (open(test_path).read() == 'libId,field1\nlib1111,1\n')
+
+    def test_write_table_data_parquet(self, tmpdir):
+        pytest.importorskip('pyarrow')
+        # GIVEN counts table data stored in a data frame
+        mock_data = pd.DataFrame(
+            {'geneName': ['gene1', 'gene2'], 'lib1111': [1, 2]}
+        )
+
+        # WHEN the table is written in Parquet format
+        test_path = formats.write_table_data(
+            mock_data, str(tmpdir.join('combined_counts.csv')), 'parquet',
+            counts=True
+        )
+
+        # THEN the file should have a Parquet extension, and the data
+        # read back should have integer counts
+        assert (test_path.endswith('.parquet'))
+        test_data = pd.read_parquet(test_path)
+        assert (test_data['lib1111'].dtype == 'int64')
+        assert (list(test_data['geneName']) == ['gene1', 'gene2'])
+
+    def test_compile_parquet_tables(self, tmpdir):
+        pytest.importorskip('pyarrow')
+        # GIVEN combined metrics and QC tables written in Parquet format
+        # in separate folders of a project
+        mock_paths = []
+        for output_type in ['metrics', 'qc']:
+            mock_paths.append(formats.write_table_data(
+                [['libId', '{}_field'.format(output_type)],
+                 ['lib1111', '1'], ['lib2222', '2']],
+                str(tmpdir.mkdir(output_type)
+                    .join('P1-1_combined_{}.csv'.format(output_type))),
+                'parquet'
+            ))
+
+        # WHEN the tables are compiled in Parquet format
+        test_path = postprocessing.OutputCompiler(
+            mock_paths, table_format='parquet'
+        ).write_table()
+
+        # THEN the compiled table should include typed columns from
+        # both tables
+        test_data = pd.read_parquet(test_path)
+        assert (list(test_data.columns) ==
+                ['libId', 'metrics_field', 'qc_field'])
+        assert (list(test_data['qc_field']) == [1, 2])
+
+    def test_write_table_data_missing_dependency(self, tmpdir, monkeypatch):
+        # GIVEN the package required for a format is not installed
+        monkeypatch.setitem(formats.FORMAT_DEPENDENCIES, 'parquet',
+                            'not_a_real_package')
+
+        # WHEN the table is written in that format, THEN an import
+        # error should be raised
+        with pytest.raises(ImportError):
+            formats.write_table_data(
+                [['libId'], ['lib1111']],
+                str(tmpdir.join('combined_metrics.csv')), 'parquet'
+            )
+
+
 class TestOutputCleaner:
     """
     Tests methods for the `OutputCleaner` class in the
@@ -578,105 +1212,114 @@ class TestOutputCleaner:
         # THEN list of paths should match expected results
         assert (set(test_paths) == set(mock_paths))
 
-    def test_unzip_output(self, tmpdir):
+    def test_plan_output_zip(self, tmpdir):
         # GIVEN a path to a folder with output data, and a subfolder
         # corresponding to a particular output type
-        mock_path = tmpdir.mkdir('metrics')
-
-        # AND the folder contains a zipped archive with one or more
-        # output files
-        mock_zipdir = mock_path.mkdir('zipfolder')
-        mock_zipdir.ensure('outfile1')
-        mock_zippath = shutil.make_archive(str(mock_zipdir), 'zip',
-                                           str(mock_zipdir))
-        shutil.rmtree(str(mock_zipdir))
+        mock_path = tmpdir.mkdir('QC')
+
+        # AND the folder contains another subfolder with a zipped
+        # archive, which includes the report file and other files
+        mock_zippath = mock_path.mkdir('lib1111_C00000XX').join('qc.zip')
+        with zipfile.ZipFile(str(mock_zippath), 'w') as zf:
+            zf.writestr('qc/fastqc_data.txt', 'data')
+            zf.writestr('qc/fastqc_report.html', '<html/>')
 
         # AND a cleaner object is created for the path
         outputcleaner = postprocessing.OutputCleaner(
             path=str(tmpdir)
         )
 
-        # WHEN the zipped archive is uncompressed
-        test_paths = outputcleaner._unzip_output(mock_zippath)
+        # WHEN changes are planned for the zipped archive
+        test_changes = outputcleaner._plan_output(str(mock_zippath), 'QC')
 
-        # THEN the individual output files previously stored in the
-        # zipped archive should now exist in the output type subfolder
-        assert ('outfile1' in
-                [os.path.basename(str(f)) for f in mock_path.listdir()])
-        assert (str(mock_path.join('outfile1')) in test_paths)
+        # THEN only the report file should be extracted, unnested, and
+        # renamed directly under the output type folder
+        assert (test_changes == [
+            {'action': 'extract', 'source': str(mock_zippath),
+             'member': 'qc/fastqc_data.txt',
+             'destination': str(mock_path.join(
+                 'lib1111_C00000XX_fastqc_qc.txt'))}
+        ])
 
-    def test_unnest_output_file(self, tmpdir):
+    def test_plan_output_nested_file(self, tmpdir):
         # GIVEN a path to a folder with output data, and a subfolder
         # corresponding to a particular output type
-        mock_path = tmpdir.mkdir('metrics')
+        mock_path = tmpdir.mkdir('QC')
 
-        # AND the folder contains another subfolder with one or more
-        # output files
-        mock_subdir = mock_path.mkdir('subfolder')
-        mock_nestpath = mock_subdir.ensure('outfile1')
+        # AND the folder contains another subfolder with an output file
+        mock_nestpath = mock_path.mkdir('subfolder').ensure('outfile1')
 
         # AND a cleaner object is created for the path
         outputcleaner = postprocessing.OutputCleaner(
             path=str(tmpdir)
         )
 
-        # WHEN output files in the subfolder are unnested
-        outputcleaner._unnest_output(str(mock_nestpath))
+        # WHEN changes are planned for the output file
+        test_changes = outputcleaner._plan_output(str(mock_nestpath), 'QC')
 
-        # THEN the files should exist directly under the output type
+        # THEN the file should be moved directly under the output type
         # folder and be labeled in the form '<subfolder>_<filename>'
-        assert ('subfolder_outfile1' in
-                [os.path.basename(str(f)) for f in mock_path.listdir()])
+        assert (test_changes == [
+            {'action': 'move', 'source': str(mock_nestpath),
+             'member': None,
+             'destination': str(mock_path.join('subfolder_outfile1'))}
+        ])
 
-    def test_unnest_output_zip(self, tmpdir):
+    def test_plan_output_recode(self, tmpdir):
         # GIVEN a path to a folder with output data, and a subfolder
-        # corresponding to a particular output type
-        mock_path = tmpdir.mkdir('metrics')
-
-        # AND the folder contains another subfolder with one or more
-        # zipped archives than in turn contain one or more output files
-        mock_subdir = mock_path.mkdir('subfolder')
-        mock_zipdir = mock_subdir.mkdir('zipfolder')
-        mock_zipdir.ensure('outfile1')
-
-        mock_zippath = shutil.make_archive(str(mock_zipdir), 'zip',
-                                           str(mock_zipdir))
-        shutil.rmtree(str(mock_zipdir))
+        # corresponding to a particular output type, which contains
+        # an output file
+        mock_path = tmpdir.mkdir('QC')
+        mock_qcpath = mock_path.ensure('libID_fcID_fastqc_data.txt')
+        mock_donepath = mock_path.ensure('libID2_fcID_fastqc_qc.txt')
 
         # AND a cleaner object is created for the path
         outputcleaner = postprocessing.OutputCleaner(
-            path=str(tmpdir)
-        )
+            path=str(tmpdir))
 
-        # WHEN zipped output files in the subfolder are unnested
-        outputcleaner._unnest_output(mock_zippath)
+        # WHEN changes are planned for the output files
 
-        # THEN the zipped archives should first be flattened such that
-        # individual output files exist directly under the subfolder,
-        # and these files should then be unnested and exist directly
-        # under the output type folder (labeled as '<subfolder>_<filename>'
-        logger.debug(''.format(mock_path.listdir()))
-        assert ('subfolder_outfile1' in
-                [os.path.basename(str(f)) for f in mock_path.listdir()])
+        # THEN the file should be renamed according to some predefined
+        # rule, and files already named as expected left unchanged
+        assert (outputcleaner._plan_output(str(mock_qcpath), 'QC') == [
+            {'action': 'move', 'source': str(mock_qcpath), 'member': None,
+             'destination': str(mock_path.join('libID_fcID_fastqc_qc.txt'))}
+        ])
+        assert (outputcleaner._plan_output(str(mock_donepath), 'QC') == [])
 
-    def test_recode_output(self, tmpdir):
+    def test_apply_changes(self, tmpdir):
         # GIVEN a path to a folder with output data, and a subfolder
-        # corresponding to a particular output type, which contains
-        # an output file
+        # corresponding to a particular output type
         mock_path = tmpdir.mkdir('QC')
-        mock_qcpath = mock_path.ensure('libID_fcID_fastqc_data.txt')
+
+        # AND the folder contains a nested file and a nested zipped
+        # archive with an output file
+        mock_nestpath = mock_path.mkdir('lib1111_C00000XX') \
+            .ensure('fastqc_data.txt')
+        mock_zippath = mock_path.mkdir('lib2222_C00000XX').join('qc.zip')
+        with zipfile.ZipFile(str(mock_zippath), 'w') as zf:
+            zf.writestr('qc/fastqc_data.txt', 'data')
 
         # AND a cleaner object is created for the path
         outputcleaner = postprocessing.OutputCleaner(
-            path=str(tmpdir))
+            path=str(tmpdir)
+        )
 
-        # WHEN the output file is renamed according to some predefined rule
-        test_path = outputcleaner._recode_output(str(mock_qcpath), 'QC')
+        # WHEN the planned changes for each output are applied
+        for p in [mock_nestpath, mock_zippath]:
+            outputcleaner._apply_changes(
+                outputcleaner._plan_output(str(p), 'QC')
+            )
 
-        # THEN the new filename should match the expected result
-        assert (os.path.basename(test_path) == 'libID_fcID_fastqc_qc.txt')
-        assert ('libID_fcID_fastqc_qc.txt' in
-                [os.path.basename(str(f)) for f in mock_path.listdir()])
+        # THEN the files should exist directly under the output type
+        # folder, with the extracted member fully written and no
+        # temporary files left behind
+        test_files = [os.path.basename(str(f)) for f in mock_path.listdir()
+                      if f.isfile()]
+        assert (sorted(test_files) == ['lib1111_C00000XX_fastqc_qc.txt',
+                                       'lib2222_C00000XX_fastqc_qc.txt'])
+        assert (mock_path.join('lib2222_C00000XX_fastqc_qc.txt').read()
+                == 'data')
 
     def test_clean_outputs(self, tmpdir):
         # GIVEN a path to a folder with output data, and a subfolder
@@ -711,3 +1354,63 @@ class TestOutputCleaner:
         assert (len(mock_path.listdir()) == 4)
         assert ('lib1111_C00000XX_fastqc_qc.txt' in
                 [os.path.basename(str(f)) for f in mock_path.listdir()])
+
+    def test_clean_outputs_extracts_kept_members(self, tmpdir):
+        # GIVEN a path to a folder with output data, and a subfolder
+        # corresponding to a particular output type
+        mock_path = tmpdir.mkdir('QC')
+
+        # AND the output type folder contains zipped FastQC outputs for
+        # a sample, including files other than the FastQC data file
+        mock_zipdir = mock_path.mkdir('lib1111_C00000XX').mkdir('qc')
+        mock_zipdir.ensure('fastqc_data.txt').write('data')
+        mock_zipdir.ensure('fastqc_report.html')
+        mock_zipdir.ensure('Images', 'per_base_quality.png')
+        shutil.make_archive(str(mock_zipdir), 'zip', str(mock_zipdir))
+        shutil.rmtree(str(mock_zipdir))
+
+        # AND a cleaner object is created for the path
+        outputcleaner = postprocessing.OutputCleaner(
+            path=str(tmpdir)
+        )
+
+        # WHEN output files for the folder are cleaned
+        test_changes = outputcleaner.clean_outputs()
+
+        # THEN only the FastQC data file should be extracted, straight to
+        # its final path
+        assert (len(test_changes) == 1)
+        assert (sorted(os.path.basename(str(f)) for f in mock_path.listdir())
+                == ['lib1111_C00000XX', 'lib1111_C00000XX_fastqc_qc.txt'])
+        assert (mock_path.join('lib1111_C00000XX_fastqc_qc.txt').read()
+                == 'data')
+        assert (mock_path.join('lib1111_C00000XX').listdir()
+                == [mock_path.join('lib1111_C00000XX', 'qc.zip')])
+
+    def test_clean_outputs_dry_run(self, tmpdir):
+        # GIVEN a path to a folder with output data, and a subfolder
+        # corresponding to a particular output type
+        mock_path = tmpdir.mkdir('QC')
+
+        # AND the output type folder contains a nested output file and
+        # an output file with a deprecated filename
+        mock_path.mkdir('lib1111_C00000XX').ensure('fastqc_data.txt')
+        mock_path.ensure('lib2222_C00000XX_fastqc_data.txt')
+
+        # AND a cleaner object is created for the path
+        outputcleaner = postprocessing.OutputCleaner(
+            path=str(tmpdir)
+        )
+
+        # WHEN output files are cleaned in dry-run mode
+        test_changes = outputcleaner.clean_outputs(dry_run=True)
+
+        # THEN the planned changes should be returned
+        assert ([(c['action'], os.path.basename(c['destination']))
+                 for c in test_changes]
+                == [('move', 'lib1111_C00000XX_fastqc_qc.txt'),
+                    ('move', 'lib2222_C00000XX_fastqc_qc.txt')])
+
+        # AND no files should be changed
+        assert (sorted(os.path.basename(str(f)) for f in mock_path.listdir())
+                == ['lib1111_C00000XX', 'lib2222_C00000XX_fastqc_data.txt'])
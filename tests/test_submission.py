@@ -2,12 +2,14 @@ import logging
 import os
 import re
 import datetime
+import json
 
 import mock
 import mongomock
 import pytest
 
 from bripipetools import annotation
+from bripipetools import io
 from bripipetools import submission
 
 logging.basicConfig(level=logging.DEBUG)
@@ -303,6 +305,89 @@ class TestBatchParameterizer:
                     'name': 'SampleName',
                     'value': 'lib1111'})
 
+    def test_parameterize_lists_sample_folder_once(self, mock_params,
+                                                   tmpdir):
+        tmpdir = tmpdir.mkdir('bioinformatics').mkdir('pipeline')
+        mock_path = tmpdir.mkdir('lib1111-11111111')
+        mock_path.ensure('sample-name_S001_L001_R1_001.fastq.gz')
+
+        parameterizer = submission.BatchParameterizer(
+            sample_paths=[str(mock_path)],
+            parameters=mock_params,
+            endpoint='',
+            target_dir=str(tmpdir)
+        )
+
+        with mock.patch('os.listdir', side_effect=os.listdir) as mock_listdir:
+            parameterizer.parameterize()
+
+        assert (mock_listdir.call_count == 1)
+        assert (all(mock_path.join('empty_L00{}_R1.fastq.gz'.format(lane))
+                    .check() for lane in range(2, 9)))
+
+    def test_parameterize_compiles_parameters_once(self, mock_params, tmpdir):
+        tmpdir = tmpdir.mkdir('bioinformatics').mkdir('pipeline')
+        mock_paths = [str(tmpdir.mkdir('lib1111-11111111')),
+                      str(tmpdir.mkdir('lib2222-22222222')),
+                      str(tmpdir.mkdir('lib3333-33333333'))]
+
+        parameterizer = submission.BatchParameterizer(
+            sample_paths=mock_paths,
+            parameters=mock_params,
+            endpoint='',
+            target_dir=str(tmpdir)
+        )
+
+        with mock.patch.object(parameterizer, '_prep_output_dir',
+                               wraps=parameterizer._prep_output_dir) \
+                as mock_prep:
+            parameterizer.parameterize()
+
+        num_outputs = len([p for p in mock_params
+                           if p['type'] == 'output'
+                           and not re.search('endpoint', p['name'])])
+        assert (mock_prep.call_count == num_outputs)
+        assert ([p['value'] for p in parameterizer.samples[2]
+                 if p['name'] == 'to_path']
+                == [os.path.join('/mnt/bioinformatics/pipeline/alignments',
+                                 'lib3333_tophat_alignments.bam')])
+
+    def test_get_lane_fastq_for_read_2(self, mock_params, tmpdir):
+        mock_path = tmpdir.mkdir('lib1111-11111111')
+        mock_path.ensure('sample-name_S001_L002_R1_001.fastq.gz')
+        mock_fastqpath = mock_path.ensure(
+            'sample-name_S001_L002_R2_001.fastq.gz'
+        )
+
+        parameterizer = submission.BatchParameterizer(
+            sample_paths=[],
+            parameters=mock_params,
+            endpoint='',
+            target_dir=''
+        )
+
+        test_fastqpath = parameterizer._get_lane_fastq(str(mock_path), '2',
+                                                       'R2')
+
+        assert (test_fastqpath == mock_fastqpath)
+
+    def test_get_lane_fastq_defers_empty_file(self, mock_params, tmpdir):
+        mock_path = tmpdir.mkdir('lib1111-11111111')
+        mock_fastqpath = mock_path.join('empty_L002_R1.fastq.gz')
+
+        parameterizer = submission.BatchParameterizer(
+            sample_paths=[],
+            parameters=mock_params,
+            endpoint='',
+            target_dir=''
+        )
+
+        parameterizer._get_lane_fastq(str(mock_path), '2')
+        assert (not mock_fastqpath.check())
+
+        parameterizer._create_empty_fastqs()
+        assert (mock_fastqpath.check())
+
 
 #@pytest.fixture(scope='function')
 def mock_template(filename, tmpdir):
@@ -641,6 +726,33 @@ class TestBatchCreator:
 
         assert (test_samplepaths == mock_samplepaths[0][1:])
 
+    def test_get_sample_paths_with_sort_opt_reports_size(self, tmpdir):
+        mock_filename = 'optimized_workflow_1.txt'
+        mock_file = mock_template(mock_filename, tmpdir)
+
+        folderpath = tmpdir.mkdir('P1-1-11111111')
+        for s, contents in [('lib1111-11111111', 'mock contents\n'),
+                            ('lib2222-22222222', 'more mock contents\n')]:
+            folderpath.mkdir(s).ensure(
+                'sample-name_S001_L001_R1_001.fastq.gz'
+            ).write(contents)
+
+        creator = submission.BatchCreator(
+            paths=[str(folderpath)],
+            workflow_template=mock_file,
+            endpoint='',
+            base_dir=str(tmpdir),
+            group_tag='',
+            subgroup_tags='',
+            sort=True
+        )
+
+        creator._get_sample_paths(str(folderpath))
+
+        assert (creator.input_sizes
+                == {str(folderpath): len('mock contents\n')
+                    + len('more mock contents\n')})
+
     def test_get_input_params_for_folders(self, tmpdir):
         mock_filename = 'optimized_workflow_1.txt'
         mock_file = mock_template(mock_filename, tmpdir)
@@ -738,6 +850,46 @@ class TestBatchCreator:
                 == 4)
 
 
+class TestSampleSizeScanner:
+    """
+
+    """
+    def test_get_sizes(self, tmpdir):
+        # GIVEN sample folders with FASTQ files of different sizes
+        mock_paths = []
+        for s, contents in [('lib1111-11111111', 'mock contents\n'),
+                            ('lib2222-22222222', '')]:
+            samplepath = tmpdir.mkdir(s)
+            samplepath.ensure('sample-name_S001_L001_R1_001.fastq.gz')
+            samplepath.ensure(
+                'sample-name_S001_L002_R1_001.fastq.gz'
+            ).write(contents)
+            mock_paths.append(str(samplepath))
+
+        # WHEN sizes are scanned for all sample folders
+        scanner = submission.SampleSizeScanner(max_workers=2)
+        test_sizes = scanner.get_sizes(mock_paths)
+
+        # THEN the total size of files in each folder is returned
+        assert (test_sizes == {mock_paths[0]: len('mock contents\n'),
+                               mock_paths[1]: 0})
+
+    def test_get_sizes_uses_cache_for_unchanged_folder(self, tmpdir):
+        # GIVEN a sample folder that has already been scanned
+        samplepath = tmpdir.mkdir('lib1111-11111111')
+        samplepath.ensure('sample-name_S001_L001_R1_001.fastq.gz')
+        scanner = submission.SampleSizeScanner()
+        scanner.get_sizes([str(samplepath)])
+
+        # WHEN the folder is scanned again without any changes
+        with mock.patch('os.scandir') as mock_scandir:
+            test_sizes = scanner.get_sizes([str(samplepath)])
+
+        # THEN the cached size is returned without listing the folder
+        assert (test_sizes == {str(samplepath): 0})
+        assert (not mock_scandir.called)
+
+
 class TestFlowcellSubmissionBuilder:
     """
 
@@ -873,6 +1025,59 @@ class TestFlowcellSubmissionBuilder:
         mock_batchkey = (mock_workflowopts[0], mock_buildopts[0], False)
         assert (builder.batch_map == {mock_batchkey: [mock_paths[0]]})
 
+    def test_assign_workflows_from_plan(self, mock_db, tmpdir):
+        # GIVEN a flowcell folder with an 'Unaligned' subfolder that
+        # includes multiple project folders, each with one library
+        mock_runid = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir
+                    .mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_runid))
+        mock_unaligndir = mock_path.mkdir('Unaligned')
+        mock_projects = {'P1-1-11111111': 'lib1111-11111111',
+                         'P99-99-99999999': 'lib9999-99999999'}
+        mock_paths = {}
+        for p, l in sorted(mock_projects.items()):
+            projectpath = mock_unaligndir.mkdir(p)
+            projectpath.mkdir(l)
+            mock_paths[p] = str(projectpath)
+        mock_workflowdir = mock_path.mkdir('galaxy_workflows')
+        mock_workflow = str(mock_workflowdir.ensure('optimized_workflow1.txt'))
+
+        # AND GenLIMS records species for the library in one project
+        mock_db.samples.insert_one({'_id': 'lib9999', 'parentId': 'S9999'})
+        mock_db.samples.insert_one({'_id': 'S9999', 'species': 'mouse'})
+
+        # AND a plan with a rule matching the project label and a rule
+        # matching the metadata
+        mock_plan = submission.BatchPlan(rules=[
+            {'project': '^P1-', 'workflow': 'optimized_workflow1.txt',
+             'build': 'GRCh38.77', 'stranded': True},
+            {'metadata': {'species': 'mouse'},
+             'workflow': 'optimized_workflow1.txt', 'build': 'GRCm38.91'}
+        ])
+
+        builder = submission.FlowcellSubmissionBuilder(
+            path=str(mock_path),
+            endpoint='benaroyaresearch#BRIGridFTP',
+            db=mock_db,
+            workflow_dir=str(mock_workflowdir),
+            plan=mock_plan
+        )
+
+        # WHEN workflows are assigned (without any prompts)
+        with mock.patch('builtins.input') as mock_input:
+            builder._assign_workflows()
+
+        # THEN each project is assigned based on the matching rule
+        assert (not mock_input.called)
+        assert (builder.batch_map
+                == {(mock_workflow, 'GRCh38.77', True):
+                    [mock_paths['P1-1-11111111']],
+                    (mock_workflow, 'GRCm38.91', False):
+                    [mock_paths['P99-99-99999999']]})
+
     def test_get_batch_tags(self, mock_db, tmpdir):
         # GIVEN a flowcell run ID and an arbitrary root directory,
         # under which a folder exists at 'bioinformatics/pipeline/Illumina/<run_id>',
@@ -966,6 +1171,62 @@ class TestFlowcellSubmissionBuilder:
                 == 2)
 
 
+    def test_run_parses_template_once(self, mock_db, tmpdir):
+        # GIVEN a flowcell folder with an 'Unaligned' subfolder that
+        # includes multiple project folders
+        mock_runid = '161231_INSTID_0001_AC00000XX'
+        mock_path = (tmpdir
+                    .mkdir('bioinformatics')
+                    .mkdir('pipeline')
+                    .mkdir('Illumina')
+                    .mkdir(mock_runid))
+        mock_workflowdir = mock_path.mkdir('galaxy_workflows')
+        mock_workflow = mock_template('optimized_workflow1.txt',
+                                      mock_workflowdir)
+
+        mock_unaligndir = mock_path.mkdir('Unaligned')
+        mock_paths = []
+        for f, s in [('P1-1-11111111', 'lib1111-11111111'),
+                     ('P99-99-99999999', 'lib3333-33333333')]:
+            folderpath = mock_unaligndir.mkdir(f)
+            mock_paths.append(str(folderpath))
+            folderpath.mkdir(s).ensure('sample-name_S001_L001_R1_001.fastq.gz')
+
+        builder = submission.FlowcellSubmissionBuilder(
+            path=str(mock_path),
+            endpoint='benaroyaresearch#BRIGridFTP',
+            db=mock_db,
+            workflow_dir=str(mock_workflowdir)
+        )
+
+        # AND batches for the same workflow with different builds
+        builder.batch_map = {
+            (mock_workflow, 'GRCh38.77', False): [mock_paths[0]],
+            (mock_workflow, 'NCBIM37.67', True): [mock_paths[1]]
+        }
+
+        # WHEN batches are created
+        with mock.patch.object(io.WorkflowBatchFile, '_read_file',
+                               autospec=True,
+                               side_effect=io.WorkflowBatchFile._read_file) \
+                as mock_read:
+            test_paths = builder.run()
+
+        # THEN the template is read once, and each batch file is
+        # written completely (with no temporary files left)
+        assert (mock_read.call_count == 1)
+        assert ([os.path.basename(p) for p in test_paths]
+                == ['{}_C00000XX_P1-1_optimized_workflow1_GRCh38.77_unstrand.txt'
+                    .format(datetime.date.today().strftime("%y%m%d")),
+                    '{}_C00000XX_P99-99_optimized_workflow1_NCBIM37.67_stranded.txt'
+                    .format(datetime.date.today().strftime("%y%m%d"))])
+        for p in test_paths:
+            with open(p) as f:
+                assert (len([l for l in f if re.search('^lib', l)]) == 1)
+        assert (sorted(os.listdir(os.path.dirname(test_paths[0])))
+                == sorted(os.path.basename(p) for p in test_paths))
+
+
 class TestSampleSubmissionBuilder:
     """
 
@@ -1053,6 +1314,32 @@ class TestSampleSubmissionBuilder:
         mock_batchkey = (mock_workflowopts[0], mock_buildopts[0])
         assert (builder.batch_map == {mock_batchkey: mock_paths})
 
+    def test_assign_workflow_from_plan(self, tmpdir):
+        mock_workflowdir = tmpdir.mkdir('galaxy_workflows')
+        mock_workflow = str(mock_workflowdir.ensure('optimized_workflow1.txt'))
+
+        mock_paths = [str(tmpdir.mkdir(s))
+                      for s in ['lib1111-11111111', 'lib2222-22222222']]
+
+        builder = submission.SampleSubmissionBuilder(
+            manifest='',
+            out_dir=str(tmpdir),
+            endpoint='',
+            workflow_dir=str(mock_workflowdir),
+            plan=submission.BatchPlan.from_assignments(
+                ['^lib1111,optimized_workflow1.txt,GRCh38.91,stranded']
+            )
+        )
+
+        builder.paths = mock_paths
+
+        with mock.patch('builtins.input') as mock_input:
+            builder._assign_workflow()
+
+        assert (not mock_input.called)
+        assert (builder.batch_map
+                == {(mock_workflow, 'GRCh38.91', True): mock_paths[:1]})
+
     def test_run(self, tmpdir):
         mock_workflowdir = tmpdir.mkdir('galaxy_workflows')
         mock_workflows = ['workflow1.txt', 'optimized_workflow1.txt']
@@ -1097,3 +1384,65 @@ class TestSampleSubmissionBuilder:
         assert (len([l for l in test_contents
                      if re.search('^lib', l)])
                 == 2)
+
+
+class TestBatchPlan:
+    """
+
+    """
+    def test_from_file(self, tmpdir):
+        # GIVEN a JSON plan file with defaults and rules
+        mock_file = tmpdir.join('batch_plan.json')
+        mock_file.write(json.dumps({
+            'defaults': {'build': 'GRCh38.91'},
+            'rules': [{'project': '^P1-', 'workflow': 'workflow1.txt'},
+                      {'project': '^P2-', 'workflow': 'workflow2.txt',
+                       'build': 'GRCm38.91', 'stranded': True}]
+        }))
+
+        # WHEN the plan is read from the file
+        plan = submission.BatchPlan.from_file(str(mock_file))
+
+        # THEN defaults are filled in for each rule
+        assert (plan.match('P1-1') == [('workflow1.txt', 'GRCh38.91', False)])
+        assert (plan.match('P2-2') == [('workflow2.txt', 'GRCm38.91', True)])
+        assert (plan.match('P3-3') == [])
+
+    def test_from_assignments(self):
+        plan = submission.BatchPlan.from_assignments(
+            ['^P1-,workflow1.txt,GRCh38.91',
+             '.*,workflow2.txt,GRCh38.91,stranded']
+        )
+
+        assert (plan.match('P1-1')
+                == [('workflow1.txt', 'GRCh38.91', False),
+                    ('workflow2.txt', 'GRCh38.91', True)])
+
+    def test_from_assignments_invalid(self):
+        with pytest.raises(ValueError):
+            submission.BatchPlan.from_assignments(['^P1-,workflow1.txt'])
+
+    def test_init_with_unsupported_build(self):
+        with pytest.raises(ValueError):
+            submission.BatchPlan(rules=[{'workflow': 'workflow1.txt',
+                                         'build': 'GRCh99'}])
+
+    def test_match_with_metadata(self):
+        plan = submission.BatchPlan(rules=[
+            {'metadata': {'species': 'mouse'}, 'workflow': 'workflow1.txt',
+             'build': 'GRCm38.91'}
+        ])
+
+        assert (plan.match('P1-1', {'species': 'mouse'})
+                == [('workflow1.txt', 'GRCm38.91', False)])
+        assert (plan.match('P1-1', {'species': 'human'}) == [])
+        assert (plan.match('P1-1') == [])
+        assert (plan.metadata_fields == {'species'})
+
+    def test_assign_with_missing_workflow(self, tmpdir):
+        plan = submission.BatchPlan(rules=[{'workflow': 'workflow1.txt',
+                                            'build': 'GRCh38.91'}])
+
+        with pytest.raises(ValueError):
+            plan.assign([str(tmpdir.mkdir('P1-1-11111111'))],
+                        workflow_dir=str(tmpdir))
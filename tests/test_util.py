@@ -1,3 +1,6 @@
+import os
+import re
+
 import pytest
 
 from bripipetools import util
@@ -140,4 +143,58 @@ class TestFiles:
         # original root folder replaced by the alternative string
         assert (new_path == expected_result)
 
+    @pytest.mark.parametrize(
+        'test_input, expected_result',
+        [
+            (('/foo/bar/baz', 'bar'), '/~/bar/baz'),
+            (('/foo/bar/baz', 'bar', '/newroot/'), '/newroot/bar/baz'),
+            (('bar/baz', 'bar', '/newroot/'), '/newroot/bar/baz'),
+            (('/bar/baz', 'bar', '/newroot'), '/newroot/bar/baz'),
+            (('/foo/bar/bar/baz', 'bar', '/newroot/'), '/newroot/bar/baz'),
+            (('/foo/baz', 'bar', '/newroot/'), '/foo/baz'),
+            (('foo/baz', 'bar', ''), 'foo/baz'),
+        ]
+    )
+    def test_root_rewriter(self, test_input, expected_result):
+        # GIVEN a root rewriter for a top level folder and new root
+        path = test_input[0]
+        rewriter = util.RootRewriter(*test_input[1:])
+
+        # WHEN the root folder is swapped for a single path and for a
+        # list of paths
+        new_path = rewriter.rewrite(path)
+        new_paths = rewriter.rewrite_all([path, path])
+
+        # THEN the output should match the result of 'swap_root'
+        assert (new_path == expected_result)
+        assert (new_paths == [expected_result, expected_result])
+
+    def test_get_root_rewriter(self):
+        # GIVEN any state
 
+        # WHEN root rewriters are retrieved for the same top level
+        # folder and new root
+        rewriter = util.get_root_rewriter('pipeline', '/mnt/bioinformatics/')
+
+        # THEN the same (precompiled) rewriter should be returned
+        assert (util.get_root_rewriter('pipeline', '/mnt/bioinformatics/')
+                is rewriter)
+        assert (util.get_root_rewriter('pipeline', '/') is not rewriter)
+
+    def test_root_rewriter_matches_per_path_swap(self):
+        # GIVEN a large batch of output paths
+        paths = [('/Volumes/genomics/pipeline/Illumina/FC{}/'
+                  'Project_P{}Processed/counts/lib{}_htseq_counts.txt')
+                 .format(i % 7, i % 13, i) for i in range(5000)]
+
+        # WHEN paths are rewritten with a precompiled rewriter
+        rewriter = util.get_root_rewriter('pipeline', '/mnt/bioinformatics/')
+        test_paths = rewriter.rewrite_all(paths)
+
+        # THEN the results should be the same as when using a new regular
+        # expression for each path (timings are compared by
+        # 'scripts/benchmark_root_rewriter.py')
+        assert (test_paths
+                == [os.path.join('/mnt/bioinformatics/',
+                                 re.sub('.*(?={})'.format('pipeline'), '', p))
+                    for p in paths])